@@ -4,15 +4,59 @@ CV upload and processing endpoints
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import Optional
+import logging
 
 from app.database import get_db
 from app.services.auth_service import get_current_user
 from app.services.cv_service import CVService
 from app.models.user import User
-from app.schemas.cv import CVUploadResponse, CVAnalysisResponse
+from app.models.cv import CVFile
+from app.schemas.cv import (
+    CVUploadResponse, CVAnalysisResponse, CVProcessingStatusResponse,
+    CVUploadURLRequest, CVUploadURLResponse, CVFinalizeUploadRequest
+)
+from app.utils.storage import FileTooLargeError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ALLOWED_EXTENSIONS = [".pdf", ".docx"]
+
+
+def _validate_file_name(file_name: Optional[str]):
+    if not file_name:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No file provided"
+        )
+    
+    file_extension = file_name.lower().split('.')[-1]
+    if f".{file_extension}" not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF and DOCX files are supported"
+        )
+
+
+def _upload_response(cv_record: CVFile, deduplicated: bool) -> CVUploadResponse:
+    if deduplicated:
+        message = "This CV was already uploaded. Reusing its existing analysis."
+    else:
+        message = "CV uploaded successfully. Analysis in progress."
+    
+    job_id = str(cv_record.cv_id)
+    return CVUploadResponse(
+        cv_id=str(cv_record.cv_id),
+        file_url=cv_record.file_url,
+        analysis_status=cv_record.analysis_status,
+        uploaded_at=cv_record.uploaded_at.isoformat(),
+        message=message,
+        job_id=job_id,
+        status_url=f"/api/v1/users/me/cv/jobs/{job_id}",
+        deduplicated=deduplicated
+    )
+
 
 @router.post("/upload", response_model=CVUploadResponse)
 async def upload_cv(
@@ -24,55 +68,144 @@ async def upload_cv(
     """Upload CV file for analysis"""
     cv_service = CVService(db)
     
-    # Validate file
-    if not file.filename:
+    _validate_file_name(file.filename)
+    
+    try:
+        # Upload and process CV; the size limit is enforced while streaming
+        cv_record, deduplicated = await cv_service.upload_and_process_cv(
+            user_id=current_user.user_id,
+            file=file,
+            analysis_type=analysis_type
+        )
+        return _upload_response(cv_record, deduplicated)
+        
+    except FileTooLargeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="No file provided"
+            detail=str(e)
         )
-    
-    # Check file type
-    file_extension = file.filename.lower().split('.')[-1]
-    if f".{file_extension}" not in [".pdf", ".docx"]:
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only PDF and DOCX files are supported"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload CV: {str(e)}"
         )
+
+
+@router.post("/upload-url", response_model=CVUploadURLResponse)
+async def create_cv_upload_url(
+    request: CVUploadURLRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a signed URL to upload a CV directly to storage, then call /upload/finalize"""
+    cv_service = CVService(db)
+    
+    _validate_file_name(request.file_name)
     
-    # Check file size (10MB limit)
-    file_content = await file.read()
-    if len(file_content) > 10 * 1024 * 1024:
+    try:
+        result = await cv_service.create_upload_url(
+            user_id=current_user.user_id,
+            file_name=request.file_name,
+            content_type=request.content_type,
+            file_size=request.file_size,
+            content_hash=request.content_hash
+        )
+    except FileTooLargeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File size exceeds 10MB limit"
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create upload URL: {str(e)}"
         )
     
-    # Reset file pointer
-    await file.seek(0)
+    if result["deduplicated"]:
+        cv_record = result["cv_record"]
+        return CVUploadURLResponse(
+            deduplicated=True,
+            cv_id=str(cv_record.cv_id),
+            file_url=cv_record.file_url,
+            analysis_status=cv_record.analysis_status
+        )
+    
+    return CVUploadURLResponse(**result)
+
+
+@router.post("/upload/finalize", response_model=CVUploadResponse)
+async def finalize_cv_upload(
+    request: CVFinalizeUploadRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start processing a CV uploaded through a signed URL"""
+    cv_service = CVService(db)
+    
+    _validate_file_name(request.file_name)
     
     try:
-        # Upload and process CV
-        cv_record = await cv_service.upload_and_process_cv(
+        cv_record, deduplicated = await cv_service.finalize_upload(
             user_id=current_user.user_id,
-            file=file,
-            analysis_type=analysis_type
+            file_url=request.file_url,
+            file_name=request.file_name,
+            analysis_type=request.analysis_type
         )
+        return _upload_response(cv_record, deduplicated)
         
-        return CVUploadResponse(
-            cv_id=str(cv_record.cv_id),
-            file_url=cv_record.file_url,
-            analysis_status=cv_record.analysis_status,
-            uploaded_at=cv_record.uploaded_at.isoformat(),
-            message="CV uploaded successfully. Analysis in progress."
+    except PermissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e)
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to upload CV: {str(e)}"
+            detail=f"Failed to finalize CV upload: {str(e)}"
         )
 
 
+@router.get("/jobs/{job_id}", response_model=CVProcessingStatusResponse)
+async def get_cv_processing_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the background processing status of a CV upload"""
+    cv_service = CVService(db)
+    
+    cv_record = cv_service.get_user_cv(current_user.user_id)
+    if not cv_record or str(cv_record.cv_id) != job_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Processing job not found"
+        )
+    
+    # Fall back to the CV record once the job has expired from the status table
+    job = cv_service.get_processing_status(job_id) or {}
+    
+    return CVProcessingStatusResponse(
+        job_id=job_id,
+        cv_id=str(cv_record.cv_id),
+        status=job.get("status", "completed" if cv_record.analysis_status != "processing" else "processing"),
+        analysis_status=cv_record.analysis_status,
+        created_at=job.get("created_at"),
+        started_at=job.get("started_at"),
+        completed_at=job.get("completed_at"),
+        error=job.get("error") or cv_record.error_message
+    )
+
+
 @router.get("", response_model=CVAnalysisResponse)
 async def get_cv_analysis(
     current_user: User = Depends(get_current_user),
@@ -102,6 +235,12 @@ async def get_cv_analysis(
     if cv_record.analysis_date:
         response_data["analysis_date"] = cv_record.analysis_date.isoformat()
     
+    # Short-lived link to the original file; signed URLs are cached per object
+    try:
+        response_data["download_url"] = await cv_service.storage_service.get_signed_url(cv_record.file_url)
+    except Exception as e:
+        logger.error(f"Failed to sign download URL for CV {cv_record.cv_id}: {str(e)}")
+    
     # Add extracted data if available
     if cv_record.extraction and cv_record.extraction.extracted_data:
         response_data["extracted_data"] = cv_record.extraction.extracted_data
@@ -7,6 +7,8 @@ import logging
 
 from ...services.jsearch_service import jsearch_service
 from ...services.serpapi_service import serpapi_service
+from ...services.adzuna_service import adzuna_service
+from ...services.job_index_service import job_index_service
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +29,32 @@ async def search_jobs(
     
     This endpoint provides access to live job postings from major job boards
     including LinkedIn, Indeed, Glassdoor, ZipRecruiter, and more.
+    Queries are answered from the local index of ingested postings first;
+    the external API is only used when local results are sparse.
     """
     try:
+        if not job_requirements:
+            limit = num_pages * 10
+            local_result = job_index_service.search(
+                query=query,
+                location=location,
+                remote_jobs_only=remote_jobs_only,
+                employment_types=employment_types,
+                page=page,
+                limit=limit
+            )
+            
+            if not job_index_service.is_sparse(local_result, limit):
+                return {
+                    "success": True,
+                    "message": local_result["message"],
+                    "jobs": local_result["data"],
+                    "total_results": local_result["total_results"],
+                    "parameters": local_result["parameters"],
+                    "page": page,
+                    "num_pages": num_pages
+                }
+        
         result = await jsearch_service.search_jobs(
             query=query,
             location=location,
@@ -226,7 +252,8 @@ async def combined_job_search(
     location: Optional[str] = Query(None, description="Location filter"),
     remote_jobs_only: bool = Query(False, description="Filter for remote jobs only"),
     use_google: bool = Query(True, description="Include Google Jobs results"),
-    use_jsearch: bool = Query(True, description="Include JSearch results")
+    use_jsearch: bool = Query(True, description="Include JSearch results"),
+    use_adzuna: bool = Query(False, description="Include Adzuna results")
 ):
     """
     Combined search using both JSearch and Google Jobs APIs
@@ -263,6 +290,22 @@ async def combined_job_search(
                 all_jobs.extend(google_result["data"])
                 sources_used.append("Google Jobs")
         
+        # Search using Adzuna API
+        if use_adzuna:
+            adzuna_result = await adzuna_service.search_jobs(
+                query=query,
+                where=location,
+                limit=20
+            )
+            
+            adzuna_jobs = [
+                job for job in adzuna_result["data"]
+                if job["remote"] or not remote_jobs_only
+            ]
+            if adzuna_jobs:
+                all_jobs.extend(adzuna_jobs)
+                sources_used.append("Adzuna API")
+        
         # Remove duplicates based on job title and company
         unique_jobs = []
         seen = set()
@@ -9,6 +9,7 @@ from app.database import get_db
 from app.services.auth_service import get_current_user
 from app.models.user import User, UserSkill
 from app.schemas.user import UserProfile, UserSkillResponse, UserSkillCreate
+from app.services.recommendation_updates import recommendation_update_coalescer
 
 router = APIRouter()
 
@@ -81,4 +82,5 @@ async def add_user_skills(
             db.add(new_skill)
     
     db.commit()
+    recommendation_update_coalescer.request(str(current_user.user_id), "skills_updated")
     return {"message": "Skills updated successfully"}
\ No newline at end of file
@@ -52,11 +52,28 @@ class Settings(BaseSettings):
     PUBSUB_CV_PROCESSING_TOPIC: str = "cv-processing"
     PUBSUB_RECOMMENDATIONS_TOPIC: str = "recommendations"
     PUBSUB_NOTIFICATIONS_TOPIC: str = "notifications"
+    PUBSUB_CV_PROCESSING_DEAD_LETTER_TOPIC: str = "cv-processing-dead-letter"
+    PUBSUB_RECOMMENDATIONS_DEAD_LETTER_TOPIC: str = "recommendations-dead-letter"
+    # Subscriber flow control and redelivery limit before a task is dead-lettered
+    PUBSUB_WORKER_MAX_MESSAGES: int = int(os.getenv("PUBSUB_WORKER_MAX_MESSAGES", os.getenv("MAX_CONCURRENT_CV_PROCESSING", "5")))
+    PUBSUB_MAX_DELIVERY_ATTEMPTS: int = int(os.getenv("PUBSUB_MAX_DELIVERY_ATTEMPTS", "5"))
+    # Task queue behind PubSubService: pubsub, redis (streams) or memory (single process, no GCP)
+    TASK_QUEUE_BACKEND: str = os.getenv("TASK_QUEUE_BACKEND", "pubsub")
+    TASK_QUEUE_REDIS_URL: str = os.getenv("TASK_QUEUE_REDIS_URL", "")  # defaults to the REDIS_* settings
+    # Approximate cap on entries kept per Redis stream (0 keeps everything)
+    TASK_QUEUE_REDIS_MAXLEN: int = int(os.getenv("TASK_QUEUE_REDIS_MAXLEN", "100000"))
+    # Publisher batching: a batch is sent when any limit is reached
+    PUBSUB_BATCH_MAX_MESSAGES: int = int(os.getenv("PUBSUB_BATCH_MAX_MESSAGES", "100"))
+    PUBSUB_BATCH_MAX_BYTES: int = int(os.getenv("PUBSUB_BATCH_MAX_BYTES", str(1024 * 1024)))
+    PUBSUB_BATCH_MAX_LATENCY: float = float(os.getenv("PUBSUB_BATCH_MAX_LATENCY", "0.01"))  # seconds
     
     # ML Models
     SPACY_MODEL: str = "en_core_web_sm"
     USE_VERTEX_AI: bool = os.getenv("USE_VERTEX_AI", "False").lower() == "true"
     VERTEX_AI_LOCATION: str = os.getenv("VERTEX_AI_LOCATION", "us-central1")
+    VERTEX_AI_USE_STUB: bool = os.getenv("VERTEX_AI_USE_STUB", "False").lower() == "true"
+    VERTEX_AI_BATCH_MAX_SIZE: int = int(os.getenv("VERTEX_AI_BATCH_MAX_SIZE", "16"))
+    VERTEX_AI_BATCH_WINDOW_MS: int = int(os.getenv("VERTEX_AI_BATCH_WINDOW_MS", "10"))
     
     # File upload limits
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -73,9 +90,19 @@ class Settings(BaseSettings):
     # Background tasks
     ENABLE_BACKGROUND_TASKS: bool = os.getenv("ENABLE_BACKGROUND_TASKS", "True").lower() == "true"
     MAX_CONCURRENT_CV_PROCESSING: int = int(os.getenv("MAX_CONCURRENT_CV_PROCESSING", "5"))
+    # Recommendation updates for a user within this window collapse into one recompute job
+    RECOMMENDATION_UPDATE_WINDOW: float = float(os.getenv("RECOMMENDATION_UPDATE_WINDOW", "30"))  # seconds
+    # Expiry of the per-user in-flight flag, so a crashed worker can't block recomputes forever
+    RECOMMENDATION_RECOMPUTE_LOCK_TTL: int = int(os.getenv("RECOMMENDATION_RECOMPUTE_LOCK_TTL", "300"))  # seconds
     
     # WebSocket
     WEBSOCKET_HEARTBEAT_INTERVAL: int = int(os.getenv("WEBSOCKET_HEARTBEAT_INTERVAL", "30"))
+    # Fan-out: sockets written to at once, and how long one slow client may hold a send
+    WEBSOCKET_SEND_CONCURRENCY: int = int(os.getenv("WEBSOCKET_SEND_CONCURRENCY", "100"))
+    WEBSOCKET_SEND_TIMEOUT: float = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "5"))  # seconds
+    # Route messages to users connected to other instances through Redis pub/sub
+    WEBSOCKET_RELAY_ENABLED: bool = os.getenv("WEBSOCKET_RELAY_ENABLED", "False").lower() == "true"
+    WEBSOCKET_RELAY_REDIS_URL: str = os.getenv("WEBSOCKET_RELAY_REDIS_URL", "")  # defaults to the REDIS_* settings
     
     # External APIs
     JOB_BOARD_API_KEY: str = os.getenv("JOB_BOARD_API_KEY", "")
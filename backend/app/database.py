@@ -1,13 +1,16 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
@@ -22,6 +25,34 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base class for models
 Base = declarative_base()
 
+# Columns added to existing tables after their first release. create_all() only
+# creates missing tables, so these are applied to databases that predate them.
+# (table, column, statements)
+SCHEMA_UPGRADES = [
+    ("cv_files", "content_hash", [
+        "ALTER TABLE cv_files ADD COLUMN content_hash VARCHAR(64)",
+        "CREATE INDEX IF NOT EXISTS ix_cv_files_content_hash ON cv_files (content_hash)"
+    ])
+]
+
+
+def upgrade_schema():
+    """
+    Add columns that existing tables are missing
+
+    Run after Base.metadata.create_all(); tables it has just created already
+    have every column and are left alone.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    for table, column, statements in SCHEMA_UPGRADES:
+        if table not in tables or column in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+        logger.info(f"Added column {table}.{column}")
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -14,12 +14,21 @@ import logging
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, upgrade_schema
 from app.api.v1 import auth, users, cv, recommendations, analytics, opportunities, websocket, jobs
 from app.services.monitoring_service import MonitoringService
 from app.services.cache_service import CacheService
-from app.services.pubsub_service import PubSubService, BackgroundTaskProcessor
+from app.services.pubsub_service import PubSubService, background_task_processor, publish_metrics
 from app.services.websocket_service import connection_manager
+from app.services.websocket_relay import websocket_relay
+from app.services.job_index_service import job_index_service
+from app.services.adzuna_service import adzuna_service
+from app.services.llm_cache_service import llm_cache_service
+from app.services.llm_gateway import llm_gateway
+from app.services.semantic_cache_service import semantic_cache_service
+from app.services.cv_service import cv_processing_queue
+from app.services.cloud_clients import cloud_clients
+from app.services.recommendation_updates import recommendation_update_coalescer, recommendation_update_runner
 
 # Configure logging
 logging.basicConfig(
@@ -37,12 +46,14 @@ async def lifespan(app: FastAPI):
     
     # Create database tables
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
     logger.info("📊 Database tables created")
     
     # Initialize cloud services
     if settings.ENABLE_MONITORING:
         try:
             monitoring_service = MonitoringService()
+            monitoring_service.setup_logging()
             monitoring_service.create_custom_metrics()
             monitoring_service.create_alert_policies()
             logger.info("📈 Monitoring service initialized")
@@ -59,6 +70,14 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Cache service initialization failed: {str(e)}")
     
+    # Reach users whose WebSocket is held by another instance
+    if settings.WEBSOCKET_RELAY_ENABLED:
+        try:
+            await websocket_relay.start()
+            logger.info(f"🔀 WebSocket relay started ({websocket_relay.instance_id})")
+        except Exception as e:
+            logger.warning(f"WebSocket relay unavailable, delivering to local sockets only: {str(e)}")
+    
     # Initialize Pub/Sub
     if settings.ENABLE_BACKGROUND_TASKS:
         try:
@@ -67,18 +86,33 @@ async def lifespan(app: FastAPI):
             logger.info("📡 Pub/Sub service initialized")
             
             # Start background task processor
-            task_processor = BackgroundTaskProcessor()
-            # asyncio.create_task(task_processor.start_cv_processing_worker())
+            recommendation_update_coalescer.start()
+            background_task_processor.start()
             logger.info("⚙️ Background task processor started")
         except Exception as e:
             logger.warning(f"Pub/Sub initialization failed: {str(e)}")
     
+    # Keep the local job search index in sync with ingested postings
+    job_index_service.start_syncer()
+    logger.info("🔎 Job index sync started")
+    
+    # CV uploads are processed on a bounded worker pool
+    cv_processing_queue.start()
+    logger.info(f"📄 CV processing workers started ({cv_processing_queue.workers})")
+    
     logger.info("✅ Career Guide API started successfully")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Career Guide API...")
+    await job_index_service.close()
+    await adzuna_service.close()
+    await cv_processing_queue.stop()
+    await background_task_processor.stop()
+    # Publish recommendation updates still inside their debounce window
+    await recommendation_update_coalescer.flush_all()
+    await websocket_relay.stop()
 
 
 # Create FastAPI app
@@ -266,7 +300,21 @@ async def get_metrics():
         ),
         "cache_enabled": settings.REDIS_HOST != "localhost" or settings.REDIS_PASSWORD,
         "monitoring_enabled": settings.ENABLE_MONITORING,
-        "background_tasks_enabled": settings.ENABLE_BACKGROUND_TASKS
+        "background_tasks_enabled": settings.ENABLE_BACKGROUND_TASKS,
+        "task_queue_backend": settings.TASK_QUEUE_BACKEND,
+        "llm_cache": llm_cache_service.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "semantic_cache": semantic_cache_service.stats(),
+        "cv_processing": cv_processing_queue.stats(),
+        "pubsub_publish": publish_metrics.stats(),
+        "pubsub_workers": background_task_processor.stats(),
+        "websocket_fanout": connection_manager.stats(),
+        "websocket_relay": websocket_relay.stats(),
+        "recommendation_updates": {
+            **recommendation_update_coalescer.stats(),
+            **recommendation_update_runner.stats()
+        },
+        "cloud_clients": cloud_clients.stats()
     }
 
 # Include API routers
@@ -3,7 +3,7 @@ Simplified FastAPI main application for demo with AI-powered CV analysis
 """
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import uvicorn
@@ -15,13 +15,30 @@ import json
 import aiohttp
 import asyncio
 import ssl
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Tuple
 import uuid
+import hashlib
 import io
+import sys
 
 # Load environment variables
 load_dotenv()
 
+# Make the services package importable when running from the app directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from services.news_service import hacker_news_service
+from services.market_insights_service import market_insights_service
+from services.adzuna_service import adzuna_service
+from services.job_index_service import job_index_service
+from services.deepseek_service import deepseek_service, extract_json, format_paraphrasing_result
+from services.llm_cache_service import llm_cache_service
+from services.llm_gateway import llm_gateway, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from services.json_stream_parser import IncrementalJSONParser
+from services.job_queue import BackgroundJobQueue
+from services.prompt_builder import prompt_builder
+from services.section_analysis_service import section_analysis_service
+from services.semantic_cache_service import semantic_cache_service
+
 # Create FastAPI app
 app = FastAPI(
     title="Career Guide API",
@@ -46,15 +63,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# DeepSeek AI Integration
-DEEPSEEK_TOKEN = os.getenv("DEEPSEEK_TOKEN", "your-deepseek-token-here")
-DEEPSEEK_ENDPOINT = "https://models.github.ai/inference"
-DEEPSEEK_MODEL = "deepseek/DeepSeek-V3-0324"
+# DeepSeek AI Integration - bump a version when its system prompt changes
+ANALYSIS_PROMPT_VERSION = "paraphrasing-analysis-v2"
+PARAPHRASE_PROMPT_VERSION = "paraphrase-demo-v2"
+
+# "single" sends the whole CV in one call; "section_parallel" analyzes sections concurrently
+CV_ANALYSIS_MODE = os.getenv("CV_ANALYSIS_MODE", "single")
+
+# Parts of the paraphrasing response streamed to the client as soon as they close
+PARAPHRASE_STREAM_SECTIONS = [
+    ("paraphrased_cv", "professional_summary"),
+    ("paraphrased_cv", "work_experience", "*"),
+    ("paraphrased_cv", "skills"),
+    ("paraphrased_cv", "education"),
+    ("paraphrased_cv", "key_achievements"),
+    ("optimization_notes",),
+    ("match_analysis",)
+]
+PARAPHRASE_RESULT_KEYS = ["paraphrased_cv", "optimization_notes", "match_analysis"]
 
 # In-memory storage for CV data (in production, use a database)
 cv_storage = {}
 user_cv_analyses = {}
 
+# CV analysis runs on a bounded worker pool instead of inside the upload request
+cv_analysis_queue = BackgroundJobQueue(
+    "cv_analysis",
+    workers=int(os.getenv("MAX_CONCURRENT_CV_PROCESSING", "5"))
+)
+# How long a request waits for a CV still being analysed before answering without it
+CV_ANALYSIS_WAIT_TIMEOUT = float(os.getenv("CV_ANALYSIS_WAIT_TIMEOUT", "30"))
+
+# Opt-in: after analysis, paraphrase the CV for the top recommended roles at
+# background LLM priority so the first click on a suggested role hits the cache
+PARAPHRASE_PREGENERATE_ENABLED = os.getenv("PARAPHRASE_PREGENERATE_ENABLED", "False").lower() == "true"
+PARAPHRASE_PREGENERATE_TOP_N = int(os.getenv("PARAPHRASE_PREGENERATE_TOP_N", "3"))
+paraphrase_pregeneration_queue = BackgroundJobQueue("paraphrase_pregeneration", workers=1)
+
 # Pydantic models
 class UserCreate(BaseModel):
     email: str
@@ -113,8 +158,20 @@ async def make_api_request(url: str, timeout: int = 10):
         return None
 
 # AI Analysis Functions - Focused on CV Paraphrasing
-async def analyze_cv_for_paraphrasing(cv_text: str, user_profile: dict) -> Dict[str, Any]:
+async def analyze_cv_for_paraphrasing(
+    cv_text: str,
+    user_profile: dict,
+    force_refresh: bool = False,
+    user_id: str = "anonymous",
+    mode: Optional[str] = None
+) -> Dict[str, Any]:
     """Analyze CV content to prepare it for paraphrasing and job application optimization"""
+    if (mode or CV_ANALYSIS_MODE) == "section_parallel":
+        analysis = await section_analysis_service.analyze(cv_text, force_refresh=force_refresh, user_id=user_id)
+        if analysis is not None:
+            return analysis
+        # Not enough recognisable sections to split; use a single call
+    
     system_prompt = """
     You are an expert CV analyzer specializing in preparing CVs for paraphrasing and job application optimization.
     Your task is to analyze the CV structure and content to identify areas that can be effectively paraphrased for different job applications.
@@ -127,121 +184,34 @@ async def analyze_cv_for_paraphrasing(cv_text: str, user_profile: dict) -> Dict[
     5. Providing a paraphrasing readiness score
     """
     
-    user_prompt = f"""
-    Analyze this CV for paraphrasing and job application optimization:
-    
-    CV CONTENT:
-    {cv_text}
-    
-    USER PROFILE:
-    {user_profile}
-    
-    Provide analysis in this JSON format:
-    {{
-        "cv_sections": {{
-            "professional_summary": "extracted summary text",
-            "work_experience": [
-                {{
-                    "company": "Company Name",
-                    "position": "Job Title",
-                    "duration": "Date Range",
-                    "description": "Original description",
-                    "transferable_skills": ["skill1", "skill2"],
-                    "paraphrasing_potential": 0.85
-                }}
-            ],
-            "skills": {{
-                "technical": ["skill1", "skill2"],
-                "soft": ["skill1", "skill2"],
-                "industry_specific": ["skill1", "skill2"]
-            }},
-            "education": "education details",
-            "achievements": ["achievement1", "achievement2"]
-        }},
-        "optimization_areas": [
-            {{
-                "section": "professional_summary",
-                "current_focus": "general description",
-                "optimization_potential": "can be tailored for specific industries",
-                "paraphrasing_score": 0.9
-            }}
-        ],
-        "transferable_experiences": [
-            {{
-                "experience": "project management",
-                "applicable_roles": ["Product Manager", "Team Lead", "Project Coordinator"],
-                "paraphrasing_variations": ["managed cross-functional teams", "coordinated project deliverables", "led strategic initiatives"]
-            }}
-        ],
-        "paraphrasing_score": 0.85,
-        "readiness_assessment": {{
-            "structure_quality": 0.8,
-            "content_depth": 0.9,
-            "keyword_optimization_potential": 0.7,
-            "overall_paraphrasing_readiness": 0.8
-        }},
-        "recommended_job_types": ["Software Engineer", "Full Stack Developer", "Frontend Developer"],
-        "paraphrasing_strategy": {{
-            "high_impact_sections": ["professional_summary", "work_experience"],
-            "keyword_opportunities": ["technical skills", "industry buzzwords"],
-            "customization_areas": ["role-specific achievements", "company-specific language"]
-        }}
-    }}
-    """
+    user_prompt = prompt_builder.build_analysis_prompt(cv_text, user_profile)
     
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_TOKEN}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.2,
-                "top_p": 0.8,
-                "max_tokens": 4000,
-                "model": DEEPSEEK_MODEL
+        content = await deepseek_service.chat_completion(
+            system_prompt,
+            user_prompt,
+            temperature=0.2,
+            top_p=0.8,
+            max_tokens=4000,
+            prompt_version=ANALYSIS_PROMPT_VERSION,
+            expect_json=True,
+            force_refresh=force_refresh,
+            user_id=user_id
+        )
+
+        try:
+            analysis = extract_json(content)
+            analysis["analysis_timestamp"] = datetime.utcnow().isoformat()
+            analysis["analysis_type"] = "paraphrasing_focused"
+            return analysis
+        except json.JSONDecodeError:
+            return {
+                "raw_analysis": content,
+                "analysis_timestamp": datetime.utcnow().isoformat(),
+                "analysis_type": "paraphrasing_focused",
+                "error": "Failed to parse structured analysis"
             }
-            
-            async with session.post(
-                f"{DEEPSEEK_ENDPOINT}/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    try:
-                        # Extract JSON from response
-                        if "```json" in content:
-                            json_start = content.find("```json") + 7
-                            json_end = content.find("```", json_start)
-                            content = content[json_start:json_end].strip()
-                        elif "```" in content:
-                            json_start = content.find("```") + 3
-                            json_end = content.find("```", json_start)
-                            content = content[json_start:json_end].strip()
-                        
-                        analysis = json.loads(content)
-                        analysis["analysis_timestamp"] = datetime.utcnow().isoformat()
-                        analysis["analysis_type"] = "paraphrasing_focused"
-                        return analysis
-                    except json.JSONDecodeError:
-                        return {
-                            "raw_analysis": content,
-                            "analysis_timestamp": datetime.utcnow().isoformat(),
-                            "analysis_type": "paraphrasing_focused",
-                            "error": "Failed to parse structured analysis"
-                        }
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"DeepSeek API error: {response.status} - {error_text}")
-                    
+
     except Exception as e:
         print(f"Error in CV paraphrasing analysis: {str(e)}")
         return {
@@ -250,123 +220,109 @@ async def analyze_cv_for_paraphrasing(cv_text: str, user_profile: dict) -> Dict[
             "analysis_type": "paraphrasing_focused"
         }
 
-async def paraphrase_cv_for_job(cv_text: str, job_title: str, job_description: str = None) -> Dict[str, Any]:
+PARAPHRASE_SYSTEM_PROMPT = """
+You are an expert CV writer specializing in tailoring CVs for specific job applications.
+Your task is to paraphrase and optimize CV content to better align with the target job while maintaining truthfulness.
+
+Guidelines:
+1. Keep all factual information accurate - do not fabricate experience or skills
+2. Reword descriptions to highlight relevant experience for the target role
+3. Emphasize transferable skills that match the job requirements
+4. Use industry-specific keywords and terminology
+5. Restructure bullet points to lead with the most relevant achievements
+6. Maintain professional tone and formatting
+7. Do not add skills or experience that don't exist in the original CV
+"""
+
+def build_paraphrase_prompts(cv_text: str, job_title: str, job_description: str = None) -> Tuple[str, str]:
+    """Build the system and user prompts for paraphrasing a CV"""
+    user_prompt = prompt_builder.build_paraphrase_prompt(cv_text, job_title, job_description)
+    
+    return PARAPHRASE_SYSTEM_PROMPT, user_prompt
+
+def default_job_description(job_title: str, company_name: Optional[str] = None) -> str:
+    """Job description used when the client doesn't send one"""
+    return f"Position: {job_title} at {company_name or 'target company'}"
+
+async def paraphrase_cv_for_job(
+    cv_text: str,
+    job_title: str,
+    job_description: str = None,
+    force_refresh: bool = False,
+    user_id: str = "anonymous",
+    priority: str = PRIORITY_INTERACTIVE
+) -> Dict[str, Any]:
     """Paraphrase CV content for a specific job using DeepSeek AI"""
-    system_prompt = """
-    You are an expert CV writer specializing in tailoring CVs for specific job applications.
-    Your task is to paraphrase and optimize CV content to better align with the target job while maintaining truthfulness.
-    
-    Guidelines:
-    1. Keep all factual information accurate - do not fabricate experience or skills
-    2. Reword descriptions to highlight relevant experience for the target role
-    3. Emphasize transferable skills that match the job requirements
-    4. Use industry-specific keywords and terminology
-    5. Restructure bullet points to lead with the most relevant achievements
-    6. Maintain professional tone and formatting
-    7. Do not add skills or experience that don't exist in the original CV
+    return await deepseek_service.paraphrase_cv_for_job(
+        cv_text,
+        job_title,
+        job_description,
+        force_refresh=force_refresh,
+        user_id=user_id,
+        priority=priority,
+        system_prompt=PARAPHRASE_SYSTEM_PROMPT,
+        prompt_version=PARAPHRASE_PROMPT_VERSION
+    )
+
+async def stream_paraphrase_cv_for_job(
+    cv_text: str,
+    job_title: str,
+    job_description: str = None,
+    force_refresh: bool = False,
+    user_id: str = "anonymous"
+) -> AsyncIterator[Tuple[str, Any]]:
     """
-    
-    user_prompt = f"""
-    Please paraphrase this CV to better align with the target job position:
-    
-    TARGET JOB TITLE: {job_title}
-    
-    JOB DESCRIPTION: {job_description if job_description else "No specific job description provided"}
-    
-    ORIGINAL CV:
-    {cv_text}
-    
-    Provide the paraphrased CV in this JSON format:
-    {{
-        "paraphrased_cv": {{
-            "professional_summary": "Rewritten professional summary emphasizing relevant skills",
-            "work_experience": [
-                {{
-                    "company": "Company Name",
-                    "position": "Job Title",
-                    "duration": "Date Range",
-                    "description": "Rewritten job description highlighting relevant achievements"
-                }}
-            ],
-            "skills": ["List of skills emphasized for this role"],
-            "education": "Education section if relevant changes needed",
-            "key_achievements": ["Rewritten achievements that align with target role"]
-        }},
-        "optimization_notes": {{
-            "keywords_added": ["Industry keywords incorporated"],
-            "skills_emphasized": ["Skills highlighted for this role"],
-            "experience_reframed": ["How experience was repositioned"],
-            "suggestions": ["Additional recommendations for the application"]
-        }},
-        "match_analysis": {{
-            "alignment_score": 0.85,
-            "strengths": ["Strong points for this role"],
-            "areas_to_highlight": ["Key areas to emphasize in cover letter"],
-            "missing_elements": ["Skills/experience gaps to address"]
-        }}
-    }}
+    Paraphrase CV content as a stream of (event, data) pairs
+
+    Yields "token" events for each model delta, "section" events as each
+    watched part of the JSON response closes, and a final "done" event with
+    the same structure paraphrase_cv_for_job returns.
     """
-    
+    parser = IncrementalJSONParser(PARAPHRASE_STREAM_SECTIONS)
+
+    cached = None if force_refresh else deepseek_service.reuse_paraphrasing(
+        PARAPHRASE_PROMPT_VERSION, cv_text, job_title, job_description
+    )
+    if cached:
+        # Replay the reused result through the parser so clients see the same events
+        content = json.dumps({key: cached[key] for key in PARAPHRASE_RESULT_KEYS if key in cached})
+        yield "token", {"text": content}
+        for path, value in parser.feed(content):
+            yield "section", {"path": list(path), "value": value}
+        yield "done", cached
+        return
+
+    system_prompt, user_prompt = build_paraphrase_prompts(cv_text, job_title, job_description)
+    chunks = []
+
     try:
-        async with aiohttp.ClientSession() as session:
-            headers = {
-                "Authorization": f"Bearer {DEEPSEEK_TOKEN}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.3,
-                "top_p": 0.9,
-                "max_tokens": 4000,
-                "model": DEEPSEEK_MODEL
-            }
-            
-            async with session.post(
-                f"{DEEPSEEK_ENDPOINT}/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    try:
-                        # Extract JSON from response
-                        if "```json" in content:
-                            json_start = content.find("```json") + 7
-                            json_end = content.find("```", json_start)
-                            content = content[json_start:json_end].strip()
-                        elif "```" in content:
-                            json_start = content.find("```") + 3
-                            json_end = content.find("```", json_start)
-                            content = content[json_start:json_end].strip()
-                        
-                        paraphrasing = json.loads(content)
-                        paraphrasing["paraphrasing_timestamp"] = datetime.utcnow().isoformat()
-                        paraphrasing["target_job"] = job_title
-                        return paraphrasing
-                    except json.JSONDecodeError:
-                        return {
-                            "raw_paraphrasing": content,
-                            "paraphrasing_timestamp": datetime.utcnow().isoformat(),
-                            "target_job": job_title,
-                            "error": "Failed to parse structured paraphrasing"
-                        }
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"DeepSeek API error: {response.status} - {error_text}")
-                    
+        async for delta in deepseek_service.chat_completion_stream(
+            system_prompt,
+            user_prompt,
+            temperature=0.3,
+            top_p=0.9,
+            max_tokens=4000,
+            prompt_version=PARAPHRASE_PROMPT_VERSION,
+            expect_json=True,
+            force_refresh=force_refresh,
+            user_id=user_id
+        ):
+            chunks.append(delta)
+            yield "token", {"text": delta}
+            for path, value in parser.feed(delta):
+                yield "section", {"path": list(path), "value": value}
     except Exception as e:
-        print(f"Error in CV paraphrasing: {str(e)}")
-        return {
+        print(f"Error in CV paraphrasing stream: {str(e)}")
+        yield "done", {
             "error": str(e),
             "paraphrasing_timestamp": datetime.utcnow().isoformat(),
             "target_job": job_title
         }
+        return
+
+    result = format_paraphrasing_result("".join(chunks), job_title)
+    deepseek_service.remember_paraphrasing(PARAPHRASE_PROMPT_VERSION, cv_text, job_title, job_description, result)
+    yield "done", result
 
 def extract_text_from_file(file_content: bytes, filename: str) -> str:
     """Extract text from uploaded file"""
@@ -385,11 +341,6 @@ def extract_text_from_file(file_content: bytes, filename: str) -> str:
     else:
         raise ValueError(f"Unsupported file format: {file_extension}")
 
-# External API Configuration
-ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID", "demo")
-ADZUNA_APP_KEY = os.getenv("ADZUNA_APP_KEY", "demo")
-ADZUNA_BASE_URL = "https://api.adzuna.com/v1/api/jobs"
-
 # Enhanced sample data with more realistic job opportunities
 opportunities_db = [
     {
@@ -515,29 +466,17 @@ cvs_db = {}
 async def fetch_adzuna_jobs(query: str = "software developer", location: str = "us", limit: int = 10) -> Dict[str, Any]:
     """Fetch jobs from Adzuna API"""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"{ADZUNA_BASE_URL}/{location}/search/1"
-            params = {
-                "app_id": ADZUNA_APP_ID,
-                "app_key": ADZUNA_APP_KEY,
-                "results_per_page": limit,
-                "what": query,
-                "content-type": "application/json"
-            }
-            
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data
-                else:
-                    print(f"Adzuna API error: {response.status}")
-                    return {"results": []}
+        # Result pages are prefetched concurrently over the adapter's shared session
+        results = [job async for job in adzuna_service.iter_raw_jobs(query, location, limit)]
+        return {"results": results}
     except Exception as e:
         print(f"Error fetching from Adzuna: {e}")
         return {"results": []}
 
 def transform_adzuna_job(adzuna_job: Dict[str, Any]) -> Dict[str, Any]:
     """Transform Adzuna job data to our format"""
+    description = adzuna_job.get("description", "")
+    
     return {
         "opportunity_id": f"adzuna_{adzuna_job.get('id', 'unknown')}",
         "type": "job",
@@ -551,12 +490,30 @@ def transform_adzuna_job(adzuna_job: Dict[str, Any]) -> Dict[str, Any]:
         "posted_at": adzuna_job.get("created", datetime.utcnow().isoformat()),
         "salary_min": adzuna_job.get("salary_min"),
         "salary_max": adzuna_job.get("salary_max"),
-        "description": adzuna_job.get("description", "")[:200] + "...",
-        "remote_friendly": "remote" in adzuna_job.get("description", "").lower(),
+        "description": description[:200] + "...",
+        "remote_friendly": "remote" in description.lower(),
         "experience_level": "Mid-level",  # Default
         "company_size": "Unknown"
     }
 
+# Background refreshers for external data
+@app.on_event("startup")
+async def start_background_refreshers():
+    """Keep external API data warm so endpoints serve precomputed responses"""
+    hacker_news_service.start_refresher()
+    market_insights_service.start_refresher()
+    job_index_service.start_syncer()
+
+@app.on_event("shutdown")
+async def stop_background_refreshers():
+    """Stop background refreshers and close shared HTTP sessions"""
+    await hacker_news_service.close()
+    await market_insights_service.close()
+    await adzuna_service.close()
+    await job_index_service.close()
+    await cv_analysis_queue.stop()
+    await paraphrase_pregeneration_queue.stop()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -566,6 +523,17 @@ async def health_check():
         "timestamp": time.time()
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Expose basic metrics"""
+    return {
+        "llm_cache": llm_cache_service.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "semantic_cache": semantic_cache_service.stats(),
+        "cv_analysis": cv_analysis_queue.stats(),
+        "paraphrase_pregeneration": paraphrase_pregeneration_queue.stats()
+    }
+
 # Authentication endpoints
 @app.post("/api/v1/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
@@ -624,10 +592,99 @@ async def login(user_data: UserLogin):
     )
 
 # CV endpoints
+async def run_cv_analysis(
+    cv_id: str,
+    user_id: str,
+    force_refresh: bool = False,
+    analysis_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """Background job: analyze an uploaded CV and store the results"""
+    cv_info = cv_storage[cv_id]
+    
+    # Perform AI analysis focused on paraphrasing capabilities
+    user_profile = {
+        "email": "demo@example.com",
+        "full_name": "Demo User"
+    }
+    
+    ai_analysis = await analyze_cv_for_paraphrasing(
+        cv_info["extracted_text"],
+        user_profile,
+        force_refresh=force_refresh,
+        user_id=user_id,
+        mode="section_parallel" if analysis_type == "section_parallel" else None
+    )
+    
+    # Update CV with analysis results
+    cv_info.update({
+        "analysis_status": "completed" if not ai_analysis.get("error") else "completed_with_warnings",
+        "ai_analysis": ai_analysis,
+        "analysis_timestamp": datetime.utcnow().isoformat()
+    })
+    
+    # Store user's CV analysis for other endpoints, unless a newer CV replaced this one
+    if user_cv_analyses.get(user_id, {}).get("cv_id") == cv_id:
+        user_cv_analyses[user_id]["analysis"] = ai_analysis
+    
+    job_titles = ai_analysis.get("recommended_job_types", [])[:PARAPHRASE_PREGENERATE_TOP_N]
+    if PARAPHRASE_PREGENERATE_ENABLED and job_titles and not ai_analysis.get("error"):
+        paraphrase_pregeneration_queue.submit(pregenerate_paraphrases, cv_id, user_id, job_titles, job_id=cv_id)
+    
+    return {
+        "sections_identified": len(ai_analysis.get("cv_sections", {})),
+        "paraphrasing_potential": ai_analysis.get("paraphrasing_score", 0.0),
+        "optimization_areas": len(ai_analysis.get("optimization_areas", [])),
+        "has_error": bool(ai_analysis.get("error"))
+    }
+
+async def pregenerate_paraphrases(cv_id: str, user_id: str, job_titles: List[str]) -> Dict[str, Any]:
+    """Background job: paraphrase a CV for its recommended roles ahead of the user asking"""
+    cv_info = cv_storage[cv_id]
+    cv_info["pregenerated_paraphrases"] = []
+    failed = []
+
+    for job_title in job_titles:
+        if user_cv_analyses.get(user_id, {}).get("cv_id") != cv_id:
+            # A newer CV was uploaded; these paraphrases would never be used
+            break
+
+        # Same inputs the paraphrase endpoint uses, so the user's request hits the cache
+        result = await paraphrase_cv_for_job(
+            cv_info["extracted_text"],
+            job_title,
+            job_description=default_job_description(job_title),
+            user_id=user_id,
+            priority=PRIORITY_BACKGROUND
+        )
+        if result.get("error"):
+            failed.append(job_title)
+        else:
+            cv_info["pregenerated_paraphrases"].append(job_title)
+
+    return {
+        "pregenerated": cv_info["pregenerated_paraphrases"],
+        "failed": failed
+    }
+
+async def get_user_cv_analysis(user_id: str) -> Dict[str, Any]:
+    """Get the user's CV analysis, waiting for it if it's still being processed"""
+    cv_data = user_cv_analyses[user_id]
+    if cv_data["analysis"] is None:
+        try:
+            await cv_analysis_queue.wait(cv_data["cv_id"], timeout=CV_ANALYSIS_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {
+                "error": "CV analysis still in progress",
+                "analysis_status": "processing",
+                "job_id": cv_data["cv_id"]
+            }
+    return cv_data["analysis"] or {"error": "CV analysis failed"}
+
 @app.post("/api/v1/users/me/cv/upload")
 async def upload_cv(
     file: UploadFile = File(...),
-    analysis_type: str = Form("paraphrasing")
+    analysis_type: str = Form("paraphrasing"),
+    regenerate: bool = Form(False)
 ):
     """Upload CV file for AI-powered paraphrasing and job application optimization"""
     if not file.filename:
@@ -645,6 +702,30 @@ async def upload_cv(
         # Read file content
         file_content = await file.read()
         
+        user_id = "demo_user_1"  # In production, get from authentication
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        
+        # Same bytes as the current CV: reuse its record and analysis without parsing again
+        current = cv_storage.get(user_cv_analyses.get(user_id, {}).get("cv_id"))
+        if (
+            current
+            and not regenerate
+            and current.get("content_hash") == content_hash
+            and current["analysis_status"] != "failed"
+        ):
+            return {
+                "cv_id": current["cv_id"],
+                "job_id": current["cv_id"],
+                "status_url": f"/api/v1/users/me/cv/jobs/{current['cv_id']}",
+                "file_url": f"ai://analysis/{current['cv_id']}",
+                "analysis_status": current["analysis_status"],
+                "uploaded_at": current["upload_timestamp"],
+                "message": "This CV was already uploaded. Reusing its existing analysis.",
+                "ai_powered": True,
+                "paraphrasing_ready": True,
+                "deduplicated": True
+            }
+        
         # Extract text from file
         try:
             extracted_text = extract_text_from_file(file_content, file.filename)
@@ -656,7 +737,6 @@ async def upload_cv(
         
         # Generate unique CV ID
         cv_id = f"cv_{uuid.uuid4()}"
-        user_id = "demo_user_1"  # In production, get from authentication
         
         # Store CV data
         cv_storage[cv_id] = {
@@ -664,51 +744,58 @@ async def upload_cv(
             "user_id": user_id,
             "filename": file.filename,
             "extracted_text": extracted_text,
+            "content_hash": content_hash,
             "upload_timestamp": datetime.utcnow().isoformat(),
             "analysis_status": "processing"
         }
         
-        # Perform AI analysis focused on paraphrasing capabilities
-        user_profile = {
-            "email": "demo@example.com",
-            "full_name": "Demo User"
-        }
-        
-        ai_analysis = await analyze_cv_for_paraphrasing(extracted_text, user_profile)
-        
-        # Update CV with analysis results
-        cv_storage[cv_id].update({
-            "analysis_status": "completed" if not ai_analysis.get("error") else "completed_with_warnings",
-            "ai_analysis": ai_analysis,
-            "analysis_timestamp": datetime.utcnow().isoformat()
-        })
-        
-        # Store user's CV analysis for other endpoints
+        # The CV text is available for paraphrasing right away; analysis follows in the background
         user_cv_analyses[user_id] = {
             "cv_id": cv_id,
-            "analysis": ai_analysis,
+            "analysis": None,
             "upload_date": datetime.utcnow().isoformat()
         }
         
+        job_id = cv_analysis_queue.submit(run_cv_analysis, cv_id, user_id, regenerate, analysis_type, job_id=cv_id)
+        
         return {
             "cv_id": cv_id,
+            "job_id": job_id,
+            "status_url": f"/api/v1/users/me/cv/jobs/{job_id}",
             "file_url": f"ai://analysis/{cv_id}",
             "analysis_status": cv_storage[cv_id]["analysis_status"],
             "uploaded_at": cv_storage[cv_id]["upload_timestamp"],
-            "message": "CV analyzed successfully for paraphrasing capabilities!" if not ai_analysis.get("error") else "CV processed with basic analysis",
+            "message": "CV uploaded successfully. Analysis in progress.",
             "ai_powered": True,
             "paraphrasing_ready": True,
-            "analysis_summary": {
-                "sections_identified": len(ai_analysis.get("cv_sections", {})),
-                "paraphrasing_potential": ai_analysis.get("paraphrasing_score", 0.0),
-                "optimization_areas": len(ai_analysis.get("optimization_areas", [])),
-                "has_error": bool(ai_analysis.get("error"))
-            }
+            "deduplicated": False
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing CV: {str(e)}")
 
+@app.get("/api/v1/users/me/cv/jobs/{job_id}")
+async def get_cv_processing_status(job_id: str):
+    """Get the background analysis status of a CV upload"""
+    job = cv_analysis_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Processing job not found")
+    
+    cv_info = cv_storage.get(job_id, {})
+    return {
+        "job_id": job_id,
+        "cv_id": job_id,
+        "status": job["status"],
+        "analysis_status": cv_info.get("analysis_status", "failed" if job["status"] in ("failed", "cancelled") else "processing"),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "completed_at": job["completed_at"],
+        "analysis_summary": job["result"],
+        "error": job["error"]
+    }
+
 @app.get("/api/v1/users/me/cv")
 async def get_cv_analysis():
     """Get CV analysis results"""
@@ -735,15 +822,8 @@ async def get_cv_analysis():
         "ai_powered": True
     }
 
-@app.post("/api/v1/users/me/cv/paraphrase")
-async def paraphrase_cv_for_job_application(
-    job_title: str = Form(...),
-    job_description: str = Form(None),
-    company_name: str = Form(None)
-):
-    """Paraphrase CV for a specific job application using AI"""
-    user_id = "demo_user_1"  # In production, get from authentication
-    
+def get_uploaded_cv_text(user_id: str) -> str:
+    """Get the extracted text of the user's most recent CV upload"""
     if user_id not in user_cv_analyses:
         raise HTTPException(status_code=404, detail="No CV found. Please upload your CV first.")
     
@@ -753,15 +833,27 @@ async def paraphrase_cv_for_job_application(
     if cv_id not in cv_storage:
         raise HTTPException(status_code=404, detail="CV data not found")
     
-    cv_info = cv_storage[cv_id]
-    extracted_text = cv_info["extracted_text"]
+    return cv_storage[cv_id]["extracted_text"]
+
+@app.post("/api/v1/users/me/cv/paraphrase")
+async def paraphrase_cv_for_job_application(
+    job_title: str = Form(...),
+    job_description: str = Form(None),
+    company_name: str = Form(None),
+    regenerate: bool = Form(False)
+):
+    """Paraphrase CV for a specific job application using AI"""
+    user_id = "demo_user_1"  # In production, get from authentication
+    extracted_text = get_uploaded_cv_text(user_id)
     
     # Use the paraphrasing function
     try:
         paraphrasing_result = await paraphrase_cv_for_job(
             cv_text=extracted_text,
             job_title=job_title,
-            job_description=job_description or f"Position: {job_title} at {company_name or 'target company'}"
+            job_description=job_description or default_job_description(job_title, company_name),
+            force_refresh=regenerate,
+            user_id=user_id
         )
         
         paraphrasing_result["job_application_details"] = {
@@ -775,12 +867,47 @@ async def paraphrase_cv_for_job_application(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error paraphrasing CV: {str(e)}")
 
+@app.post("/api/v1/users/me/cv/paraphrase/stream")
+async def stream_paraphrase_cv_for_job_application(
+    job_title: str = Form(...),
+    job_description: str = Form(None),
+    company_name: str = Form(None),
+    regenerate: bool = Form(False)
+):
+    """Paraphrase CV for a job application, streaming progress as server-sent events"""
+    user_id = "demo_user_1"  # In production, get from authentication
+    extracted_text = get_uploaded_cv_text(user_id)
+
+    async def event_stream():
+        async for event, data in stream_paraphrase_cv_for_job(
+            cv_text=extracted_text,
+            job_title=job_title,
+            job_description=job_description or default_job_description(job_title, company_name),
+            force_refresh=regenerate,
+            user_id=user_id
+        ):
+            if event == "done":
+                data["job_application_details"] = {
+                    "target_job_title": job_title,
+                    "target_company": company_name,
+                    "job_description_provided": bool(job_description)
+                }
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/v1/users/me/cv/tailor")
 async def tailor_cv_for_job(job_description: str = Form(...)):
     """Legacy endpoint - redirects to paraphrase endpoint"""
     return await paraphrase_cv_for_job_application(
         job_title="Software Developer",  # Default
-        job_description=job_description
+        job_description=job_description,
+        company_name=None,
+        regenerate=False
     )
 
 # Recommendations endpoints
@@ -816,7 +943,7 @@ async def get_opportunities(
     
     # Get CV analysis
     cv_data = user_cv_analyses[user_id]
-    ai_analysis = cv_data["analysis"]
+    ai_analysis = await get_user_cv_analysis(user_id)
     
     if ai_analysis.get("error"):
         return {
@@ -856,6 +983,7 @@ async def get_opportunities(
                 "match_score": paraphrasing_score,
                 "required_skills": cv_sections.get("skills", {}).get("technical", [])[:5],
                 "paraphrasing_potential": paraphrasing_score,
+                "paraphrase_pregenerated": job_title in cv_storage.get(cv_data["cv_id"], {}).get("pregenerated_paraphrases", []),
                 "application_url": f"https://linkedin.com/jobs/search/?keywords={job_title.replace(' ', '%20')}",
                 "posted_at": datetime.utcnow().isoformat(),
                 "description": f"Multiple {job_title} positions available. Your CV can be effectively paraphrased for these roles.",
@@ -938,7 +1066,7 @@ async def get_skill_gaps():
     
     # Get CV analysis
     cv_data = user_cv_analyses[user_id]
-    ai_analysis = cv_data["analysis"]
+    ai_analysis = await get_user_cv_analysis(user_id)
     
     if ai_analysis.get("error"):
         return {
@@ -1107,7 +1235,7 @@ async def get_user_progress():
     
     # Get CV analysis
     cv_data = user_cv_analyses[user_id]
-    ai_analysis = cv_data["analysis"]
+    ai_analysis = await get_user_cv_analysis(user_id)
     
     if ai_analysis.get("error"):
         return {
@@ -1331,50 +1459,16 @@ async def get_career_advice():
 @app.get("/api/v1/external/industry-news")
 async def get_industry_news(limit: int = 5):
     """Get latest tech/career industry news from Hacker News API"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            # Get top stories IDs
-            async with session.get("https://hacker-news.firebaseio.com/v0/topstories.json") as response:
-                if response.status == 200:
-                    story_ids = await response.json()
-                    
-                    # Fetch details for first few stories
-                    articles = []
-                    for story_id in story_ids[:limit * 2]:  # Get more to filter tech-related
-                        try:
-                            async with session.get(f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json") as story_response:
-                                if story_response.status == 200:
-                                    story_data = await story_response.json()
-                                    if story_data and story_data.get("title") and story_data.get("url"):
-                                        # Filter for tech/career related content
-                                        title = story_data.get("title", "").lower()
-                                        if any(keyword in title for keyword in ["tech", "ai", "programming", "software", "developer", "career", "job", "startup", "code"]):
-                                            articles.append({
-                                                "id": f"hn_{story_data.get('id')}",
-                                                "title": story_data.get("title", ""),
-                                                "summary": f"Hacker News discussion with {story_data.get('descendants', 0)} comments",
-                                                "url": story_data.get("url", ""),
-                                                "published_at": datetime.fromtimestamp(story_data.get("time", 0)).isoformat() + "Z",
-                                                "source": "Hacker News",
-                                                "category": "tech_news",
-                                                "image_url": "https://via.placeholder.com/400x200?text=Hacker+News"
-                                            })
-                                            
-                                            if len(articles) >= limit:
-                                                break
-                        except Exception as e:
-                            print(f"Error fetching story {story_id}: {e}")
-                            continue
-                    
-                    if articles:
-                        return {
-                            "articles": articles,
-                            "total_available": len(articles),
-                            "last_updated": datetime.utcnow().isoformat(),
-                            "source": "hacker_news_api"
-                        }
-    except Exception as e:
-        print(f"Error fetching from Hacker News: {e}")
+    # Served from the background-refreshed article list
+    articles = await hacker_news_service.get_articles(limit)
+    
+    if articles:
+        return {
+            "articles": articles,
+            "total_available": len(articles),
+            "last_updated": hacker_news_service.last_refreshed.isoformat(),
+            "source": "hacker_news_api"
+        }
     
     # Fallback to mock news data
     news_articles = [
@@ -1440,85 +1534,8 @@ async def get_industry_news(limit: int = 5):
 @app.get("/api/v1/external/market-insights")
 async def get_market_insights():
     """Get real-time job market insights and GitHub trending data"""
-    github_data = {}
-    
-    try:
-        # Fetch trending repositories data from GitHub
-        async with aiohttp.ClientSession() as session:
-            # Get popular repositories in different tech categories
-            tech_repos = [
-                "microsoft/vscode",
-                "facebook/react",
-                "vuejs/vue",
-                "angular/angular",
-                "nodejs/node",
-                "python/cpython",
-                "golang/go",
-                "rust-lang/rust"
-            ]
-            
-            trending_skills = []
-            for repo in tech_repos[:5]:  # Limit to avoid rate limiting
-                try:
-                    async with session.get(f"https://api.github.com/repos/{repo}") as response:
-                        if response.status == 200:
-                            repo_data = await response.json()
-                            skill_name = repo.split('/')[-1].replace('-', ' ').title()
-                            if skill_name.lower() in ['vscode', 'cpython']:
-                                skill_name = {'vscode': 'VS Code', 'cpython': 'Python'}[skill_name.lower()]
-                            
-                            trending_skills.append({
-                                "skill": skill_name,
-                                "demand_change": min(0.45, repo_data.get("stargazers_count", 0) / 100000),  # Normalize
-                                "avg_salary": 95000 + (repo_data.get("stargazers_count", 0) // 1000),  # Mock salary based on popularity
-                                "github_stars": repo_data.get("stargazers_count", 0),
-                                "github_forks": repo_data.get("forks_count", 0)
-                            })
-                except Exception as e:
-                    print(f"Error fetching repo {repo}: {e}")
-                    continue
-            
-            if trending_skills:
-                github_data["trending_skills"] = trending_skills
-                
-    except Exception as e:
-        print(f"Error fetching GitHub data: {e}")
-    
-    # Combine with mock data
-    base_data = {
-        "market_overview": {
-            "total_active_jobs": 125000,
-            "growth_rate": 0.15,
-            "average_salary_increase": 0.08,
-            "remote_job_percentage": 0.42,
-            "top_hiring_companies": [
-                {"name": "Google", "open_positions": 1200},
-                {"name": "Microsoft", "open_positions": 980},
-                {"name": "Amazon", "open_positions": 1500},
-                {"name": "Apple", "open_positions": 750},
-                {"name": "Meta", "open_positions": 650}
-            ]
-        },
-        "trending_skills": github_data.get("trending_skills", [
-            {"skill": "React", "demand_change": 0.25, "avg_salary": 95000},
-            {"skill": "Python", "demand_change": 0.30, "avg_salary": 105000},
-            {"skill": "TypeScript", "demand_change": 0.35, "avg_salary": 92000},
-            {"skill": "AWS", "demand_change": 0.40, "avg_salary": 110000},
-            {"skill": "Docker", "demand_change": 0.28, "avg_salary": 98000}
-        ]),
-        "location_insights": [
-            {"city": "San Francisco", "avg_salary": 145000, "job_count": 15000, "cost_of_living_index": 1.8},
-            {"city": "Seattle", "avg_salary": 125000, "job_count": 12000, "cost_of_living_index": 1.4},
-            {"city": "New York", "avg_salary": 135000, "job_count": 18000, "cost_of_living_index": 1.7},
-            {"city": "Austin", "avg_salary": 110000, "job_count": 8000, "cost_of_living_index": 1.1},
-            {"city": "Remote", "avg_salary": 115000, "job_count": 25000, "cost_of_living_index": 1.0}
-        ],
-        "generated_at": datetime.utcnow().isoformat(),
-        "data_freshness": "real-time" if github_data else "mixed",
-        "data_sources": ["github_api", "internal"] if github_data else ["internal"]
-    }
-    
-    return base_data
+    # Served from the snapshot kept warm by the background refresher
+    return await market_insights_service.get_insights()
 
 # Injection endpoints for job data ingestion
 @app.get("/api/v1/ingestion/config")
@@ -1666,6 +1683,29 @@ async def search_jobs(
 ):
     """Search for real job listings using JSearch API"""
     try:
+        # Answer from the local index of ingested postings, using the paid API only for sparse results
+        if not job_requirements:
+            local_result = job_index_service.search(
+                query=query,
+                location=location,
+                remote_jobs_only=remote_jobs_only,
+                employment_types=employment_types,
+                page=page,
+                limit=limit
+            )
+            
+            if not job_index_service.is_sparse(local_result, limit):
+                return {
+                    "success": True,
+                    "message": local_result["message"],
+                    "jobs": local_result["data"],
+                    "total_results": local_result["total_results"],
+                    "parameters": local_result["parameters"],
+                    "page": page,
+                    "limit": limit,
+                    "api_source": "Local Index"
+                }
+        
         # Import the JSearch service
         import sys
         import os
@@ -2,21 +2,52 @@
 Structured data extraction from CV text using NLP
 """
 import re
-import spacy
 from typing import Dict, List, Optional
 import logging
 
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
 logger = logging.getLogger(__name__)
 
+# Section headers mapped to canonical section names
+SECTION_HEADERS = {
+    "summary": "summary",
+    "professional summary": "summary",
+    "profile": "summary",
+    "objective": "summary",
+    "about": "summary",
+    "about me": "summary",
+    "experience": "experience",
+    "work experience": "experience",
+    "employment": "experience",
+    "employment history": "experience",
+    "professional experience": "experience",
+    "skills": "skills",
+    "technical skills": "skills",
+    "competencies": "skills",
+    "technologies": "skills",
+    "education": "education",
+    "academic background": "education",
+    "qualifications": "education",
+    "projects": "projects",
+    "certifications": "certifications",
+    "achievements": "achievements",
+    "awards": "achievements"
+}
+
 
 class CVExtractor:
     def __init__(self):
         try:
             # Load spaCy model
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = spacy.load("en_core_web_sm") if spacy else None
         except OSError:
-            logger.warning("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
             self.nlp = None
+        if self.nlp is None:
+            logger.warning("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
         
         self.skill_keywords = self._load_skill_keywords()
     
@@ -53,6 +84,42 @@ class CVExtractor:
                 "total_skills": 0
             }
     
+    def extract_sections(self, text: str) -> Dict[str, str]:
+        """
+        Split CV text into canonical sections, preserving line breaks
+
+        Text before the first recognised header is returned as "header".
+        """
+        sections: Dict[str, List[str]] = {}
+        current = "header"
+        previous_blank = True
+        
+        for line in text.splitlines():
+            stripped = line.strip()
+            header = stripped.rstrip(':').strip().lower()
+            if header in SECTION_HEADERS:
+                current = SECTION_HEADERS[header]
+                previous_blank = False
+                continue
+            
+            # Headers followed by content on the same line, e.g. "Skills: Python, SQL", count
+            # only where a heading can start: in the header block, after a blank line, or in
+            # capitals; "Experience: 5 years of AWS" inside another section is content
+            if ':' in stripped:
+                prefix, rest = stripped.split(':', 1)
+                prefix = prefix.strip()
+                if (
+                    prefix.lower() in SECTION_HEADERS and rest.strip() and prefix[0].isupper()
+                    and (current == "header" or previous_blank or prefix.isupper())
+                ):
+                    current = SECTION_HEADERS[prefix.lower()]
+                    stripped = rest.strip()
+            
+            previous_blank = not stripped
+            sections.setdefault(current, []).append(stripped)
+        
+        return {name: '\n'.join(lines).strip() for name, lines in sections.items() if any(lines)}
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove excessive whitespace
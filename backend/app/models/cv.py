@@ -21,9 +21,10 @@ class CVFile(Base):
     file_name = Column(String(255), nullable=False)
     file_type = Column(String(10), nullable=False)  # pdf, docx
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the file bytes, for deduplicating re-uploads
     
     # Processing status
-    analysis_status = Column(String(20), default="processing")  # processing, completed, failed
+    analysis_status = Column(String(20), default="processing")  # processing, enriching, completed, failed
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
     analysis_date = Column(DateTime(timezone=True))
     
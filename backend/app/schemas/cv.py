@@ -13,6 +13,44 @@ class CVUploadResponse(BaseModel):
     uploaded_at: str
     message: Optional[str] = None
     estimated_completion: Optional[str] = None
+    job_id: Optional[str] = None
+    status_url: Optional[str] = None
+    deduplicated: bool = False
+
+
+class CVUploadURLRequest(BaseModel):
+    file_name: str
+    content_type: str
+    file_size: int
+    content_hash: Optional[str] = None  # SHA-256 hex, lets identical re-uploads skip the upload
+
+
+class CVUploadURLResponse(BaseModel):
+    deduplicated: bool = False
+    upload_url: Optional[str] = None
+    method: Optional[str] = None
+    headers: Optional[Dict[str, str]] = None
+    file_url: Optional[str] = None
+    expires_at: Optional[str] = None
+    cv_id: Optional[str] = None
+    analysis_status: Optional[str] = None
+
+
+class CVFinalizeUploadRequest(BaseModel):
+    file_url: str
+    file_name: str
+    analysis_type: str = "full"
+
+
+class CVProcessingStatusResponse(BaseModel):
+    job_id: str
+    cv_id: str
+    status: str
+    analysis_status: str
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    error: Optional[str] = None
 
 
 class CVAnalysisResponse(BaseModel):
@@ -21,6 +59,7 @@ class CVAnalysisResponse(BaseModel):
     uploaded_at: str
     analysis_status: str
     analysis_date: Optional[str] = None
+    download_url: Optional[str] = None
     extracted_data: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
     error: Optional[Dict[str, str]] = None
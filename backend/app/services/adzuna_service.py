@@ -0,0 +1,208 @@
+"""
+Adzuna API Service for fetching job listings
+"""
+import os
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Any
+from datetime import datetime
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Adzuna contract fields mapped to the employment types used by JSearch
+EMPLOYMENT_TYPES = {
+    "full_time": "FULLTIME",
+    "part_time": "PARTTIME",
+    "contract": "CONTRACTOR"
+}
+
+COUNTRY_CURRENCIES = {
+    "us": "USD",
+    "gb": "GBP",
+    "ca": "CAD",
+    "au": "AUD",
+    "de": "EUR",
+    "fr": "EUR",
+    "nl": "EUR",
+    "in": "INR"
+}
+
+
+class AdzunaService:
+    """Service for interacting with the Adzuna jobs API"""
+
+    def __init__(self):
+        self.app_id = os.getenv("ADZUNA_APP_ID", "demo")
+        self.app_key = os.getenv("ADZUNA_APP_KEY", "demo")
+        self.base_url = os.getenv("ADZUNA_BASE_URL", "https://api.adzuna.com/v1/api/jobs")
+        self.max_pages = int(os.getenv("ADZUNA_MAX_PAGES", "5"))
+        self.max_results_per_page = 50  # Adzuna API limit
+        self.max_concurrency = int(os.getenv("ADZUNA_MAX_CONCURRENCY", "5"))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=15),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+        return self._session
+
+    async def fetch_page(
+        self,
+        query: str,
+        country: str = "us",
+        page: int = 1,
+        results_per_page: int = 10,
+        where: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch a single page of raw Adzuna results"""
+        params = {
+            "app_id": self.app_id,
+            "app_key": self.app_key,
+            "results_per_page": results_per_page,
+            "what": query,
+            "content-type": "application/json"
+        }
+        if where:
+            params["where"] = where
+
+        try:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}/{country}/search/{page}", params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return data.get("results", [])
+
+                logger.error(f"Adzuna API error: {response.status}")
+                return []
+        except Exception as e:
+            logger.error(f"Error fetching Adzuna page {page}: {str(e)}")
+            return []
+
+    async def iter_raw_jobs(
+        self,
+        query: str,
+        country: str = "us",
+        limit: int = 10,
+        where: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream raw Adzuna jobs, prefetching result pages concurrently
+
+        Pages are requested up front and yielded in page order as they
+        arrive, stopping once `limit` jobs have been produced.
+        """
+        results_per_page = min(limit, self.max_results_per_page)
+        num_pages = min(self.max_pages, -(-limit // results_per_page))
+
+        tasks = [
+            asyncio.create_task(self.fetch_page(query, country, page, results_per_page, where))
+            for page in range(1, num_pages + 1)
+        ]
+
+        yielded = 0
+        try:
+            for task in tasks:
+                results = await task
+                for job in results:
+                    yield job
+                    yielded += 1
+                    if yielded >= limit:
+                        return
+
+                # A short page means there are no more results
+                if len(results) < results_per_page:
+                    return
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_jobs(
+        self,
+        query: str,
+        country: str = "us",
+        limit: int = 10,
+        where: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream jobs transformed to our application schema"""
+        currency = COUNTRY_CURRENCIES.get(country.lower())
+        async for job in self.iter_raw_jobs(query, country, limit, where):
+            try:
+                yield self._format_job(job, currency)
+            except Exception as e:
+                logger.error(f"Error formatting Adzuna job: {str(e)}")
+                continue
+
+    async def search_jobs(
+        self,
+        query: str,
+        country: str = "us",
+        limit: int = 10,
+        where: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Search for jobs using the Adzuna API
+
+        Args:
+            query: Job search query (e.g., "Python developer")
+            country: Adzuna country code (e.g., "us", "gb")
+            limit: Maximum number of jobs to return
+            where: Location filter within the country
+
+        Returns:
+            Dictionary containing job search results
+        """
+        jobs = [job async for job in self.iter_jobs(query, country, limit, where)]
+        return {
+            "status": "success",
+            "message": "Jobs fetched successfully",
+            "data": jobs,
+            "parameters": {"query": query, "country": country, "where": where},
+            "total_results": len(jobs)
+        }
+
+    async def close(self):
+        """Close the shared session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _format_job(self, job: Dict[str, Any], currency: Optional[str] = None) -> Dict[str, Any]:
+        """Format an Adzuna job to match the JSearch job schema"""
+        description = job.get("description") or ""
+        contract = job.get("contract_type") if job.get("contract_type") == "contract" else job.get("contract_time")
+
+        return {
+            "id": f"adzuna_{job.get('id', 'unknown')}",
+            "title": job.get("title", ""),
+            "company": (job.get("company") or {}).get("display_name", ""),
+            "location": (job.get("location") or {}).get("display_name", "Not specified"),
+            "description": description,
+            "employment_type": EMPLOYMENT_TYPES.get(contract, ""),
+            "remote": "remote" in description.lower(),
+            "salary": {
+                "min": job.get("salary_min"),
+                "max": job.get("salary_max"),
+                "currency": currency,
+                "period": "YEAR" if job.get("salary_min") or job.get("salary_max") else None
+            },
+            "posted_date": job.get("created", ""),
+            "apply_url": job.get("redirect_url", ""),
+            "source": "Adzuna API",
+            "company_logo": "",
+            "job_highlights": {},
+            "job_benefits": [],
+            "required_experience": {},
+            "required_skills": [],
+            "publisher": "Adzuna",
+            "expires_at": "",
+            "created_at": datetime.utcnow().isoformat()
+        }
+
+
+# Global instance
+adzuna_service = AdzunaService()
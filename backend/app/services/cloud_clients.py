@@ -0,0 +1,147 @@
+"""
+Process-wide registry of Google Cloud SDK clients, created on first use
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CloudClientRegistry:
+    """
+    Lazily creates and shares heavy SDK clients
+
+    Each client is built by its registered factory the first time it is
+    asked for, and the SDK module is only imported inside that factory, so
+    an instance that never touches e.g. Pub/Sub never pays to import it or
+    open its gRPC channel. Creation is serialised so concurrent first uses
+    share a single client.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._clients: Dict[str, Any] = {}
+        self._init_seconds: Dict[str, float] = {}
+        # Re-entrant: some factories depend on other clients (e.g. aiplatform.init)
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register (or replace) the factory for a client"""
+        with self._lock:
+            self._factories[name] = factory
+            self._clients.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the shared client, creating it on first use"""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if name in self._clients:
+                return self._clients[name]
+            if name not in self._factories:
+                raise KeyError(f"Unknown cloud client: {name}")
+
+            started = time.perf_counter()
+            client = self._factories[name]()
+            self._init_seconds[name] = time.perf_counter() - started
+            self._clients[name] = client
+
+        logger.info(f"Initialised {name} client in {self._init_seconds[name] * 1000:.0f}ms")
+        return client
+
+    def is_initialised(self, name: str) -> bool:
+        return name in self._clients
+
+    def reset(self, name: Optional[str] = None):
+        """Drop created clients (all of them if no name), e.g. after a fork"""
+        with self._lock:
+            if name is None:
+                self._clients.clear()
+                self._init_seconds.clear()
+            else:
+                self._clients.pop(name, None)
+                self._init_seconds.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": sorted(self._factories),
+            "initialised": {name: round(seconds * 1000, 1) for name, seconds in self._init_seconds.items()}
+        }
+
+
+def _storage_client():
+    from google.cloud import storage
+    return storage.Client()
+
+
+def _bigquery_client():
+    from google.cloud import bigquery
+    return bigquery.Client()
+
+
+def _pubsub_publisher():
+    from google.cloud import pubsub_v1
+    from app.config import settings
+    return pubsub_v1.PublisherClient(
+        batch_settings=pubsub_v1.types.BatchSettings(
+            max_messages=settings.PUBSUB_BATCH_MAX_MESSAGES,
+            max_bytes=settings.PUBSUB_BATCH_MAX_BYTES,
+            max_latency=settings.PUBSUB_BATCH_MAX_LATENCY
+        )
+    )
+
+
+def _pubsub_subscriber():
+    from google.cloud import pubsub_v1
+    return pubsub_v1.SubscriberClient()
+
+
+def _metric_client():
+    from google.cloud import monitoring_v3
+    return monitoring_v3.MetricServiceClient()
+
+
+def _alert_policy_client():
+    from google.cloud import monitoring_v3
+    return monitoring_v3.AlertPolicyServiceClient()
+
+
+def _logging_client():
+    from google.cloud import logging as cloud_logging
+    client = cloud_logging.Client()
+    # Route standard logging to Cloud Logging once per process
+    client.setup_logging()
+    return client
+
+
+def _aiplatform():
+    from google.cloud import aiplatform
+    from app.config import settings
+    aiplatform.init(project=settings.GCP_PROJECT_ID, location=settings.GCP_REGION)
+    return aiplatform
+
+
+def _vertex_prediction_client():
+    from google.cloud.aiplatform import gapic as aip
+    from app.config import settings
+    cloud_clients.get("aiplatform")
+    return aip.PredictionServiceClient(
+        client_options={"api_endpoint": f"{settings.GCP_REGION}-aiplatform.googleapis.com"}
+    )
+
+
+# Global instance
+cloud_clients = CloudClientRegistry()
+cloud_clients.register("storage", _storage_client)
+cloud_clients.register("bigquery", _bigquery_client)
+cloud_clients.register("pubsub_publisher", _pubsub_publisher)
+cloud_clients.register("pubsub_subscriber", _pubsub_subscriber)
+cloud_clients.register("monitoring", _metric_client)
+cloud_clients.register("monitoring_alerts", _alert_policy_client)
+cloud_clients.register("logging", _logging_client)
+cloud_clients.register("aiplatform", _aiplatform)
+cloud_clients.register("vertex_prediction", _vertex_prediction_client)
@@ -0,0 +1,230 @@
+"""
+Incremental CV re-analysis: only sections that changed since the last upload go back to the LLM
+"""
+import copy
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+
+from .deepseek_service import deepseek_service, extract_json
+from .prompt_builder import prompt_builder
+from .section_analysis_service import analyze_cv_section, clean_section_text
+
+logger = logging.getLogger(__name__)
+
+REANALYSIS_PROMPT_VERSION = "cv-reanalysis-v1"
+
+REANALYSIS_SYSTEM_PROMPT = (
+    "You are an expert career advisor and CV analyst. Use only what the input states, "
+    "never invent skills or experience, and reply with JSON only."
+)
+
+# Groups of extracted CV sections, and the career analysis keys each group produces
+ANALYSIS_GROUPS = {
+    "skills": {
+        "sources": ["skills"],
+        "task": "Categorise these CV skills and estimate proficiency for each.",
+        "schema": {"skills": {"technical": ["str"], "soft": ["str"], "proficiency_levels": {"skill": "beginner|intermediate|advanced|expert"}}},
+        "empty": {"skills": {"technical": [], "soft": [], "proficiency_levels": {}}}
+    },
+    "experience": {
+        "sources": ["experience", "projects"],
+        "task": "Summarise this CV work experience.",
+        "schema": {"experience": {"years": "int", "level": "entry|mid|senior|lead", "roles": ["str"]}},
+        "empty": {"experience": {"years": 0, "level": None, "roles": []}}
+    },
+    "education": {
+        "sources": ["education", "certifications", "achievements"],
+        "task": "List the degrees and certifications in this CV section.",
+        "schema": {"education": {"degrees": ["str"], "certifications": ["str"]}},
+        "empty": {"education": {"degrees": [], "certifications": []}}
+    }
+}
+
+# Whole-CV judgements, recomputed only when the facts they depend on change
+OVERVIEW_SCHEMA = {
+    "strengths": ["str"],
+    "improvement_areas": ["str"],
+    "career_paths": ["str"],
+    "readiness_score": "0-1",
+    "recommendations": ["str"]
+}
+
+GROUPED_SOURCES = {source for group in ANALYSIS_GROUPS.values() for source in group["sources"]}
+
+
+class CVReanalysisService:
+    """
+    Re-analyzes an edited CV by diffing its sections against the previous upload
+
+    Each section group is hashed; only groups whose text changed get a small
+    LLM call, and the previous output is carried forward for the rest. The
+    whole-CV overview is only regenerated when the profile text or the
+    extracted facts (skills, experience, degrees) change, so a typo fix
+    costs one small call instead of a full analysis.
+    """
+
+    def __init__(self):
+        self.max_tokens_per_group = 800
+        self.group_token_budget = prompt_builder.token_budget // 2
+
+    def section_hashes(self, cv_text: str) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Hash each section group of a CV, returning (hashes, group texts)"""
+        sections = prompt_builder.extractor.extract_sections(cv_text)
+        texts = {
+            name: clean_section_text("\n".join(sections.get(source, "") for source in group["sources"]))
+            for name, group in ANALYSIS_GROUPS.items()
+        }
+        # Everything outside the groups (header, summary, unrecognised sections) feeds the overview
+        texts["profile"] = clean_section_text("\n".join(text for name, text in sections.items() if name not in GROUPED_SOURCES))
+        return {name: _hash(text.lower()) for name, text in texts.items()}, texts
+
+    async def analyze(
+        self,
+        cv_text: str,
+        user_profile: Optional[Dict[str, Any]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+        force_refresh: bool = False,
+        user_id: str = "anonymous"
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Analyze a CV, reusing the previous extraction's AI output where sections are unchanged
+
+        Returns (ai_analysis, info) where info holds the section hashes to store
+        with the new extraction and which groups were re-analyzed or reused.
+        """
+        hashes, texts = self.section_hashes(cv_text)
+        previous = previous or {}
+        previous_hashes = previous.get("section_hashes") or {}
+        previous_analysis = previous.get("ai_analysis") or {}
+
+        changed = [name for name in ANALYSIS_GROUPS if hashes[name] != previous_hashes.get(name)]
+        can_reuse = (
+            previous_hashes
+            and previous_analysis
+            and not previous_analysis.get("error")
+            and not force_refresh
+            and len(changed) < len(ANALYSIS_GROUPS)  # if everything changed, one full call is cheaper
+        )
+        if not can_reuse:
+            return await self._full_analysis(cv_text, user_profile, hashes, force_refresh, user_id)
+
+        analysis = copy.deepcopy(previous_analysis)
+        results = await asyncio.gather(
+            *(self._analyze_group(name, texts[name], force_refresh, user_id) for name in changed),
+            return_exceptions=True
+        )
+        for name, result in zip(changed, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Incremental analysis of {name} failed, running full analysis: {str(result)}")
+                return await self._full_analysis(cv_text, user_profile, hashes, force_refresh, user_id)
+            analysis.update(result)
+
+        reanalyzed = list(changed)
+        hashes["overview"] = self._overview_hash(hashes["profile"], analysis)
+        if hashes["overview"] != previous_hashes.get("overview"):
+            try:
+                analysis.update(await self._analyze_overview(texts["profile"], analysis, user_profile, force_refresh, user_id))
+                reanalyzed.append("overview")
+            except Exception as e:
+                logger.warning(f"Incremental overview failed, running full analysis: {str(e)}")
+                return await self._full_analysis(cv_text, user_profile, hashes, force_refresh, user_id)
+
+        analysis["analysis_timestamp"] = datetime.utcnow().isoformat()
+        reused = [name for name in list(ANALYSIS_GROUPS) + ["overview"] if name not in reanalyzed]
+        logger.info(f"Incremental CV analysis for {user_id}: re-analyzed {reanalyzed}, reused {reused}")
+        return analysis, {"section_hashes": hashes, "reanalyzed_sections": reanalyzed, "reused_sections": reused}
+
+    async def _full_analysis(
+        self,
+        cv_text: str,
+        user_profile: Optional[Dict[str, Any]],
+        hashes: Dict[str, str],
+        force_refresh: bool,
+        user_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        analysis = await deepseek_service.analyze_cv(cv_text, user_profile, force_refresh=force_refresh, user_id=user_id)
+        hashes["overview"] = self._overview_hash(hashes["profile"], analysis)
+        return analysis, {"section_hashes": hashes, "reanalyzed_sections": ["full"], "reused_sections": []}
+
+    async def _analyze_group(self, name: str, text: str, force_refresh: bool, user_id: str) -> Dict[str, Any]:
+        group = ANALYSIS_GROUPS[name]
+        if not text:
+            # Section removed from the CV: clear its output rather than asking the model about nothing
+            return copy.deepcopy(group["empty"])
+
+        result = await analyze_cv_section(
+            name,
+            text,
+            group["task"],
+            group["schema"],
+            system_prompt=REANALYSIS_SYSTEM_PROMPT,
+            prompt_version=f"{REANALYSIS_PROMPT_VERSION}:{name}",
+            max_tokens=self.max_tokens_per_group,
+            token_budget=self.group_token_budget,
+            force_refresh=force_refresh,
+            user_id=user_id
+        )
+        return {key: result.get(key, copy.deepcopy(empty)) for key, empty in group["empty"].items()}
+
+    async def _analyze_overview(
+        self,
+        profile_text: str,
+        analysis: Dict[str, Any],
+        user_profile: Optional[Dict[str, Any]],
+        force_refresh: bool,
+        user_id: str
+    ) -> Dict[str, Any]:
+        """Regenerate the whole-CV judgements from the profile text and the per-section outputs"""
+        facts = {key: analysis.get(key) for group in ANALYSIS_GROUPS.values() for key in group["schema"]}
+        profile = "; ".join(f"{key}: {value}" for key, value in (user_profile or {}).items() if value)
+        user_prompt = (
+            "Assess this candidate's career readiness from their CV profile and extracted facts. "
+            "Reply with JSON matching:\n"
+            f"{json.dumps(OVERVIEW_SCHEMA, separators=(',', ':'))}\n\n"
+            + (f"USER PROFILE: {profile}\n" if profile else "")
+            + f"CV PROFILE:\n{prompt_builder.truncate(profile_text, self.group_token_budget) or 'Not provided'}\n\n"
+            f"EXTRACTED FACTS:\n{json.dumps(facts, separators=(',', ':'))}"
+        )
+        content = await deepseek_service.chat_completion(
+            REANALYSIS_SYSTEM_PROMPT,
+            user_prompt,
+            temperature=0.2,
+            top_p=0.8,
+            max_tokens=self.max_tokens_per_group,
+            prompt_version=f"{REANALYSIS_PROMPT_VERSION}:overview",
+            expect_json=True,
+            force_refresh=force_refresh,
+            user_id=user_id
+        )
+        result = extract_json(content)
+        if not isinstance(result, dict):
+            raise ValueError("Overview analysis did not return a JSON object")
+        return {key: result[key] for key in OVERVIEW_SCHEMA if key in result}
+
+    @staticmethod
+    def _overview_hash(profile_hash: str, analysis: Dict[str, Any]) -> str:
+        """Hash the inputs the overview depends on, ignoring wording differences between runs"""
+        skills = analysis.get("skills") or {}
+        experience = analysis.get("experience") or {}
+        education = analysis.get("education") or {}
+        signature = {
+            "profile": profile_hash,
+            "skills": sorted(
+                str(skill).lower() for skill in (skills.get("technical") or []) + (skills.get("soft") or [])
+            ),
+            "experience": [experience.get("years"), str(experience.get("level", "")).lower()],
+            "degrees": sorted(str(degree).lower() for degree in education.get("degrees") or [])
+        }
+        return _hash(json.dumps(signature, sort_keys=True))
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Global instance
+cv_reanalysis_service = CVReanalysisService()
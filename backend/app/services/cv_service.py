@@ -3,16 +3,37 @@ CV processing service
 """
 import os
 import uuid
-from typing import Optional
+import asyncio
+from typing import Any, Dict, Optional, Tuple
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from datetime import datetime
 
+from app.config import settings
+from app.database import SessionLocal
 from app.models.cv import CVFile, CVExtraction
 from app.models.user import User, UserSkill
 from app.ml.cv_processing.parser import CVParser
 from app.ml.cv_processing.extractor import CVExtractor
-from app.utils.storage import StorageService
+from app.utils.storage import StorageService, FileTooLargeError, hash_upload, hash_file
+from app.services.job_queue import BackgroundJobQueue
+from app.services.websocket_service import notification_service
+from app.services.recommendation_updates import recommendation_update_coalescer
+
+# Re-uploads of the same bytes in these states reuse the existing record and analysis
+DEDUPLICATABLE_STATUSES = ("processing", "completed")
+
+# Bounded worker pool so CV processing doesn't run inside upload requests
+cv_processing_queue = BackgroundJobQueue("cv_processing", workers=settings.MAX_CONCURRENT_CV_PROCESSING)
+
+
+async def process_cv_job(cv_id: str, analysis_type: str = "full", notify_failure: bool = True) -> Dict[str, Any]:
+    """Process an uploaded CV in its own database session"""
+    db = SessionLocal()
+    try:
+        return await CVService(db).process_cv_background(cv_id, analysis_type, notify_failure)
+    finally:
+        db.close()
 
 
 class CVService:
@@ -27,32 +48,132 @@ class CVService:
         user_id: uuid.UUID,
         file: UploadFile,
         analysis_type: str = "full"
-    ) -> CVFile:
-        """Upload CV file and start processing"""
+    ) -> Tuple[CVFile, bool]:
+        """
+        Upload CV file and queue it for background processing
+
+        Returns (cv_record, deduplicated). An upload byte-identical to the
+        user's current CV skips storage and analysis and returns that record.
+        """
+        
+        # Hash (and size-check) the upload first so duplicates skip storage entirely
+        content_hash, _ = await hash_upload(file, max_size=settings.MAX_FILE_SIZE)
         
-        # Generate unique filename
-        file_extension = file.filename.split('.')[-1].lower()
-        unique_filename = f"{user_id}_{uuid.uuid4()}.{file_extension}"
+        duplicate = self._find_duplicate(user_id, content_hash)
+        if duplicate:
+            return duplicate, True
         
-        # Upload to cloud storage
-        file_url = await self.storage_service.upload_file(
+        # Stream to cloud storage
+        upload = await self.storage_service.upload_stream(
             file=file,
-            filename=unique_filename,
-            folder="cvs"
+            filename=self._object_name(user_id, file.filename),
+            folder="cvs",
+            max_size=settings.MAX_FILE_SIZE
+        )
+        
+        cv_record = self._create_cv_record(
+            user_id, upload.file_url, file.filename, upload.size, upload.content_hash, analysis_type
+        )
+        return cv_record, False
+    
+    async def create_upload_url(
+        self,
+        user_id: uuid.UUID,
+        file_name: str,
+        content_type: str,
+        file_size: int,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Issue a signed URL for uploading a CV straight to the bucket
+
+        If the client sends the file's SHA-256 and it matches the user's
+        current CV, no URL is issued and the existing record is returned.
+        """
+        if file_size > settings.MAX_FILE_SIZE:
+            raise FileTooLargeError(settings.MAX_FILE_SIZE)
+        
+        duplicate = self._find_duplicate(user_id, content_hash) if content_hash else None
+        if duplicate:
+            return {"deduplicated": True, "cv_record": duplicate}
+        
+        upload = await self.storage_service.generate_upload_url(
+            filename=self._object_name(user_id, file_name),
+            folder="cvs",
+            content_type=content_type,
+            max_size=settings.MAX_FILE_SIZE
         )
+        return {"deduplicated": False, **upload}
+    
+    async def finalize_upload(
+        self,
+        user_id: uuid.UUID,
+        file_url: str,
+        file_name: str,
+        analysis_type: str = "full"
+    ) -> Tuple[CVFile, bool]:
+        """
+        Register a CV uploaded through a signed URL and queue it for processing
+
+        Returns (cv_record, deduplicated); finalizing the same object twice
+        returns the existing record.
+        """
+        if not file_url.startswith(f"gs://{self.storage_service.bucket_name}/cvs/{user_id}_"):
+            raise PermissionError("Upload does not belong to this user")
+        
+        existing_cv = self.get_user_cv(user_id)
+        if existing_cv and existing_cv.file_url == file_url:
+            return existing_cv, True
+        
+        file_info = await self.storage_service.get_file_info(file_url)
+        if file_info is None:
+            raise FileNotFoundError("Uploaded file not found; upload it to the signed URL first")
+        if file_info["size"] > settings.MAX_FILE_SIZE:
+            await self.storage_service.delete_file(file_url)
+            raise FileTooLargeError(settings.MAX_FILE_SIZE)
         
-        # Create CV record
+        # The hash is filled in by the worker once it has downloaded the file
+        cv_record = self._create_cv_record(user_id, file_url, file_name, file_info["size"], None, analysis_type)
+        return cv_record, False
+    
+    def _find_duplicate(self, user_id: uuid.UUID, content_hash: str) -> Optional[CVFile]:
+        """The user's current CV if it has the same content and isn't failed"""
+        existing_cv = self.get_user_cv(user_id)
+        if (
+            existing_cv
+            and existing_cv.content_hash == content_hash
+            and existing_cv.analysis_status in DEDUPLICATABLE_STATUSES
+        ):
+            return existing_cv
+        return None
+    
+    @staticmethod
+    def _object_name(user_id: uuid.UUID, file_name: str) -> str:
+        file_extension = file_name.split('.')[-1].lower()
+        return f"{user_id}_{uuid.uuid4()}.{file_extension}"
+    
+    def _create_cv_record(
+        self,
+        user_id: uuid.UUID,
+        file_url: str,
+        file_name: str,
+        file_size: int,
+        content_hash: Optional[str],
+        analysis_type: str
+    ) -> CVFile:
+        """Replace the user's CV record and queue the new one for processing"""
         cv_record = CVFile(
             user_id=user_id,
             file_url=file_url,
-            file_name=file.filename,
-            file_type=file_extension,
-            file_size=len(await file.read()),
+            file_name=file_name,
+            file_type=file_name.split('.')[-1].lower(),
+            file_size=file_size,
+            content_hash=content_hash,
             analysis_status="processing"
         )
         
         # Delete existing CV for user
-        existing_cv = self.db.query(CVFile).filter(CVFile.user_id == user_id).first()
+        existing_cv = self.get_user_cv(user_id)
         if existing_cv:
             self.db.delete(existing_cv)
         
@@ -60,17 +181,53 @@ class CVService:
         self.db.commit()
         self.db.refresh(cv_record)
         
-        # Start async processing
-        await self._process_cv_async(cv_record, analysis_type)
+        # Process on the worker pool; the CV id doubles as the job id
+        cv_processing_queue.submit(process_cv_job, str(cv_record.cv_id), analysis_type, job_id=str(cv_record.cv_id))
         
         return cv_record
     
+    async def process_cv_background(self, cv_id: str, analysis_type: str = "full", notify_failure: bool = True) -> Dict[str, Any]:
+        """
+        Process a stored CV and notify the user when done
+
+        Callers that retry failures pass notify_failure=False and report the
+        final failure themselves, so the user isn't told once per attempt.
+        """
+        cv_record = self.db.query(CVFile).filter(CVFile.cv_id == uuid.UUID(str(cv_id))).first()
+        if not cv_record:
+            raise ValueError(f"CV {cv_id} not found")
+        
+        await self._process_cv_async(cv_record, analysis_type)
+        
+        success = cv_record.analysis_status == "completed"
+        extracted_data = cv_record.extraction.extracted_data if success and cv_record.extraction else None
+        if success or notify_failure:
+            await notification_service.notify_cv_processing_complete(
+                str(cv_record.user_id), str(cv_record.cv_id), success, extracted_data
+            )
+        if success:
+            recommendation_update_coalescer.request(str(cv_record.user_id), "cv_updated")
+        
+        return {
+            "cv_id": str(cv_record.cv_id),
+            "analysis_status": cv_record.analysis_status,
+            "error": cv_record.error_message
+        }
+    
+    def get_processing_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the background processing status for an upload"""
+        return cv_processing_queue.get_job(job_id)
+    
     async def _process_cv_async(self, cv_record: CVFile, analysis_type: str):
         """Process CV asynchronously"""
         try:
             # Download file from storage
             file_path = await self.storage_service.download_file(cv_record.file_url)
             
+            # Direct-to-bucket uploads are hashed here rather than on the API server
+            if not cv_record.content_hash:
+                cv_record.content_hash = await asyncio.to_thread(hash_file, file_path)
+            
             # Extract text
             raw_text = self.cv_parser.extract_text(file_path)
             
@@ -4,130 +4,351 @@ DeepSeek AI Service for CV Paraphrasing and Job Application Optimization
 import os
 import json
 import asyncio
-from typing import Dict, List, Optional, Any
+import textwrap
+from typing import AsyncIterator, Dict, List, Optional, Any
 import aiohttp
 from datetime import datetime
 
+from .llm_cache_service import llm_cache_service
+from .llm_gateway import llm_gateway, estimate_tokens, PRIORITY_INTERACTIVE
+from .prompt_builder import prompt_builder
+from .semantic_cache_service import semantic_cache_service
+
+# Bump when the corresponding system prompt changes so cached results are not reused
+CV_ANALYSIS_PROMPT_VERSION = "cv-analysis-v1"
+PARAPHRASE_PROMPT_VERSION = "paraphrase-v2"
+COVER_LETTER_PROMPT_VERSION = "cover-letter-v1"
+
+PARAPHRASE_SYSTEM_PROMPT = """
+You are an expert CV writer and career coach specializing in tailoring CVs for specific job applications.
+Your task is to paraphrase and optimize CV content to better align with the target job while maintaining truthfulness.
+
+Guidelines:
+1. Keep all factual information accurate - do not fabricate experience or skills
+2. Reword descriptions to highlight relevant experience for the target role
+3. Emphasize transferable skills that match the job requirements
+4. Use industry-specific keywords and terminology
+5. Restructure bullet points to lead with the most relevant achievements
+6. Maintain professional tone and formatting
+7. Do not add skills or experience that don't exist in the original CV
+"""
+
+
+def extract_json(content: str) -> Dict[str, Any]:
+    """Parse a JSON object from model output, unwrapping markdown code blocks if present"""
+    if "```json" in content:
+        json_start = content.find("```json") + 7
+        json_end = content.find("```", json_start)
+        content = content[json_start:json_end].strip()
+    elif "```" in content:
+        json_start = content.find("```") + 3
+        json_end = content.find("```", json_start)
+        content = content[json_start:json_end].strip()
+
+    return json.loads(content)
+
+
+def format_paraphrasing_result(content: str, job_title: str) -> Dict[str, Any]:
+    """Parse model output into the paraphrasing response structure"""
+    try:
+        paraphrasing = extract_json(content)
+        paraphrasing["paraphrasing_timestamp"] = datetime.utcnow().isoformat()
+        paraphrasing["target_job"] = job_title
+        return paraphrasing
+    except json.JSONDecodeError:
+        # Fallback: return raw content if JSON parsing fails
+        return {
+            "raw_paraphrasing": content,
+            "paraphrasing_timestamp": datetime.utcnow().isoformat(),
+            "target_job": job_title,
+            "error": "Failed to parse structured paraphrasing"
+        }
+
+
 class DeepSeekService:
     def __init__(self):
         self.token = os.getenv("DEEPSEEK_TOKEN", "your-deepseek-token-here")
         self.endpoint = "https://models.github.ai/inference"
         self.model = "deepseek/DeepSeek-V3-0324"
-        
-    async def paraphrase_cv_for_job(self, cv_text: str, job_title: str, job_description: str = None) -> Dict[str, Any]:
-        """
-        Paraphrase CV content to better match a specific job title and description
-        """
-        system_prompt = """
-        You are an expert CV writer and career coach specializing in tailoring CVs for specific job applications.
-        Your task is to paraphrase and optimize CV content to better align with the target job while maintaining truthfulness.
-        
-        Guidelines:
-        1. Keep all factual information accurate - do not fabricate experience or skills
-        2. Reword descriptions to highlight relevant experience for the target role
-        3. Emphasize transferable skills that match the job requirements
-        4. Use industry-specific keywords and terminology
-        5. Restructure bullet points to lead with the most relevant achievements
-        6. Maintain professional tone and formatting
-        7. Do not add skills or experience that don't exist in the original CV
+        self.cache = llm_cache_service
+        self.gateway = llm_gateway
+        self.semantic_cache = semantic_cache_service
+
+    def _get_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+
+    def _build_payload(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        top_p: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        return {
+            "messages": [
+                {"role": "system", "content": textwrap.dedent(system_prompt).strip()},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "model": self.model
+        }
+
+    async def chat_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        top_p: float,
+        max_tokens: int,
+        prompt_version: str,
+        expect_json: bool = False,
+        force_refresh: bool = False,
+        user_id: str = "anonymous",
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> str:
         """
-        
-        user_prompt = f"""
-        Please paraphrase this CV to better align with the target job position:
-        
-        TARGET JOB TITLE: {job_title}
-        
-        JOB DESCRIPTION: {job_description if job_description else "No specific job description provided"}
-        
-        ORIGINAL CV:
-        {cv_text}
-        
-        Provide the paraphrased CV in this JSON format:
-        {{
-            "paraphrased_cv": {{
-                "professional_summary": "Rewritten professional summary emphasizing relevant skills",
-                "work_experience": [
-                    {{
-                        "company": "Company Name",
-                        "position": "Job Title",
-                        "duration": "Date Range",
-                        "description": "Rewritten job description highlighting relevant achievements"
-                    }}
-                ],
-                "skills": ["List of skills emphasized for this role"],
-                "education": "Education section if relevant changes needed",
-                "key_achievements": ["Rewritten achievements that align with target role"]
-            }},
-            "optimization_notes": {{
-                "keywords_added": ["Industry keywords incorporated"],
-                "skills_emphasized": ["Skills highlighted for this role"],
-                "experience_reframed": ["How experience was repositioned"],
-                "suggestions": ["Additional recommendations for the application"]
-            }},
-            "match_analysis": {{
-                "alignment_score": 0.85,
-                "strengths": ["Strong points for this role"],
-                "areas_to_highlight": ["Key areas to emphasize in cover letter"],
-                "missing_elements": ["Skills/experience gaps to address"]
-            }}
-        }}
+        Run a chat completion and return the message content
+
+        Results are cached on (model, temperature, prompt version, prompt hash).
+        Set force_refresh to bypass the cache lookup and regenerate; the fresh
+        result still replaces the cached one. With expect_json, output that
+        doesn't parse as JSON is returned but not cached. Provider calls go
+        through the LLM gateway, which queues them fairly per user_id; pass
+        priority=PRIORITY_BACKGROUND for work nobody is waiting on.
         """
-        
-        try:
+        cache_key = self.cache.make_key(self.model, temperature, prompt_version, user_prompt)
+
+        if not force_refresh:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached["content"]
+
+        estimated_tokens = estimate_tokens(system_prompt + user_prompt) + max_tokens
+        async with self.gateway.slot(user_id, estimated_tokens, priority) as call:
             async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.token}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                    "max_tokens": 4000,
-                    "model": self.model
-                }
-                
                 async with session.post(
                     f"{self.endpoint}/chat/completions",
-                    headers=headers,
-                    json=payload
+                    headers=self._get_headers(),
+                    json=self._build_payload(system_prompt, user_prompt, temperature, top_p, max_tokens)
                 ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        
-                        # Try to parse JSON from the response
-                        try:
-                            # Extract JSON from markdown code blocks if present
-                            if "```json" in content:
-                                json_start = content.find("```json") + 7
-                                json_end = content.find("```", json_start)
-                                content = content[json_start:json_end].strip()
-                            elif "```" in content:
-                                json_start = content.find("```") + 3
-                                json_end = content.find("```", json_start)
-                                content = content[json_start:json_end].strip()
-                            
-                            paraphrasing = json.loads(content)
-                            paraphrasing["paraphrasing_timestamp"] = datetime.utcnow().isoformat()
-                            paraphrasing["target_job"] = job_title
-                            return paraphrasing
-                        except json.JSONDecodeError:
-                            # Fallback: return raw content if JSON parsing fails
-                            return {
-                                "raw_paraphrasing": content,
-                                "paraphrasing_timestamp": datetime.utcnow().isoformat(),
-                                "target_job": job_title,
-                                "error": "Failed to parse structured paraphrasing"
-                            }
-                    else:
+                    if response.status != 200:
                         error_text = await response.text()
                         raise Exception(f"DeepSeek API error: {response.status} - {error_text}")
-                        
+
+                    result = await response.json()
+                    content = result["choices"][0]["message"]["content"]
+
+            usage = result.get("usage") or {}
+            call.record_usage(
+                usage.get("prompt_tokens", estimate_tokens(system_prompt + user_prompt)),
+                usage.get("completion_tokens", estimate_tokens(content))
+            )
+
+        if expect_json:
+            try:
+                extract_json(content)
+            except json.JSONDecodeError:
+                return content
+
+        await self.cache.set(cache_key, {"content": content})
+        return content
+
+    async def chat_completion_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        top_p: float,
+        max_tokens: int,
+        prompt_version: str,
+        expect_json: bool = False,
+        force_refresh: bool = False,
+        user_id: str = "anonymous",
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as content deltas
+
+        Shares the chat_completion cache: a hit is yielded as a single chunk,
+        and a completed stream is cached under the same rules.
+        """
+        cache_key = self.cache.make_key(self.model, temperature, prompt_version, user_prompt)
+
+        if not force_refresh:
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                yield cached["content"]
+                return
+
+        payload = self._build_payload(system_prompt, user_prompt, temperature, top_p, max_tokens)
+        payload["stream"] = True
+
+        chunks = []
+        usage = {}
+        estimated_tokens = estimate_tokens(system_prompt + user_prompt) + max_tokens
+        async with self.gateway.slot(user_id, estimated_tokens, priority) as call:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(
+                        f"{self.endpoint}/chat/completions",
+                        headers=self._get_headers(),
+                        json=payload
+                    ) as response:
+                        if response.status != 200:
+                            error_text = await response.text()
+                            raise Exception(f"DeepSeek API error: {response.status} - {error_text}")
+
+                        # Server-sent events: one "data: {...}" line per delta
+                        async for raw_line in response.content:
+                            line = raw_line.decode("utf-8").strip()
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+
+                            event = json.loads(data)
+                            usage = event.get("usage") or usage
+                            choices = event.get("choices") or []
+                            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                            if delta:
+                                chunks.append(delta)
+                                yield delta
+            finally:
+                call.record_usage(
+                    usage.get("prompt_tokens", estimate_tokens(system_prompt + user_prompt)),
+                    usage.get("completion_tokens", estimate_tokens("".join(chunks)))
+                )
+
+        content = "".join(chunks)
+        if expect_json:
+            try:
+                extract_json(content)
+            except json.JSONDecodeError:
+                return
+
+        await self.cache.set(cache_key, {"content": content})
+
+    async def analyze_cv(
+        self,
+        cv_text: str,
+        user_profile: Optional[Dict[str, Any]] = None,
+        force_refresh: bool = False,
+        user_id: str = "anonymous"
+    ) -> Dict[str, Any]:
+        """
+        Analyze a CV's skills, experience and career readiness
+        """
+        system_prompt = """
+        You are an expert career advisor and CV analyst.
+        Assess the candidate's skills, experience level, education and career readiness
+        using only what the CV states. Do not invent skills or experience.
+        """
+
+        user_prompt = prompt_builder.build_career_analysis_prompt(cv_text, user_profile)
+
+        try:
+            content = await self.chat_completion(
+                system_prompt,
+                user_prompt,
+                temperature=0.2,
+                top_p=0.8,
+                max_tokens=2000,
+                prompt_version=CV_ANALYSIS_PROMPT_VERSION,
+                expect_json=True,
+                force_refresh=force_refresh,
+                user_id=user_id
+            )
+
+            try:
+                analysis = extract_json(content)
+                analysis["analysis_timestamp"] = datetime.utcnow().isoformat()
+                return analysis
+            except json.JSONDecodeError:
+                return {
+                    "raw_analysis": content,
+                    "analysis_timestamp": datetime.utcnow().isoformat(),
+                    "error": "Failed to parse structured analysis"
+                }
+
+        except Exception as e:
+            print(f"Error in CV analysis: {str(e)}")
+            return {
+                "error": str(e),
+                "analysis_timestamp": datetime.utcnow().isoformat()
+            }
+
+    def reuse_paraphrasing(
+        self,
+        prompt_version: str,
+        cv_text: str,
+        job_title: str,
+        job_description: str = None
+    ) -> Optional[Dict[str, Any]]:
+        """Stored paraphrasing of this CV for the same job title and a near-identical description"""
+        cached = self.semantic_cache.lookup(prompt_version, cv_text, job_title, job_description)
+        if cached:
+            cached["paraphrasing_timestamp"] = datetime.utcnow().isoformat()
+        return cached
+
+    def remember_paraphrasing(
+        self,
+        prompt_version: str,
+        cv_text: str,
+        job_title: str,
+        job_description: Optional[str],
+        paraphrasing: Dict[str, Any]
+    ):
+        """Keep a paraphrasing result for reuse_paraphrasing (failed results are skipped)"""
+        self.semantic_cache.store(prompt_version, cv_text, job_title, job_description, paraphrasing)
+
+    async def paraphrase_cv_for_job(
+        self,
+        cv_text: str,
+        job_title: str,
+        job_description: str = None,
+        force_refresh: bool = False,
+        user_id: str = "anonymous",
+        priority: str = PRIORITY_INTERACTIVE,
+        system_prompt: str = None,
+        prompt_version: str = PARAPHRASE_PROMPT_VERSION
+    ) -> Dict[str, Any]:
+        """
+        Paraphrase CV content to better match a specific job title and description
+
+        Callers with their own system prompt pass it with a matching prompt_version.
+        """
+        if not force_refresh:
+            cached = self.reuse_paraphrasing(prompt_version, cv_text, job_title, job_description)
+            if cached:
+                return cached
+
+        user_prompt = prompt_builder.build_paraphrase_prompt(cv_text, job_title, job_description)
+
+        try:
+            content = await self.chat_completion(
+                system_prompt or PARAPHRASE_SYSTEM_PROMPT,
+                user_prompt,
+                temperature=0.3,
+                top_p=0.9,
+                max_tokens=4000,
+                prompt_version=prompt_version,
+                expect_json=True,
+                force_refresh=force_refresh,
+                user_id=user_id,
+                priority=priority
+            )
+
+            paraphrasing = format_paraphrasing_result(content, job_title)
+            self.remember_paraphrasing(prompt_version, cv_text, job_title, job_description, paraphrasing)
+            return paraphrasing
+
         except Exception as e:
             print(f"Error in CV paraphrasing: {str(e)}")
             return {
@@ -135,71 +356,59 @@ class DeepSeekService:
                 "paraphrasing_timestamp": datetime.utcnow().isoformat(),
                 "target_job": job_title
             }
-    
-    async def generate_cover_letter_points(self, cv_text: str, job_title: str, job_description: str = None) -> List[str]:
+
+    async def generate_cover_letter_points(
+        self,
+        cv_text: str,
+        job_title: str,
+        job_description: str = None,
+        user_id: str = "anonymous"
+    ) -> List[str]:
         """
         Generate key points for a cover letter based on CV and target job
         """
         system_prompt = """
-        You are a professional cover letter writer. Based on the CV and target job, 
+        You are a professional cover letter writer. Based on the CV and target job,
         generate 5-7 key points that should be highlighted in a cover letter.
         Focus on connecting the candidate's experience to the job requirements.
         """
-        
+
         user_prompt = f"""
         Based on this CV and target job, suggest key points for a cover letter:
-        
+
         TARGET JOB: {job_title}
         JOB DESCRIPTION: {job_description if job_description else "No specific description"}
-        
+
         CV CONTENT: {cv_text}
-        
+
         Return 5-7 bullet points that connect the candidate's experience to the job requirements.
         """
-        
+
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.token}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.4,
-                    "top_p": 0.9,
-                    "max_tokens": 1000,
-                    "model": self.model
-                }
-                
-                async with session.post(
-                    f"{self.endpoint}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        
-                        # Extract bullet points from response
-                        points = []
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if line.startswith('•') or line.startswith('-') or line.startswith('*'):
-                                points.append(line[1:].strip())
-                            elif line and len(line) > 20:  # Likely a point without bullet
-                                points.append(line)
-                        
-                        return points[:7]  # Return max 7 points
-                    else:
-                        return []
-                        
+            content = await self.chat_completion(
+                system_prompt,
+                user_prompt,
+                temperature=0.4,
+                top_p=0.9,
+                max_tokens=1000,
+                prompt_version=COVER_LETTER_PROMPT_VERSION,
+                user_id=user_id
+            )
+
+            # Extract bullet points from response
+            points = []
+            for line in content.split('\n'):
+                line = line.strip()
+                if line.startswith('•') or line.startswith('-') or line.startswith('*'):
+                    points.append(line[1:].strip())
+                elif line and len(line) > 20:  # Likely a point without bullet
+                    points.append(line)
+
+            return points[:7]  # Return max 7 points
+
         except Exception as e:
             print(f"Error generating cover letter points: {str(e)}")
             return []
 
 # Global instance
-deepseek_service = DeepSeekService()
\ No newline at end of file
+deepseek_service = DeepSeekService()
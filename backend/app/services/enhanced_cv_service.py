@@ -3,18 +3,31 @@ Enhanced CV Processing Service with DeepSeek AI Integration
 """
 import os
 import uuid
-from typing import Optional, Dict, Any, List
+import asyncio
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from datetime import datetime
 import json
+import logging
 
+from app.config import settings
 from app.models.cv import CVFile, CVExtraction
 from app.models.user import User, UserSkill
 from app.ml.cv_processing.parser import CVParser
 from app.ml.cv_processing.extractor import CVExtractor
-from app.utils.storage import StorageService
+from app.utils.storage import StorageService, hash_upload
 from .deepseek_service import deepseek_service
+from .cv_reanalysis_service import cv_reanalysis_service
+from .websocket_service import notification_service
+
+logger = logging.getLogger(__name__)
+
+# UserSkill sources written from CV analysis, as opposed to skills the user entered
+CV_SKILL_SOURCES = ("cv", "cv_ai")
+
+# Re-uploads of the same bytes in these states reuse the existing record and analysis
+DEDUPLICATABLE_STATUSES = ("processing", "enriching", "completed")
 
 
 class EnhancedCVService:
@@ -29,33 +42,54 @@ class EnhancedCVService:
         user_id: uuid.UUID,
         file: UploadFile,
         analysis_type: str = "full"
-    ) -> CVFile:
-        """Upload CV file and start AI-powered processing"""
+    ) -> Tuple[CVFile, bool]:
+        """
+        Upload CV file and start AI-powered processing
+
+        Returns (cv_record, deduplicated). An upload byte-identical to the
+        user's current CV skips storage and analysis and returns that record.
+        """
+        
+        # Hash (and size-check) the upload first so duplicates skip storage entirely
+        content_hash, _ = await hash_upload(file, max_size=settings.MAX_FILE_SIZE)
+        
+        existing_cv = self.db.query(CVFile).filter(CVFile.user_id == user_id).first()
+        if (
+            existing_cv
+            and existing_cv.content_hash == content_hash
+            and existing_cv.analysis_status in DEDUPLICATABLE_STATUSES
+        ):
+            return existing_cv, True
         
         # Generate unique filename
         file_extension = file.filename.split('.')[-1].lower()
         unique_filename = f"{user_id}_{uuid.uuid4()}.{file_extension}"
         
-        # Upload to cloud storage
-        file_url = await self.storage_service.upload_file(
+        # Stream to cloud storage
+        upload = await self.storage_service.upload_stream(
             file=file,
             filename=unique_filename,
-            folder="cvs"
+            folder="cvs",
+            max_size=settings.MAX_FILE_SIZE
         )
         
         # Create CV record
         cv_record = CVFile(
             user_id=user_id,
-            file_url=file_url,
+            file_url=upload.file_url,
             file_name=file.filename,
             file_type=file_extension,
-            file_size=len(await file.read()),
+            file_size=upload.size,
+            content_hash=upload.content_hash,
             analysis_status="processing"
         )
         
         # Delete existing CV for user
-        existing_cv = self.db.query(CVFile).filter(CVFile.user_id == user_id).first()
+        previous_data = None
         if existing_cv:
+            # Keep the previous analysis so unchanged sections aren't re-analyzed
+            if existing_cv.analysis_status == "completed" and existing_cv.extraction:
+                previous_data = existing_cv.extraction.extracted_data
             self.db.delete(existing_cv)
         
         self.db.add(cv_record)
@@ -63,18 +97,30 @@ class EnhancedCVService:
         self.db.refresh(cv_record)
         
         # Start async processing with AI
-        await self._process_cv_with_ai(cv_record, analysis_type)
+        await self._process_cv_with_ai(cv_record, analysis_type, previous_data)
         
-        return cv_record
+        return cv_record, False
     
-    async def _process_cv_with_ai(self, cv_record: CVFile, analysis_type: str):
-        """Process CV with AI-powered analysis"""
+    async def _process_cv_with_ai(self, cv_record: CVFile, analysis_type: str, previous_data: Optional[Dict] = None):
+        """
+        Process CV with rule-based extraction and AI analysis running concurrently
+
+        The rule-based result is saved and pushed to the user as soon as it is
+        ready; the AI analysis is merged into the same extraction when it arrives.
+        With previous_data from an earlier upload, only changed sections are
+        re-analyzed and the user's skills are updated by the difference.
+        """
+        user_id = str(cv_record.user_id)
+        cv_id = str(cv_record.cv_id)
+        ai_task = None
+        file_path = None
         try:
             # Download file from storage
             file_path = await self.storage_service.download_file(cv_record.file_url)
             
-            # Extract text
-            raw_text = self.cv_parser.extract_text(file_path)
+            # Extract text off the event loop
+            loop = asyncio.get_running_loop()
+            raw_text = await loop.run_in_executor(None, self.cv_parser.extract_text, file_path)
             
             if not raw_text.strip():
                 raise ValueError("No text content could be extracted from the CV")
@@ -87,29 +133,48 @@ class EnhancedCVService:
                 "created_at": user.created_at.isoformat() if user else None
             }
             
-            # AI-powered analysis using DeepSeek
-            ai_analysis = await deepseek_service.analyze_cv(raw_text, user_profile)
-            
-            # Fallback to basic extraction if AI fails
-            basic_extracted_data = self.cv_extractor.extract(raw_text)
-            
-            # Combine AI analysis with basic extraction
-            enhanced_data = self._combine_analyses(ai_analysis, basic_extracted_data)
+            # AI-powered analysis using DeepSeek, while basic extraction runs in a worker thread
+            ai_task = asyncio.create_task(
+                cv_reanalysis_service.analyze(raw_text, user_profile, previous=previous_data, user_id=user_id)
+            )
+            basic_extracted_data = await loop.run_in_executor(None, self.cv_extractor.extract, raw_text)
             
-            # Create extraction record with AI insights
+            # Persist and push the basic result while the AI call is still in flight
             extraction = CVExtraction(
                 cv_id=cv_record.cv_id,
                 raw_text=raw_text,
-                extracted_data=enhanced_data,
-                extraction_confidence=0.95 if not ai_analysis.get("error") else 0.75,
-                sections_detected=self._detect_sections(enhanced_data),
+                extracted_data={"basic_extraction": basic_extracted_data, "ai_analysis_pending": True},
+                extraction_confidence=0.6,
+                sections_detected=self._detect_sections(basic_extracted_data),
                 page_count=1  # Could be enhanced to count actual pages
             )
-            
             self.db.add(extraction)
+            cv_record.analysis_status = "enriching"
+            self.db.commit()
+            
+            await notification_service.notify_cv_processing_partial(user_id, cv_id, {
+                "skills": [skill["name"] for skill in basic_extracted_data.get("skills", [])],
+                "experience_years": basic_extracted_data.get("experience_years", 0),
+                "sections_detected": extraction.sections_detected
+            })
+            
+            ai_analysis, reanalysis = await ai_task
+            
+            # Merge the AI enrichment into the stored extraction
+            enhanced_data = self._combine_analyses(ai_analysis, basic_extracted_data)
+            enhanced_data.update(reanalysis)
+            extraction.extracted_data = enhanced_data
+            extraction.extraction_confidence = 0.95 if not ai_analysis.get("error") else 0.75
+            extraction.sections_detected = self._detect_sections(enhanced_data)
             
             # Update user skills based on AI analysis
-            await self._update_user_skills_from_ai(cv_record.user_id, ai_analysis)
+            previous_analysis = (previous_data or {}).get("ai_analysis")
+            if previous_analysis and not previous_analysis.get("error"):
+                enhanced_data["skills_delta"] = await self._apply_skills_delta(
+                    cv_record.user_id, previous_analysis, ai_analysis
+                )
+            else:
+                await self._update_user_skills_from_ai(cv_record.user_id, ai_analysis)
             
             # Update CV status
             cv_record.analysis_status = "completed"
@@ -117,19 +182,37 @@ class EnhancedCVService:
             
             self.db.commit()
             
-            # Clean up temporary file
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
         except Exception as e:
+            if ai_task is not None and not ai_task.done():
+                ai_task.cancel()
+            
             # Update CV status to failed
+            self.db.rollback()
             cv_record.analysis_status = "failed"
             cv_record.error_message = str(e)
             self.db.commit()
             
+            await notification_service.notify_cv_processing_complete(user_id, cv_id, False)
+            return
+        
+        finally:
             # Clean up temporary file
-            if 'file_path' in locals() and os.path.exists(file_path):
+            if file_path and os.path.exists(file_path):
                 os.remove(file_path)
+        
+        # The analysis is committed; a problem notifying about it must not mark it failed
+        try:
+            if ai_analysis.get("error"):
+                skills_found = [skill["name"] for skill in basic_extracted_data.get("skills", [])]
+            else:
+                skills_found = enhanced_data["skills"]["technical"] + enhanced_data["skills"]["soft"]
+            await notification_service.notify_cv_processing_complete(user_id, cv_id, True, {
+                "skills": skills_found,
+                "experience_years": (ai_analysis.get("experience") or {}).get("years", basic_extracted_data.get("experience_years", 0)),
+                "sections_detected": extraction.sections_detected
+            })
+        except Exception as e:
+            logger.error(f"Failed to notify user {user_id} of completed CV {cv_id}: {str(e)}")
     
     def _combine_analyses(self, ai_analysis: Dict, basic_data: Dict) -> Dict:
         """Combine AI analysis with basic extraction"""
@@ -140,21 +223,23 @@ class EnhancedCVService:
                 "error": ai_analysis.get("error")
             }
         
+        # The model may return null for any field
+        skills = ai_analysis.get("skills") or {}
         return {
             "ai_analysis": ai_analysis,
             "basic_extraction": basic_data,
             "skills": {
-                "technical": ai_analysis.get("skills", {}).get("technical", []),
-                "soft": ai_analysis.get("skills", {}).get("soft", []),
-                "proficiency_levels": ai_analysis.get("skills", {}).get("proficiency_levels", {})
+                "technical": skills.get("technical") or [],
+                "soft": skills.get("soft") or [],
+                "proficiency_levels": skills.get("proficiency_levels") or {}
             },
-            "experience": ai_analysis.get("experience", {}),
-            "education": ai_analysis.get("education", {}),
-            "strengths": ai_analysis.get("strengths", []),
-            "improvement_areas": ai_analysis.get("improvement_areas", []),
-            "career_paths": ai_analysis.get("career_paths", []),
-            "readiness_score": ai_analysis.get("readiness_score", 0.0),
-            "recommendations": ai_analysis.get("recommendations", [])
+            "experience": ai_analysis.get("experience") or {},
+            "education": ai_analysis.get("education") or {},
+            "strengths": ai_analysis.get("strengths") or [],
+            "improvement_areas": ai_analysis.get("improvement_areas") or [],
+            "career_paths": ai_analysis.get("career_paths") or [],
+            "readiness_score": ai_analysis.get("readiness_score") or 0.0,
+            "recommendations": ai_analysis.get("recommendations") or []
         }
     
     def _detect_sections(self, enhanced_data: Dict) -> List[str]:
@@ -177,38 +262,64 @@ class EnhancedCVService:
         if ai_analysis.get("error"):
             return
         
-        skills_data = ai_analysis.get("skills", {})
-        technical_skills = skills_data.get("technical", [])
-        soft_skills = skills_data.get("soft", [])
-        proficiency_levels = skills_data.get("proficiency_levels", {})
+        for skill_name, skill_level in self._skill_levels(ai_analysis).items():
+            self._upsert_cv_skill(user_id, skill_name, skill_level)
+    
+    async def _apply_skills_delta(self, user_id: uuid.UUID, previous_analysis: Dict, ai_analysis: Dict) -> Dict[str, List[str]]:
+        """Update user skills by the difference between two CV analyses"""
+        if ai_analysis.get("error"):
+            return {"added": [], "removed": [], "updated": []}
+        
+        old_levels = self._skill_levels(previous_analysis)
+        new_levels = self._skill_levels(ai_analysis)
         
-        all_skills = technical_skills + soft_skills
+        added = [name for name in new_levels if name not in old_levels]
+        removed = [name for name in old_levels if name not in new_levels]
+        updated = [name for name in new_levels if name in old_levels and new_levels[name] != old_levels[name]]
         
-        for skill_name in all_skills:
-            # Check if skill already exists
-            existing_skill = self.db.query(UserSkill).filter(
+        for skill_name in added + updated:
+            self._upsert_cv_skill(user_id, skill_name, new_levels[skill_name])
+        
+        if removed:
+            # Only drop skills that came from a CV; user-entered skills stay
+            self.db.query(UserSkill).filter(
                 UserSkill.user_id == user_id,
-                UserSkill.name == skill_name
-            ).first()
-            
-            skill_level = proficiency_levels.get(skill_name, "intermediate")
-            
-            if existing_skill:
-                # Update existing skill if from CV
-                if existing_skill.source == "cv":
-                    existing_skill.level = skill_level
-                    existing_skill.updated_at = datetime.utcnow()
-            else:
-                # Create new skill
-                new_skill = UserSkill(
-                    user_id=user_id,
-                    name=skill_name,
-                    level=skill_level,
-                    years=0,  # Could be extracted from AI analysis
-                    source="cv_ai",
-                    verified=False
-                )
-                self.db.add(new_skill)
+                UserSkill.name.in_(removed),
+                UserSkill.source.in_(CV_SKILL_SOURCES)
+            ).delete(synchronize_session=False)
+        
+        return {"added": added, "removed": removed, "updated": updated}
+    
+    def _upsert_cv_skill(self, user_id: uuid.UUID, skill_name: str, skill_level: str):
+        # Check if skill already exists
+        existing_skill = self.db.query(UserSkill).filter(
+            UserSkill.user_id == user_id,
+            UserSkill.name == skill_name
+        ).first()
+        
+        if existing_skill:
+            # Update existing skill if from CV
+            if existing_skill.source in CV_SKILL_SOURCES:
+                existing_skill.level = skill_level
+                existing_skill.updated_at = datetime.utcnow()
+        else:
+            # Create new skill
+            new_skill = UserSkill(
+                user_id=user_id,
+                name=skill_name,
+                level=skill_level,
+                years=0,  # Could be extracted from AI analysis
+                source="cv_ai",
+                verified=False
+            )
+            self.db.add(new_skill)
+    
+    @staticmethod
+    def _skill_levels(ai_analysis: Dict) -> Dict[str, str]:
+        skills_data = ai_analysis.get("skills") or {}
+        proficiency_levels = skills_data.get("proficiency_levels") or {}
+        all_skills = (skills_data.get("technical") or []) + (skills_data.get("soft") or [])
+        return {skill_name: proficiency_levels.get(skill_name, "intermediate") for skill_name in all_skills}
     
     async def get_job_recommendations(self, user_id: uuid.UUID, preferences: Dict = None) -> List[Dict]:
         """Get AI-powered job recommendations based on user's CV"""
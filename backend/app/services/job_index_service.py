@@ -0,0 +1,348 @@
+"""
+Local full-text job search over the ingested posting corpus
+"""
+import os
+import re
+import json
+import math
+import heapq
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from datetime import datetime, timedelta
+
+from .jsearch_service import jsearch_service
+from .periodic_task import PeriodicTask
+from .cloud_clients import cloud_clients
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "our", "the", "to", "we", "with", "you", "your"
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lower-case and split text into index terms"""
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class JobIndex:
+    """
+    Immutable inverted index with BM25 scoring and filter bitmaps
+
+    Documents are numbered 0..N-1. Filter bitmaps are Python ints where
+    bit i is set when document i matches, so filters combine with & and |.
+    """
+
+    def __init__(self, jobs: List[Dict[str, Any]], title_boost: float = 3.0, k1: float = 1.2, b: float = 0.75):
+        self.jobs = jobs
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_lengths: List[float] = []
+        self.all_docs = (1 << len(jobs)) - 1
+
+        remote_ids: List[int] = []
+        employment_type_ids: Dict[str, List[int]] = {}
+        location_ids: Dict[str, List[int]] = {}
+
+        for doc_id, job in enumerate(jobs):
+            self._index_document(doc_id, job, title_boost)
+
+            if job.get("remote"):
+                remote_ids.append(doc_id)
+            employment_type = (job.get("employment_type") or "").upper()
+            if employment_type:
+                employment_type_ids.setdefault(employment_type, []).append(doc_id)
+            for token in set(tokenize(job.get("location"))):
+                location_ids.setdefault(token, []).append(doc_id)
+
+        self.remote_bitmap = self._bitmap(remote_ids)
+        self.employment_type_bitmaps = {key: self._bitmap(ids) for key, ids in employment_type_ids.items()}
+        self.location_bitmaps = {key: self._bitmap(ids) for key, ids in location_ids.items()}
+
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (len(jobs) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def _index_document(self, doc_id: int, job: Dict[str, Any], title_boost: float):
+        """Add a formatted job to the postings"""
+        # Field-weighted term frequencies: title matches count more than body matches
+        term_weights: Dict[str, float] = {}
+        title_tokens = tokenize(job.get("title"))
+        body_tokens = tokenize(job.get("company")) + tokenize(job.get("description"))
+        for token in title_tokens:
+            term_weights[token] = term_weights.get(token, 0.0) + title_boost
+        for token in body_tokens:
+            term_weights[token] = term_weights.get(token, 0.0) + 1.0
+
+        for term, weight in term_weights.items():
+            self.postings.setdefault(term, {})[doc_id] = weight
+        self.doc_lengths.append(title_boost * len(title_tokens) + len(body_tokens))
+
+    def _bitmap(self, doc_ids: List[int]) -> int:
+        """Build a bitmap from doc ids in a single pass"""
+        bits = bytearray(b"0" * len(self.jobs))
+        for doc_id in doc_ids:
+            bits[-1 - doc_id] = ord("1")
+        return int(bits, 2) if bits else 0
+
+    def build_filter(
+        self,
+        location: Optional[str] = None,
+        remote_jobs_only: bool = False,
+        employment_types: Optional[str] = None
+    ) -> int:
+        """Combine filter bitmaps into a single candidate bitmap"""
+        candidates = self.all_docs
+
+        if remote_jobs_only:
+            candidates &= self.remote_bitmap
+
+        if employment_types:
+            type_bitmap = 0
+            for employment_type in employment_types.split(","):
+                type_bitmap |= self.employment_type_bitmaps.get(employment_type.strip().upper(), 0)
+            candidates &= type_bitmap
+
+        if location:
+            location_tokens = tokenize(location)
+            if location_tokens == ["remote"]:
+                candidates &= self.remote_bitmap
+            elif location_tokens:
+                candidates &= self._location_bitmap(location_tokens)
+
+        return candidates
+
+    def _location_bitmap(self, location_tokens: List[str]) -> int:
+        """
+        Postings at the requested location
+
+        Postings whose location contains every query term (which includes an
+        exact match of the normalised location) are preferred; if there are
+        none, e.g. "New York, NY" against postings listed as "New York, US",
+        any shared term matches.
+        """
+        matches = self.all_docs
+        for token in location_tokens:
+            matches &= self.location_bitmaps.get(token, 0)
+        if matches:
+            return matches
+
+        for token in location_tokens:
+            matches |= self.location_bitmaps.get(token, 0)
+        return matches
+
+    def search(
+        self,
+        query: str,
+        candidates: int,
+        limit: int = 10,
+        offset: int = 0
+    ) -> Tuple[List[Tuple[float, int]], int]:
+        """
+        Return (score, doc_id) pairs for the requested page and the total match count
+
+        A query with no indexable terms (e.g. only stopwords) matches nothing,
+        so callers fall back to the external API rather than list every posting.
+        """
+        query_terms = set(tokenize(query))
+        if not candidates or not query_terms:
+            return [], 0
+
+        scores: Dict[int, float] = {}
+
+        # Materialise the filter once instead of testing bits per posting
+        candidate_set = None if candidates == self.all_docs else set(self._iter_bits(candidates))
+
+        for term in query_terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in docs.items():
+                if candidate_set is not None and doc_id not in candidate_set:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(score, doc_id) for doc_id, score in top[offset:]], len(scores)
+
+    @staticmethod
+    def _iter_bits(bitmap: int) -> Iterable[int]:
+        """Yield the doc ids whose bits are set, in linear time"""
+        for doc_id, bit in enumerate(reversed(bin(bitmap)[2:])):
+            if bit == "1":
+                yield doc_id
+
+
+class JobIndexService:
+    """Keeps a locally synced snapshot of ingested postings searchable in-process"""
+
+    def __init__(self):
+        self.bucket_name = os.getenv("GCS_BUCKET", "jobs_ingestion_data_bucket")
+        self.prefix = os.getenv("GCS_PREFIX", "staging/jsearch")
+        self.snapshot_dir = os.getenv("JOB_INDEX_SNAPSHOT_DIR")
+        self.sync_interval = int(os.getenv("JOB_INDEX_SYNC_INTERVAL", "1800"))  # 30 minutes
+        self.min_results = int(os.getenv("JOB_INDEX_MIN_RESULTS", "5"))
+        # Postings ingested longer ago than this are dropped from the index
+        self.max_age_days = int(os.getenv("JOB_INDEX_MAX_AGE_DAYS", "30"))
+
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._synced_objects: set = set()
+        self.index = JobIndex([])
+        self.last_synced: Optional[datetime] = None
+
+        self.syncer = PeriodicTask("job_index_sync", self.sync, self.sync_interval)
+
+    def search(
+        self,
+        query: str,
+        location: Optional[str] = None,
+        remote_jobs_only: bool = False,
+        employment_types: Optional[str] = None,
+        page: int = 1,
+        limit: int = 10
+    ) -> Dict[str, Any]:
+        """Search the local index, mirroring the JSearchService result shape"""
+        index = self.index
+        candidates = index.build_filter(location, remote_jobs_only, employment_types)
+        hits, total = index.search(query, candidates, limit=limit, offset=(page - 1) * limit)
+
+        jobs = []
+        for score, doc_id in hits:
+            job = dict(index.jobs[doc_id])
+            job["relevance_score"] = round(score, 4)
+            jobs.append(job)
+
+        return {
+            "status": "success",
+            "message": "Jobs fetched from local index",
+            "data": jobs,
+            "parameters": {"query": query, "location": location, "page": page},
+            "total_results": total
+        }
+
+    def is_sparse(self, result: Dict[str, Any], limit: int) -> bool:
+        """Check whether a local result is too thin to serve without the external API"""
+        return len(result["data"]) < min(limit, self.min_results)
+
+    async def sync(self):
+        """Load new ingestion files and rebuild the index off the event loop"""
+        new_rows = await asyncio.to_thread(self._load_new_rows)
+        index = await asyncio.to_thread(self._rebuild, new_rows)
+        if index is None:
+            return
+
+        # Swap in the new snapshot atomically
+        self.index = index
+        self.last_synced = datetime.utcnow()
+        logger.info(f"Job index synced: {len(self.index)} postings ({len(new_rows)} new rows)")
+
+    def _rebuild(self, new_rows: List[Dict[str, Any]]) -> Optional["JobIndex"]:
+        """
+        Merge new rows, drop expired ones and build the index (runs in a worker thread)
+
+        Returns None if nothing changed and the current index can stay.
+        """
+        now = datetime.utcnow()
+        for row in new_rows:
+            job_id = row.get("job_id")
+            if not job_id:
+                continue
+            # Rows without a timestamp age from when we first saw them
+            row.setdefault("ingested_at", now.isoformat())
+            existing = self._rows.get(job_id)
+            if existing is None or (row.get("ingested_at") or "") >= (existing.get("ingested_at") or ""):
+                self._rows[job_id] = row
+
+        cutoff = now - timedelta(days=self.max_age_days)
+        expired = [job_id for job_id, row in self._rows.items() if (self._ingested_at(row) or now) < cutoff]
+        for job_id in expired:
+            del self._rows[job_id]
+        if expired:
+            logger.info(f"Dropped {len(expired)} postings ingested over {self.max_age_days} days ago")
+        elif not new_rows and len(self.index):
+            return None
+
+        return JobIndex(jsearch_service.format_job_results(list(self._rows.values())))
+
+    @staticmethod
+    def _ingested_at(row: Dict[str, Any]) -> Optional[datetime]:
+        """Parse a row's ingested_at as naive UTC; None if missing or unparseable"""
+        try:
+            value = datetime.fromisoformat(str(row["ingested_at"]).replace("Z", "+00:00"))
+        except (KeyError, ValueError):
+            return None
+        if value.tzinfo is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value
+
+    def start_syncer(self):
+        """Keep the local snapshot in sync in the background"""
+        self.syncer.start()
+
+    async def close(self):
+        await self.syncer.stop()
+
+    def _load_new_rows(self) -> List[Dict[str, Any]]:
+        """Read ingestion JSONL files that haven't been synced yet"""
+        if self.snapshot_dir:
+            return self._load_from_directory(self.snapshot_dir)
+        return self._load_from_gcs()
+
+    def _load_from_directory(self, directory: str) -> List[Dict[str, Any]]:
+        rows = []
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if not name.endswith(".jsonl") or path in self._synced_objects:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    rows.extend(self._parse_jsonl(f.read()))
+                self._synced_objects.add(path)
+        return rows
+
+    def _load_from_gcs(self) -> List[Dict[str, Any]]:
+        rows = []
+        try:
+            client = cloud_clients.get("storage")
+            for blob in client.list_blobs(self.bucket_name, prefix=self.prefix):
+                if not blob.name.endswith(".jsonl") or blob.name in self._synced_objects:
+                    continue
+                rows.extend(self._parse_jsonl(blob.download_as_text()))
+                self._synced_objects.add(blob.name)
+        except ImportError:
+            logger.warning("google-cloud-storage not installed, local job index disabled")
+        except Exception as e:
+            logger.error(f"Failed to sync job index from gs://{self.bucket_name}/{self.prefix}: {str(e)}")
+        return rows
+
+    @staticmethod
+    def _parse_jsonl(content: str) -> List[Dict[str, Any]]:
+        rows = []
+        for line in content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return rows
+
+
+# Global instance
+job_index_service = JobIndexService()
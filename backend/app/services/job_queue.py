@@ -0,0 +1,132 @@
+"""
+Bounded in-process worker pool for background jobs with status tracking
+"""
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobQueue:
+    """
+    Runs submitted coroutines on a fixed number of worker tasks
+
+    Each job gets an id whose status ("queued", "processing", "completed",
+    "failed" or "cancelled") can be polled until it expires from the status
+    table.
+    """
+
+    def __init__(self, name: str, workers: int = 5, max_queue_size: int = 0, status_ttl: int = 3600):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self.jobs = TTLCache(maxsize=10000, ttl=status_ttl)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._done_events: Dict[str, asyncio.Event] = {}
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._worker_tasks)
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i), name=f"{self.name}_worker_{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} {self.name} workers")
+
+    async def stop(self):
+        """Cancel the workers; queued jobs are dropped and marked cancelled"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+        dropped = 0
+        while self._queue is not None and not self._queue.empty():
+            job_id = self._queue.get_nowait()[0]
+            self._finish(job_id, self.jobs.get(job_id) or {"job_id": job_id}, "cancelled", "Job queue stopped")
+            dropped += 1
+        if dropped:
+            logger.warning(f"Dropped {dropped} queued {self.name} jobs on stop")
+
+    def submit(self, func: Callable[..., Awaitable[Any]], *args, job_id: Optional[str] = None, **kwargs) -> str:
+        """
+        Queue a coroutine function for background execution
+
+        Raises asyncio.QueueFull if the queue is bounded and full.
+        """
+        if not self.running:
+            self.start()
+
+        job_id = job_id or str(uuid.uuid4())
+        self._queue.put_nowait((job_id, func, args, kwargs))
+        self._done_events[job_id] = asyncio.Event()
+        self.jobs.set(job_id, {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "completed_at": None,
+            "result": None,
+            "error": None
+        })
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status record"""
+        return self.jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for a queued or running job to finish and return its status record"""
+        event = self._done_events.get(job_id)
+        if event is not None:
+            await asyncio.wait_for(event.wait(), timeout)
+        return self.get_job(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "tracked_jobs": len(self.jobs)
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id, func, args, kwargs = await self._queue.get()
+            job = self.jobs.get(job_id) or {"job_id": job_id}
+            job.update(status="processing", started_at=datetime.utcnow().isoformat())
+            self.jobs.set(job_id, job)
+
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                self._finish(job_id, job, "cancelled", "Job queue stopped")
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} job {job_id} failed: {str(e)}")
+                self._finish(job_id, job, "failed", str(e))
+            else:
+                job["result"] = result
+                self._finish(job_id, job, "completed")
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job_id: str, job: Dict[str, Any], status: str, error: Optional[str] = None):
+        """Record a job's final status and wake anyone waiting on it"""
+        job.update(status=status, error=error, completed_at=datetime.utcnow().isoformat())
+        self.jobs.set(job_id, job)
+        event = self._done_events.pop(job_id, None)
+        if event is not None:
+            event.set()
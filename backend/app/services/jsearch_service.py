@@ -94,7 +94,7 @@ class JSearchService:
                     return {
                         "status": "success",
                         "message": "Jobs fetched successfully",
-                        "data": self._format_job_results(data.get("data", [])),
+                        "data": self.format_job_results(data.get("data", [])),
                         "parameters": data.get("parameters", {}),
                         "total_results": len(data.get("data", []))
                     }
@@ -121,8 +121,8 @@ class JSearchService:
                 "data": []
             }
     
-    def _format_job_results(self, jobs: List[Dict]) -> List[Dict]:
-        """Format job results to match our application schema"""
+    def format_job_results(self, jobs: List[Dict]) -> List[Dict]:
+        """Format raw JSearch postings (API results or ingested rows) to match our application schema"""
         formatted_jobs = []
         
         for job in jobs:
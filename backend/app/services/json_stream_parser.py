@@ -0,0 +1,124 @@
+"""
+Incremental JSON parser for streamed model output
+"""
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+Path = Tuple[Any, ...]
+
+
+class _Frame:
+    """An open object or array on the parser stack"""
+
+    __slots__ = ("kind", "path", "start", "key", "index", "expecting_key")
+
+    def __init__(self, kind: str, path: Path, start: int):
+        self.kind = kind
+        self.path = path
+        self.start = start
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expecting_key = kind == "object"
+
+    def child_path(self) -> Path:
+        return self.path + ((self.key,) if self.kind == "object" else (self.index,))
+
+
+class IncrementalJSONParser:
+    """
+    Emit selected values of a JSON document as soon as each one closes
+
+    Feed text chunks as they arrive. Any text before the first "{" (such as
+    a markdown code fence) is skipped. Watched paths are tuples of keys, where
+    "*" matches any array index, e.g. ("paraphrased_cv", "work_experience", "*").
+    """
+
+    def __init__(self, watch: Iterable[Path]):
+        self.watch = [tuple(path) for path in watch]
+        self.buffer = ""
+        self.done = False
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._token_start: Optional[int] = None  # start of the current string or scalar
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """Consume a chunk and return (path, value) pairs for watched values that closed"""
+        self.buffer += chunk
+        events: List[Tuple[Path, Any]] = []
+
+        buffer = self.buffer
+        while self._pos < len(buffer) and not self.done:
+            i = self._pos
+            c = buffer[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    self._close_string(i, events)
+                continue
+
+            if not self._stack:
+                if c == "{":
+                    self._stack.append(_Frame("object", (), i))
+                continue
+
+            frame = self._stack[-1]
+
+            if self._token_start is not None and c in ",}] \t\r\n":
+                self._close_scalar(i, events)
+
+            if c == '"':
+                self._in_string = True
+                self._token_start = i
+            elif c in "{[":
+                self._stack.append(_Frame("object" if c == "{" else "array", frame.child_path(), i))
+            elif c in "}]":
+                closed = self._stack.pop()
+                self.done = not self._stack
+                self._emit(closed.path, closed.start, i, events)
+            elif c == ":":
+                frame.expecting_key = False
+            elif c == ",":
+                if frame.kind == "object":
+                    frame.expecting_key = True
+                else:
+                    frame.index += 1
+            elif not c.isspace() and self._token_start is None:
+                # Start of a number, true, false or null
+                self._token_start = i
+
+        return events
+
+    def _close_string(self, end: int, events: List[Tuple[Path, Any]]):
+        frame = self._stack[-1]
+        start, self._token_start = self._token_start, None
+        if frame.kind == "object" and frame.expecting_key:
+            frame.key = json.loads(self.buffer[start:end + 1])
+        else:
+            self._emit(frame.child_path(), start, end, events)
+
+    def _close_scalar(self, end: int, events: List[Tuple[Path, Any]]):
+        start, self._token_start = self._token_start, None
+        self._emit(self._stack[-1].child_path(), start, end - 1, events)
+
+    def _emit(self, path: Path, start: int, end: int, events: List[Tuple[Path, Any]]):
+        """Decode buffer[start:end + 1] if its path is watched"""
+        if not any(self._matches(pattern, path) for pattern in self.watch):
+            return
+        try:
+            events.append((path, json.loads(self.buffer[start:end + 1])))
+        except json.JSONDecodeError:
+            pass
+
+    @staticmethod
+    def _matches(pattern: Path, path: Path) -> bool:
+        if len(pattern) != len(path):
+            return False
+        return all(p == "*" and isinstance(k, int) or p == k for p, k in zip(pattern, path))
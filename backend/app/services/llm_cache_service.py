@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for LLM completions
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCacheService:
+    """
+    Two-tier cache for model outputs keyed on everything that determines them
+
+    A process-local LRU tier answers repeat requests without a network hop,
+    and an optional Redis tier shares results across instances.
+    """
+
+    KEY_PREFIX = "llm_cache:"
+
+    def __init__(self):
+        self.ttl = int(os.getenv("LLM_CACHE_TTL", "604800"))  # 7 days
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+
+        # Redis is only used when explicitly configured
+        self.redis_host = os.getenv("REDIS_HOST")
+        self.redis_port = int(os.getenv("REDIS_PORT", "6379"))
+        self.redis_password = os.getenv("REDIS_PASSWORD") or None
+        self.redis_retry_after = 60  # seconds to wait after a Redis failure
+
+        self._local = TTLCache(maxsize=self.max_entries, ttl=self.ttl)
+        self._redis = None
+        self._redis_disabled_until = 0.0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt_version: str, user_prompt: str) -> str:
+        """Build a cache key from the model settings and a hash of the prompt"""
+        prompt_hash = hashlib.sha256(user_prompt.encode("utf-8")).hexdigest()
+        material = json.dumps([model, temperature, prompt_version, prompt_hash])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _get_redis(self):
+        """Get the Redis client, or None if Redis is unconfigured or backing off"""
+        if not self.redis_host or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError:
+                logger.warning("redis package not installed, LLM cache is process-local only")
+                self.redis_host = None
+                return None
+            self._redis = aioredis.Redis(
+                host=self.redis_host,
+                port=self.redis_port,
+                password=self.redis_password,
+                socket_connect_timeout=2,
+                socket_timeout=2
+            )
+        return self._redis
+
+    def _redis_failed(self, error: Exception):
+        logger.error(f"LLM cache Redis error: {str(error)}")
+        self._redis_disabled_until = time.monotonic() + self.redis_retry_after
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a cached completion, checking the local tier before Redis"""
+        if not self.enabled:
+            return None
+
+        value = self._local.get(key)
+        if value is None:
+            redis_client = self._get_redis()
+            if redis_client is not None:
+                try:
+                    data = await redis_client.get(f"{self.KEY_PREFIX}{key}")
+                    if data is not None:
+                        value = json.loads(data)
+                        self._local.set(key, value)
+                except Exception as e:
+                    self._redis_failed(e)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Store a completion in both tiers"""
+        if not self.enabled:
+            return
+
+        ttl = ttl or self.ttl
+        self._local.set(key, value, ttl)
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.setex(f"{self.KEY_PREFIX}{key}", ttl, json.dumps(value))
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def delete(self, key: str):
+        """Drop a cached completion from both tiers"""
+        self._local.delete(key)
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.delete(f"{self.KEY_PREFIX}{key}")
+            except Exception as e:
+                self._redis_failed(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-rate metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local_entries": len(self._local),
+            "shared_tier": bool(self.redis_host)
+        }
+
+
+# Global instance
+llm_cache_service = LLMCacheService()
@@ -0,0 +1,222 @@
+"""
+Admission control for LLM provider calls
+"""
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class LLMCall:
+    """Handle for an admitted call, used to report actual token usage"""
+
+    def __init__(self, user_id: str, estimated_tokens: int, priority: str = PRIORITY_INTERACTIVE):
+        self.user_id = user_id
+        self.estimated_tokens = estimated_tokens
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.future: Optional[asyncio.Future] = None
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.admitted_at or time.monotonic()) - self.enqueued_at
+
+    @property
+    def total_tokens(self) -> int:
+        if self.prompt_tokens is None and self.completion_tokens is None:
+            return self.estimated_tokens
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+    def record_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class LLMGateway:
+    """
+    Bounds concurrent LLM calls and token throughput, scheduling users fairly
+
+    Waiting calls are queued per user and admitted round-robin across users,
+    so a user with many queued requests can't starve everyone else. A call
+    is admitted when an in-flight slot is free and the token bucket holds
+    its estimated cost; the estimate is corrected once actual usage is known.
+
+    Background calls only run when no interactive call is waiting, may not
+    take the last LLM_RESERVED_INTERACTIVE_SLOTS slots, and leave
+    LLM_BACKGROUND_TOKEN_HEADROOM of the token bucket untouched.
+    """
+
+    def __init__(self):
+        self.max_in_flight = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+        self.tokens_per_minute = int(os.getenv("LLM_TOKENS_PER_MINUTE", "60000"))
+        reserved_slots = int(os.getenv("LLM_RESERVED_INTERACTIVE_SLOTS", "1"))
+        self.max_background_in_flight = max(1, self.max_in_flight - reserved_slots)
+        self.background_token_headroom = self.tokens_per_minute * float(os.getenv("LLM_BACKGROUND_TOKEN_HEADROOM", "0.25"))
+
+        self._queues: Dict[str, "OrderedDict[str, Deque[LLMCall]]"] = {
+            PRIORITY_INTERACTIVE: OrderedDict(),
+            PRIORITY_BACKGROUND: OrderedDict()
+        }
+        self._in_flight = 0
+        self._tokens = float(self.tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._refill_timer: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.total_calls = 0
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+        self.recent_calls: Deque[Dict[str, Any]] = deque(maxlen=100)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: str = "anonymous",
+        estimated_tokens: int = 1000,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[LLMCall]:
+        """Wait for admission, then hold an in-flight slot for the duration of the call"""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown LLM call priority: {priority}")
+        call = LLMCall(user_id, min(estimated_tokens, self.tokens_per_minute), priority)
+        call.future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(user_id, deque()).append(call)
+        self._dispatch()
+
+        try:
+            await call.future
+        except asyncio.CancelledError:
+            if call.future.done() and not call.future.cancelled():
+                self._release(call)
+            else:
+                self._remove_waiting(call)
+            raise
+
+        try:
+            yield call
+        finally:
+            self._release(call)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.tokens_per_minute),
+            self._tokens + (now - self._refilled_at) * self.tokens_per_minute / 60.0
+        )
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """Admit waiting calls round-robin across users while capacity allows"""
+        self._refill()
+
+        if not self._admit(self._queues[PRIORITY_INTERACTIVE], self.max_in_flight, 0.0):
+            return
+        if not self._queues[PRIORITY_INTERACTIVE]:
+            self._admit(self._queues[PRIORITY_BACKGROUND], self.max_background_in_flight, self.background_token_headroom)
+
+    def _admit(self, user_queues: "OrderedDict[str, Deque[LLMCall]]", slot_limit: int, token_headroom: float) -> bool:
+        """Admit calls from one priority level; returns False if blocked on the token bucket"""
+        while user_queues and self._in_flight < slot_limit:
+            user_id, queue = next(iter(user_queues.items()))
+            call = queue[0]
+
+            if call.future.done():
+                # Cancelled while waiting; its task will clean up
+                self._remove_waiting(call)
+                continue
+
+            needed = min(call.estimated_tokens + token_headroom, float(self.tokens_per_minute))
+            if self._tokens < needed:
+                # Wake up once the bucket has refilled enough for the next call
+                if self._refill_timer is None:
+                    delay = (needed - self._tokens) * 60.0 / self.tokens_per_minute
+                    self._refill_timer = asyncio.get_running_loop().call_later(delay, self._on_refill_timer)
+                return False
+
+            queue.popleft()
+            # Move this user to the back of the rotation
+            del user_queues[user_id]
+            if queue:
+                user_queues[user_id] = queue
+
+            self._tokens -= call.estimated_tokens
+            self._in_flight += 1
+            call.admitted_at = time.monotonic()
+            call.future.set_result(None)
+
+        return True
+
+    def _on_refill_timer(self):
+        self._refill_timer = None
+        self._dispatch()
+
+    def _remove_waiting(self, call: LLMCall):
+        user_queues = self._queues[call.priority]
+        queue = user_queues.get(call.user_id)
+        if queue and call in queue:
+            queue.remove(call)
+            if not queue:
+                del user_queues[call.user_id]
+
+    def _release(self, call: LLMCall):
+        """Free the slot, settle the token estimate against actual usage and record metrics"""
+        self._in_flight -= 1
+        self._refill()
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + call.estimated_tokens - call.total_tokens)
+
+        self.total_calls += 1
+        self.total_prompt_tokens += call.prompt_tokens or 0
+        self.total_completion_tokens += call.completion_tokens or 0
+        self.recent_calls.append({
+            "user_id": call.user_id,
+            "priority": call.priority,
+            "queue_wait_ms": round(call.queue_wait * 1000, 1),
+            "prompt_tokens": call.prompt_tokens,
+            "completion_tokens": call.completion_tokens,
+            "estimated_tokens": call.estimated_tokens
+        })
+
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queueing and token usage metrics"""
+        waits = sorted(call["queue_wait_ms"] for call in self.recent_calls)
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_background_in_flight": self.max_background_in_flight,
+            "queued": sum(len(queue) for queue in self._queues[PRIORITY_INTERACTIVE].values()),
+            "queued_users": len(self._queues[PRIORITY_INTERACTIVE]),
+            "queued_background": sum(len(queue) for queue in self._queues[PRIORITY_BACKGROUND].values()),
+            "tokens_available": int(self._tokens),
+            "tokens_per_minute": self.tokens_per_minute,
+            "total_calls": self.total_calls,
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "total_completion_tokens": self.total_completion_tokens,
+            "queue_wait_ms": {
+                "p50": waits[len(waits) // 2] if waits else 0.0,
+                "p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0
+            },
+            "recent_calls": list(self.recent_calls)[-10:]
+        }
+
+
+# Global instance
+llm_gateway = LLMGateway()
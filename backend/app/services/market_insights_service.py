@@ -0,0 +1,187 @@
+"""
+Market insights service backed by GitHub repository statistics
+"""
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any
+from datetime import datetime
+
+import aiohttp
+
+from .periodic_task import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Popular repositories in different tech categories
+TECH_REPOS = [
+    "microsoft/vscode",
+    "facebook/react",
+    "vuejs/vue",
+    "angular/angular",
+    "nodejs/node",
+    "python/cpython",
+    "golang/go",
+    "rust-lang/rust"
+]
+
+SKILL_NAME_OVERRIDES = {"vscode": "VS Code", "cpython": "Python"}
+
+FALLBACK_TRENDING_SKILLS = [
+    {"skill": "React", "demand_change": 0.25, "avg_salary": 95000},
+    {"skill": "Python", "demand_change": 0.30, "avg_salary": 105000},
+    {"skill": "TypeScript", "demand_change": 0.35, "avg_salary": 92000},
+    {"skill": "AWS", "demand_change": 0.40, "avg_salary": 110000},
+    {"skill": "Docker", "demand_change": 0.28, "avg_salary": 98000}
+]
+
+
+class MarketInsightsService:
+    """Precomputes market insights on a schedule using conditional GitHub requests"""
+
+    def __init__(self):
+        self.base_url = os.getenv("GITHUB_API_URL", "https://api.github.com")
+        self.token = os.getenv("GITHUB_TOKEN")
+        self.repos = TECH_REPOS[:int(os.getenv("MARKET_INSIGHTS_REPO_COUNT", "5"))]
+        self.refresh_interval = int(os.getenv("MARKET_INSIGHTS_REFRESH_INTERVAL", "900"))  # 15 minutes
+
+        # Per-repo validators and last known payloads for If-None-Match requests
+        self._etags: Dict[str, str] = {}
+        self._repo_data: Dict[str, Dict[str, Any]] = {}
+        # When GitHub last confirmed each repo's payload (200 or 304)
+        self._fetched_at: Dict[str, datetime] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        self.snapshot: Optional[Dict[str, Any]] = None
+        # One refresh at a time, so concurrent cold requests share the first fetch
+        self._refresh_lock = asyncio.Lock()
+        self.refresher = PeriodicTask("market_insights_refresh", self.refresh, self.refresh_interval)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        return self._session
+
+    def _get_headers(self, repo: str) -> Dict[str, str]:
+        """Get headers for GitHub API requests"""
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if repo in self._etags:
+            headers["If-None-Match"] = self._etags[repo]
+        return headers
+
+    async def _fetch_repo(self, repo: str) -> Optional[Dict[str, Any]]:
+        """Fetch repo stats, reusing the cached payload on 304 Not Modified"""
+        try:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}/repos/{repo}", headers=self._get_headers(repo)) as response:
+                if response.status == 304:
+                    # Conditional requests that return 304 don't count against the rate limit
+                    if repo in self._repo_data:
+                        self._fetched_at[repo] = datetime.utcnow()
+                    return self._repo_data.get(repo)
+
+                if response.status == 200:
+                    repo_data = await response.json()
+                    etag = response.headers.get("ETag")
+                    if etag:
+                        self._etags[repo] = etag
+                    self._repo_data[repo] = repo_data
+                    self._fetched_at[repo] = datetime.utcnow()
+                    return repo_data
+
+                logger.error(f"GitHub API error for {repo}: {response.status}")
+        except Exception as e:
+            logger.error(f"Error fetching repo {repo}: {str(e)}")
+
+        # Serve the last known stats if the refresh failed
+        return self._repo_data.get(repo)
+
+    async def refresh(self):
+        """Fetch repo stats concurrently and store a new insights snapshot"""
+        async with self._refresh_lock:
+            await self._refresh()
+
+    async def _refresh(self):
+        results = await asyncio.gather(*(self._fetch_repo(repo) for repo in self.repos))
+
+        trending_skills = []
+        fetched_at = []
+        for repo, repo_data in zip(self.repos, results):
+            if repo_data:
+                trending_skills.append(self._format_skill(repo, repo_data))
+                fetched_at.append(self._fetched_at[repo])
+
+        # As fresh as the stalest repo shown; None when serving the built-in fallback
+        data_freshness = min(fetched_at).isoformat() if fetched_at else None
+        self.snapshot = self._build_snapshot(trending_skills, data_freshness)
+        logger.info(f"Refreshed market insights snapshot from {len(trending_skills)} repositories")
+
+    async def get_insights(self) -> Dict[str, Any]:
+        """Get the precomputed insights snapshot, building it once if cold"""
+        if self.snapshot is None:
+            async with self._refresh_lock:
+                if self.snapshot is None:
+                    await self._refresh()
+        return self.snapshot
+
+    def start_refresher(self):
+        """Keep the insights snapshot warm in the background"""
+        self.refresher.start()
+
+    async def close(self):
+        """Stop the refresher and close the shared session"""
+        await self.refresher.stop()
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _format_skill(self, repo: str, repo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn repo stats into a trending skill entry"""
+        repo_name = repo.split('/')[-1]
+        skill_name = SKILL_NAME_OVERRIDES.get(repo_name, repo_name.replace('-', ' ').title())
+        stars = repo_data.get("stargazers_count", 0)
+
+        return {
+            "skill": skill_name,
+            "demand_change": min(0.45, stars / 100000),  # Normalize
+            "avg_salary": 95000 + (stars // 1000),  # Mock salary based on popularity
+            "github_stars": stars,
+            "github_forks": repo_data.get("forks_count", 0)
+        }
+
+    def _build_snapshot(self, trending_skills: List[Dict[str, Any]], data_freshness: Optional[str]) -> Dict[str, Any]:
+        """Combine GitHub data with internal market data"""
+        generated_at = datetime.utcnow().isoformat()
+
+        return {
+            "market_overview": {
+                "total_active_jobs": 125000,
+                "growth_rate": 0.15,
+                "average_salary_increase": 0.08,
+                "remote_job_percentage": 0.42,
+                "top_hiring_companies": [
+                    {"name": "Google", "open_positions": 1200},
+                    {"name": "Microsoft", "open_positions": 980},
+                    {"name": "Amazon", "open_positions": 1500},
+                    {"name": "Apple", "open_positions": 750},
+                    {"name": "Meta", "open_positions": 650}
+                ]
+            },
+            "trending_skills": trending_skills or FALLBACK_TRENDING_SKILLS,
+            "location_insights": [
+                {"city": "San Francisco", "avg_salary": 145000, "job_count": 15000, "cost_of_living_index": 1.8},
+                {"city": "Seattle", "avg_salary": 125000, "job_count": 12000, "cost_of_living_index": 1.4},
+                {"city": "New York", "avg_salary": 135000, "job_count": 18000, "cost_of_living_index": 1.7},
+                {"city": "Austin", "avg_salary": 110000, "job_count": 8000, "cost_of_living_index": 1.1},
+                {"city": "Remote", "avg_salary": 115000, "job_count": 25000, "cost_of_living_index": 1.0}
+            ],
+            "generated_at": generated_at,
+            "data_freshness": data_freshness,
+            "data_sources": ["github_api", "internal"] if trending_skills else ["internal"]
+        }
+
+
+# Global instance
+market_insights_service = MarketInsightsService()
@@ -4,14 +4,11 @@ Google Cloud Monitoring and Logging service
 import time
 import logging
 from typing import Dict, Any, Optional
-from google.cloud import monitoring_v3
-from google.cloud import logging as cloud_logging
-from google.cloud.monitoring_v3 import TimeSeries, Point, TimeInterval
-from google.api_core import exceptions
 import functools
 from datetime import datetime, timezone
 
 from app.config import settings
+from app.services.cloud_clients import cloud_clients
 
 logger = logging.getLogger(__name__)
 
@@ -19,11 +16,6 @@ logger = logging.getLogger(__name__)
 class MonitoringService:
     def __init__(self):
         self.project_id = settings.GCP_PROJECT_ID
-        self.monitoring_client = monitoring_v3.MetricServiceClient()
-        self.logging_client = cloud_logging.Client()
-        
-        # Set up structured logging
-        self.logging_client.setup_logging()
         
         # Custom metric names
         self.CV_PROCESSING_TIME = "custom.googleapis.com/cv_processing_time"
@@ -35,8 +27,26 @@ class MonitoringService:
         
         self.project_name = f"projects/{self.project_id}"
     
+    # Clients are shared process-wide and created on first use; this service is
+    # constructed per request by the middleware
+    @property
+    def monitoring_client(self):
+        return cloud_clients.get("monitoring")
+    
+    @property
+    def logging_client(self):
+        # Structured logging is set up when the client is first created
+        return cloud_clients.get("logging")
+    
+    def setup_logging(self):
+        """Route application logs to Google Cloud Logging"""
+        cloud_clients.get("logging")
+    
     def create_custom_metrics(self):
         """Create custom metrics in Google Cloud Monitoring"""
+        from google.cloud import monitoring_v3
+        from google.api_core import exceptions
+        
         metrics = [
             {
                 "type": self.CV_PROCESSING_TIME,
@@ -105,6 +115,8 @@ class MonitoringService:
     def record_metric(self, metric_type: str, value: float, labels: Optional[Dict[str, str]] = None):
         """Record a custom metric value"""
         try:
+            from google.cloud.monitoring_v3 import TimeSeries, Point, TimeInterval
+            
             # Create time series
             series = TimeSeries()
             series.metric.type = metric_type
@@ -245,7 +257,10 @@ class MonitoringService:
     
     def create_alert_policies(self):
         """Create alert policies for monitoring"""
-        alert_client = monitoring_v3.AlertPolicyServiceClient()
+        from google.cloud import monitoring_v3
+        from google.api_core import exceptions
+        
+        alert_client = cloud_clients.get("monitoring_alerts")
         
         policies = [
             {
@@ -0,0 +1,170 @@
+"""
+Hacker News service for tech/career industry news
+"""
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any
+from datetime import datetime
+
+import aiohttp
+
+from .ttl_cache import TTLCache
+from .periodic_task import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Keywords used to keep only tech/career related stories
+NEWS_KEYWORDS = ["tech", "ai", "programming", "software", "developer", "career", "job", "startup", "code"]
+
+
+class HackerNewsService:
+    """Concurrent, cached Hacker News client with a background-refreshed article list"""
+
+    def __init__(self):
+        self.base_url = os.getenv("HACKER_NEWS_URL", "https://hacker-news.firebaseio.com/v0")
+        self.max_concurrency = int(os.getenv("HACKER_NEWS_MAX_CONCURRENCY", "10"))
+        self.scan_depth = int(os.getenv("HACKER_NEWS_SCAN_DEPTH", "60"))
+        self.refresh_interval = int(os.getenv("HACKER_NEWS_REFRESH_INTERVAL", "300"))  # 5 minutes
+
+        # The top-stories list changes constantly, story items are immutable once fetched
+        self.top_stories_ttl = int(os.getenv("HACKER_NEWS_TOP_STORIES_TTL", "120"))  # 2 minutes
+        self.item_ttl = int(os.getenv("HACKER_NEWS_ITEM_TTL", "86400"))  # 24 hours
+
+        self._top_stories_cache = TTLCache(maxsize=1, ttl=self.top_stories_ttl)
+        self._item_cache = TTLCache(maxsize=2000, ttl=self.item_ttl)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._refresh_lock: Optional[asyncio.Lock] = None
+
+        # Warm, filtered, ready-to-serve article list
+        self.articles: List[Dict[str, Any]] = []
+        self.last_refreshed: Optional[datetime] = None
+
+        self.refresher = PeriodicTask("hacker_news_refresh", self.refresh, self.refresh_interval)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=10),
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency)
+            )
+        return self._session
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def get_top_story_ids(self) -> List[int]:
+        """Get top story IDs, cached for a short time"""
+        story_ids = self._top_stories_cache.get("top")
+        if story_ids is not None:
+            return story_ids
+
+        session = self._get_session()
+        async with session.get(f"{self.base_url}/topstories.json") as response:
+            if response.status != 200:
+                logger.error(f"Hacker News top stories error: {response.status}")
+                return []
+            story_ids = await response.json() or []
+
+        self._top_stories_cache.set("top", story_ids)
+        return story_ids
+
+    async def get_item(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """Get a single story item, served from cache when possible"""
+        item = self._item_cache.get(item_id)
+        if item is not None:
+            return item
+
+        try:
+            async with self._get_semaphore():
+                session = self._get_session()
+                async with session.get(f"{self.base_url}/item/{item_id}.json") as response:
+                    if response.status != 200:
+                        return None
+                    item = await response.json()
+        except Exception as e:
+            logger.error(f"Error fetching story {item_id}: {str(e)}")
+            return None
+
+        if item:
+            self._item_cache.set(item_id, item)
+        return item
+
+    async def get_items(self, item_ids: List[int]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch several items concurrently, preserving order"""
+        return await asyncio.gather(*(self.get_item(item_id) for item_id in item_ids))
+
+    async def refresh(self):
+        """Rebuild the filtered article list from the current top stories"""
+        async with self._get_refresh_lock():
+            story_ids = await self.get_top_story_ids()
+            stories = await self.get_items(story_ids[:self.scan_depth])
+
+            articles = [
+                self._format_article(story)
+                for story in stories
+                if self._is_relevant(story)
+            ]
+
+            if articles:
+                self.articles = articles
+                self.last_refreshed = datetime.utcnow()
+                logger.info(f"Refreshed Hacker News articles: {len(articles)} relevant stories")
+
+    async def get_articles(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Get up to `limit` relevant articles, refreshing only if nothing is warm yet"""
+        if not self.articles:
+            try:
+                # Piggyback on an in-flight refresh instead of starting a second one
+                lock = self._get_refresh_lock()
+                if lock.locked():
+                    async with lock:
+                        pass
+                if not self.articles:
+                    await self.refresh()
+            except Exception as e:
+                logger.error(f"Error fetching from Hacker News: {str(e)}")
+        return self.articles[:limit]
+
+    def start_refresher(self):
+        """Keep the article list warm in the background"""
+        self.refresher.start()
+
+    async def close(self):
+        """Stop the refresher and close the shared session"""
+        await self.refresher.stop()
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _get_refresh_lock(self) -> asyncio.Lock:
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        return self._refresh_lock
+
+    def _is_relevant(self, story: Optional[Dict[str, Any]]) -> bool:
+        """Check whether a story is a linked, tech/career related article"""
+        if not story or not story.get("title") or not story.get("url"):
+            return False
+        title = story["title"].lower()
+        return any(keyword in title for keyword in NEWS_KEYWORDS)
+
+    def _format_article(self, story: Dict[str, Any]) -> Dict[str, Any]:
+        """Format a story item to our article schema"""
+        return {
+            "id": f"hn_{story.get('id')}",
+            "title": story.get("title", ""),
+            "summary": f"Hacker News discussion with {story.get('descendants', 0)} comments",
+            "url": story.get("url", ""),
+            "published_at": datetime.fromtimestamp(story.get("time", 0)).isoformat() + "Z",
+            "source": "Hacker News",
+            "category": "tech_news",
+            "image_url": "https://via.placeholder.com/400x200?text=Hacker+News"
+        }
+
+
+# Global instance
+hacker_news_service = HackerNewsService()
@@ -0,0 +1,51 @@
+"""
+Helper for running an async refresh function on a fixed interval
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs a coroutine function in the background every `interval` seconds"""
+
+    def __init__(self, name: str, func: Callable[[], Awaitable[None]], interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background loop on the running event loop"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Started periodic task {self.name} (every {self.interval}s)")
+
+    async def stop(self):
+        """Cancel the background loop and wait for it to finish"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Stopped periodic task {self.name}")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {str(e)}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,148 @@
+"""
+Async prediction clients and dynamic micro-batching for Vertex AI endpoints
+"""
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cloud_clients import cloud_clients
+
+logger = logging.getLogger(__name__)
+
+
+class VertexPredictionClient:
+    """Runs the synchronous gapic PredictionServiceClient off the event loop"""
+
+    def __init__(self, prediction_client: Optional[Any] = None):
+        self._prediction_client = prediction_client
+
+    @property
+    def prediction_client(self) -> Any:
+        return self._prediction_client or cloud_clients.get("vertex_prediction")
+
+    async def predict(self, endpoint: str, instances: List[Dict[str, Any]]) -> List[Any]:
+        # Instances are sent as JSON strings, matching what the deployed models expect
+        instances_json = [json.dumps(instance) for instance in instances]
+        # First use creates the client, which is slow, so resolve it in the worker thread too
+        response = await asyncio.to_thread(
+            lambda: self.prediction_client.predict(endpoint=endpoint, instances=instances_json)
+        )
+        return list(response.predictions)
+
+
+class StubPredictionClient:
+    """
+    Local stand-in for a Vertex AI endpoint
+
+    Returns one canned prediction per instance (from a per-task handler if
+    given) after a fixed latency, and records the size of every batch it
+    receives so batching behaviour can be checked without GCP.
+    """
+
+    def __init__(
+        self,
+        handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = None,
+        latency: float = 0.05
+    ):
+        self.handlers = handlers or {}
+        self.latency = latency
+        self.calls: List[Tuple[str, int]] = []
+
+    async def predict(self, endpoint: str, instances: List[Dict[str, Any]]) -> List[Any]:
+        self.calls.append((endpoint, len(instances)))
+        await asyncio.sleep(self.latency)
+
+        predictions = []
+        for instance in instances:
+            handler = self.handlers.get(instance.get("task"))
+            predictions.append(handler(instance) if handler else {"echo": instance, "confidence": 1.0})
+        return predictions
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent single-instance predictions into multi-instance requests
+
+    Instances for the same endpoint are held for up to max_wait_ms, or until
+    max_batch_size are waiting, then sent as one request; each caller gets
+    the prediction at its own index back. If the request fails, every caller
+    in the batch sees the error.
+    """
+
+    def __init__(self, client: Any, max_batch_size: int = 16, max_wait_ms: int = 10):
+        self.client = client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._in_flight: set = set()
+
+        # Metrics
+        self.total_batches = 0
+        self.total_instances = 0
+        self.largest_batch = 0
+        self.total_latency = 0.0
+
+    async def predict(self, endpoint: str, instance: Dict[str, Any]) -> Any:
+        """Queue one instance and wait for its prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(endpoint, [])
+        pending.append((instance, future))
+
+        if len(pending) >= self.max_batch_size:
+            self._flush(endpoint)
+        elif endpoint not in self._timers:
+            self._timers[endpoint] = loop.call_later(self.max_wait, self._flush, endpoint)
+
+        return await future
+
+    def _flush(self, endpoint: str):
+        timer = self._timers.pop(endpoint, None)
+        if timer:
+            timer.cancel()
+
+        batch = [(instance, future) for instance, future in self._pending.pop(endpoint, []) if not future.done()]
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._send(endpoint, batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, endpoint: str, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        started = time.monotonic()
+        try:
+            predictions = await self.client.predict(endpoint, [instance for instance, _ in batch])
+            if len(predictions) != len(batch):
+                raise ValueError(f"Expected {len(batch)} predictions from {endpoint}, got {len(predictions)}")
+        except Exception as e:
+            logger.error(f"Batched prediction failed for endpoint {endpoint} ({len(batch)} instances): {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.total_batches += 1
+            self.total_instances += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.total_latency += time.monotonic() - started
+
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.total_batches,
+            "instances": self.total_instances,
+            "average_batch_size": round(self.total_instances / self.total_batches, 2) if self.total_batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "average_latency_ms": round(self.total_latency / self.total_batches * 1000, 1) if self.total_batches else 0.0,
+            "pending": sum(len(pending) for pending in self._pending.values()),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000)
+        }
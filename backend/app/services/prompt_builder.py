@@ -0,0 +1,242 @@
+"""
+Compact prompt construction for CV analysis and paraphrasing
+"""
+import os
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from .llm_gateway import estimate_tokens
+
+try:
+    from app.ml.cv_processing.extractor import CVExtractor
+except ImportError:
+    # main_simple runs with the app directory itself on sys.path
+    from ml.cv_processing.extractor import CVExtractor
+
+logger = logging.getLogger(__name__)
+
+# Sections in the order they are rendered, most important first; trimming
+# to fit the budget starts from the end of this list
+SECTION_PRIORITY = ["header", "summary", "experience", "skills", "achievements", "education", "projects", "certifications"]
+
+CONTACT_PATTERN = re.compile(r"@|https?://|www\.|linkedin\.com", re.IGNORECASE)
+# Runs of digits with phone-style separators, e.g. "+44 7700 900123", "(555) 123-4567"
+PHONE_PATTERN = re.compile(r"\+?\(?\d[\d\s().-]{7,}\d")
+# Dates and date ranges, e.g. "2019", "06/2018 - 09/2021", "01.2019-12.2021", "2021 - Present"
+DATE_RANGE_PATTERN = re.compile(
+    r"(?:\d{1,2}[./-])?(?:19|20)\d{2}(?:\s*[-–—]\s*(?:(?:\d{1,2}[./-])?(?:19|20)\d{2}|present|current|now))?",
+    re.IGNORECASE
+)
+BULLET_PATTERN = re.compile(r"^[•●▪◦*·–-]\s*")
+
+# Minified response skeletons; the keys match what the response parsers expect
+PARAPHRASE_SCHEMA = json.dumps({
+    "paraphrased_cv": {
+        "professional_summary": "str",
+        "work_experience": [{"company": "str", "position": "str", "duration": "str", "description": "str"}],
+        "skills": ["str"],
+        "education": "str",
+        "key_achievements": ["str"]
+    },
+    "optimization_notes": {
+        "keywords_added": ["str"],
+        "skills_emphasized": ["str"],
+        "experience_reframed": ["str"],
+        "suggestions": ["str"]
+    },
+    "match_analysis": {
+        "alignment_score": "0-1",
+        "strengths": ["str"],
+        "areas_to_highlight": ["str"],
+        "missing_elements": ["str"]
+    }
+}, separators=(",", ":"))
+
+ANALYSIS_SCHEMA = json.dumps({
+    "cv_sections": {
+        "professional_summary": "str",
+        "work_experience": [{
+            "company": "str",
+            "position": "str",
+            "duration": "str",
+            "description": "str",
+            "transferable_skills": ["str"],
+            "paraphrasing_potential": "0-1"
+        }],
+        "skills": {"technical": ["str"], "soft": ["str"], "industry_specific": ["str"]},
+        "education": "str",
+        "achievements": ["str"]
+    },
+    "optimization_areas": [{
+        "section": "str",
+        "current_focus": "str",
+        "optimization_potential": "str",
+        "paraphrasing_score": "0-1"
+    }],
+    "transferable_experiences": [{"experience": "str", "applicable_roles": ["str"], "paraphrasing_variations": ["str"]}],
+    "paraphrasing_score": "0-1",
+    "readiness_assessment": {
+        "structure_quality": "0-1",
+        "content_depth": "0-1",
+        "keyword_optimization_potential": "0-1",
+        "overall_paraphrasing_readiness": "0-1"
+    },
+    "recommended_job_types": ["str"],
+    "paraphrasing_strategy": {
+        "high_impact_sections": ["str"],
+        "keyword_opportunities": ["str"],
+        "customization_areas": ["str"]
+    }
+}, separators=(",", ":"))
+
+CAREER_ANALYSIS_SCHEMA = json.dumps({
+    "skills": {"technical": ["str"], "soft": ["str"], "proficiency_levels": {"skill": "beginner|intermediate|advanced|expert"}},
+    "experience": {"years": "int", "level": "entry|mid|senior|lead", "roles": ["str"]},
+    "education": {"degrees": ["str"], "certifications": ["str"]},
+    "strengths": ["str"],
+    "improvement_areas": ["str"],
+    "career_paths": ["str"],
+    "readiness_score": "0-1",
+    "recommendations": ["str"]
+}, separators=(",", ":"))
+
+
+class PromptBuilder:
+    """
+    Builds user prompts from extracted CV sections within a token budget
+
+    The CV is split into sections with CVExtractor, whitespace and repeated
+    lines are collapsed, contact details are dropped, and the lowest-priority
+    sections are trimmed until the whole prompt fits the per-call budget.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, dedupe_lines: bool = True):
+        self.token_budget = token_budget or int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "3000"))
+        self.dedupe_lines = dedupe_lines
+        self.job_description_budget = int(os.getenv("LLM_JOB_DESCRIPTION_TOKEN_BUDGET", "600"))
+        self._extractor: Optional[CVExtractor] = None
+
+    @property
+    def extractor(self) -> CVExtractor:
+        if self._extractor is None:
+            self._extractor = CVExtractor()
+        return self._extractor
+
+    def build_paraphrase_prompt(self, cv_text: str, job_title: str, job_description: Optional[str] = None) -> str:
+        """User prompt for paraphrasing a CV towards a target job"""
+        job_description = self.truncate(
+            normalize_whitespace(job_description) if job_description else "Not provided",
+            min(self.job_description_budget, self.token_budget // 4)
+        )
+        template = (
+            "Paraphrase this CV for the target job. Reply with JSON only, matching:\n"
+            f"{PARAPHRASE_SCHEMA}\n\n"
+            f"TARGET JOB: {job_title}\n"
+            f"JOB DESCRIPTION: {job_description}\n\n"
+            "CV:\n{cv}"
+        )
+        return self._fill(template, cv_text)
+
+    def build_analysis_prompt(self, cv_text: str, user_profile: Optional[Dict[str, Any]] = None) -> str:
+        """User prompt for analyzing a CV's paraphrasing potential"""
+        return self._build_profile_prompt(
+            "Analyze this CV for paraphrasing and job application optimization.",
+            ANALYSIS_SCHEMA, cv_text, user_profile
+        )
+
+    def build_career_analysis_prompt(self, cv_text: str, user_profile: Optional[Dict[str, Any]] = None) -> str:
+        """User prompt for a skills, experience and career readiness analysis"""
+        return self._build_profile_prompt(
+            "Analyze this CV's skills, experience and career readiness.",
+            CAREER_ANALYSIS_SCHEMA, cv_text, user_profile
+        )
+
+    def _build_profile_prompt(self, task: str, schema: str, cv_text: str, user_profile: Optional[Dict[str, Any]]) -> str:
+        profile = "; ".join(f"{key}: {value}" for key, value in (user_profile or {}).items() if value)
+        template = (
+            f"{task} Reply with JSON only, matching:\n"
+            f"{schema}\n\n"
+            + (f"USER PROFILE: {profile}\n\n" if profile else "")
+            + "CV:\n{cv}"
+        )
+        return self._fill(template, cv_text)
+
+    def compact_cv(self, cv_text: str, token_budget: Optional[int] = None) -> str:
+        """Render the CV as compact labelled sections, trimmed to the token budget"""
+        sections = self.extractor.extract_sections(cv_text)
+
+        rendered: Dict[str, List[str]] = {}
+        seen = set()
+        for name in sorted(sections, key=self._section_rank):
+            lines = []
+            for line in sections[name].splitlines():
+                line = BULLET_PATTERN.sub("- ", normalize_whitespace(line))
+                key = line.lower().lstrip("- ")
+                if not key or (self.dedupe_lines and key in seen):
+                    continue
+                if is_contact_line(line):
+                    continue
+                seen.add(key)
+                lines.append(line)
+            if lines:
+                rendered[name] = lines
+
+        budget = token_budget or self.token_budget
+        text = self._render(rendered)
+        # Drop lines from the lowest-priority sections until the CV fits
+        for name in sorted(rendered, key=self._section_rank, reverse=True):
+            while estimate_tokens(text) > budget and rendered[name]:
+                rendered[name].pop()
+                text = self._render(rendered)
+            if estimate_tokens(text) <= budget:
+                break
+
+        return text
+
+    def truncate(self, text: str, token_budget: int) -> str:
+        """Cut text to roughly token_budget tokens"""
+        if estimate_tokens(text) <= token_budget:
+            return text
+        return text[:token_budget * 4].rsplit(" ", 1)[0] + " ..."
+
+    def _fill(self, template: str, cv_text: str) -> str:
+        """Put the compacted CV into the template using whatever budget is left"""
+        fixed_tokens = estimate_tokens(template.replace("{cv}", ""))
+        cv_budget = max(self.token_budget - fixed_tokens, 200)
+        return template.replace("{cv}", self.compact_cv(cv_text, cv_budget))
+
+    @staticmethod
+    def _section_rank(name: str) -> int:
+        return SECTION_PRIORITY.index(name) if name in SECTION_PRIORITY else len(SECTION_PRIORITY)
+
+    @staticmethod
+    def _render(sections: Dict[str, List[str]]) -> str:
+        return "\n".join(
+            f"[{name.upper()}]\n" + "\n".join(lines)
+            for name, lines in sections.items()
+            if lines
+        )
+
+
+def is_contact_line(line: str) -> bool:
+    """Check whether a line holds contact details (email, URL or phone number)"""
+    if CONTACT_PATTERN.search(line):
+        return True
+    for match in PHONE_PATTERN.finditer(line):
+        number = match.group().strip(" ().-")
+        digits = sum(c.isdigit() for c in number)
+        # Employment dates ("01.2019-12.2021") have phone-like digit runs too
+        if 9 <= digits <= 15 and not DATE_RANGE_PATTERN.fullmatch(number):
+            return True
+    return False
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of whitespace into single spaces"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Global instance
+prompt_builder = PromptBuilder()
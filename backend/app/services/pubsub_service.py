@@ -2,32 +2,129 @@
 Google Cloud Pub/Sub service for asynchronous processing
 """
 import json
+import time
 import asyncio
-from typing import Dict, Any, Optional
-from google.cloud import pubsub_v1
-from google.cloud.pubsub_v1.types import PubsubMessage
+from typing import Dict, Any, List, Optional
 import logging
 
 from app.config import settings
+from app.services.task_queue import TaskQueueBackend, get_task_queue
 
 logger = logging.getLogger(__name__)
 
 
-class PubSubService:
+class PublishMetrics:
+    """Publish latency and volume, shared by all PubSubService instances"""
+    
     def __init__(self):
+        self.published = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.bulk_calls = 0
+        self.bulk_messages = 0
+        self.largest_bulk = 0
+    
+    def started(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+    
+    def finished(self, latency: float, success: bool):
+        self.in_flight -= 1
+        if success:
+            self.published += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        else:
+            self.failed += 1
+    
+    def bulk(self, size: int):
+        self.bulk_calls += 1
+        self.bulk_messages += size
+        self.largest_bulk = max(self.largest_bulk, size)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "published": self.published,
+            "failed": self.failed,
+            "average_latency_ms": round(self.total_latency / self.published * 1000, 1) if self.published else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "in_flight": self.in_flight,
+            # Messages awaiting acknowledgement together; the client groups these into batches
+            "peak_in_flight": self.peak_in_flight,
+            "bulk_publishes": self.bulk_calls,
+            "average_bulk_size": round(self.bulk_messages / self.bulk_calls, 1) if self.bulk_calls else 0.0,
+            "largest_bulk": self.largest_bulk,
+            "batch_settings": {
+                "max_messages": settings.PUBSUB_BATCH_MAX_MESSAGES,
+                "max_bytes": settings.PUBSUB_BATCH_MAX_BYTES,
+                "max_latency_ms": round(settings.PUBSUB_BATCH_MAX_LATENCY * 1000, 1)
+            }
+        }
+
+
+class PubSubService:
+    def __init__(self, queue: Optional[TaskQueueBackend] = None):
         self.project_id = settings.GCP_PROJECT_ID
-        self.publisher = pubsub_v1.PublisherClient()
-        self.subscriber = pubsub_v1.SubscriberClient()
+        self._queue = queue
         
         # Topic names
         self.cv_processing_topic = f"projects/{self.project_id}/topics/cv-processing"
         self.recommendation_topic = f"projects/{self.project_id}/topics/recommendations"
         self.notification_topic = f"projects/{self.project_id}/topics/notifications"
+        self.cv_processing_dead_letter_topic = f"projects/{self.project_id}/topics/{settings.PUBSUB_CV_PROCESSING_DEAD_LETTER_TOPIC}"
+        self.recommendation_dead_letter_topic = f"projects/{self.project_id}/topics/{settings.PUBSUB_RECOMMENDATIONS_DEAD_LETTER_TOPIC}"
         
         # Subscription names
         self.cv_processing_subscription = f"projects/{self.project_id}/subscriptions/cv-processing-sub"
         self.recommendation_subscription = f"projects/{self.project_id}/subscriptions/recommendations-sub"
         self.notification_subscription = f"projects/{self.project_id}/subscriptions/notifications-sub"
+        self.cv_processing_dead_letter_subscription = f"projects/{self.project_id}/subscriptions/{settings.PUBSUB_CV_PROCESSING_DEAD_LETTER_TOPIC}-sub"
+        self.recommendation_dead_letter_subscription = f"projects/{self.project_id}/subscriptions/{settings.PUBSUB_RECOMMENDATIONS_DEAD_LETTER_TOPIC}-sub"
+    
+    @property
+    def queue(self) -> TaskQueueBackend:
+        # Pub/Sub unless TASK_QUEUE_BACKEND selects Redis streams or the in-memory queue
+        return self._queue or get_task_queue()
+    
+    async def publish(self, topic: str, message_data: Dict[str, Any], **attributes: str) -> str:
+        """
+        Publish one JSON message without blocking the event loop
+
+        The Pub/Sub publisher batches messages in the background; this awaits
+        the returned future instead of blocking on it.
+        """
+        data = json.dumps(message_data).encode("utf-8")
+        started = time.monotonic()
+        publish_metrics.started()
+        try:
+            message_id = await self.queue.publish(topic, data, **attributes)
+        except Exception:
+            publish_metrics.finished(time.monotonic() - started, success=False)
+            raise
+        publish_metrics.finished(time.monotonic() - started, success=True)
+        return message_id
+    
+    async def publish_many(self, topic: str, messages: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Publish many messages at once, e.g. fanning an alert out to many users
+
+        All messages are handed to the publisher before any is awaited, so they
+        share batches. Returns the message ID for each message, or None where
+        publishing failed.
+        """
+        publish_metrics.bulk(len(messages))
+        results = await asyncio.gather(
+            *(self.publish(topic, message) for message in messages),
+            return_exceptions=True
+        )
+        
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logger.error(f"Failed to publish {len(failed)}/{len(messages)} messages to {topic}: {str(failed[0])}")
+        return [None if isinstance(result, Exception) else result for result in results]
     
     async def publish_cv_processing_task(self, cv_id: str, user_id: str, analysis_type: str = "full"):
         """Publish CV processing task to Pub/Sub"""
@@ -39,12 +136,7 @@ class PubSubService:
                 "timestamp": asyncio.get_event_loop().time()
             }
             
-            # Convert to bytes
-            data = json.dumps(message_data).encode("utf-8")
-            
-            # Publish message
-            future = self.publisher.publish(self.cv_processing_topic, data)
-            message_id = future.result()
+            message_id = await self.publish(self.cv_processing_topic, message_data)
             
             logger.info(f"Published CV processing task: {message_id}")
             return message_id
@@ -53,18 +145,18 @@ class PubSubService:
             logger.error(f"Failed to publish CV processing task: {str(e)}")
             raise
     
-    async def publish_recommendation_update(self, user_id: str, trigger: str = "cv_updated"):
-        """Publish recommendation update task"""
+    async def publish_recommendation_update(self, user_id: str, trigger: str = "cv_updated", triggers: Optional[List[str]] = None):
+        """Publish recommendation update task (triggers: every reason coalesced into it)"""
         try:
+            triggers = triggers or [trigger]
             message_data = {
                 "user_id": user_id,
-                "trigger": trigger,
+                "trigger": triggers[0],
+                "triggers": triggers,
                 "timestamp": asyncio.get_event_loop().time()
             }
             
-            data = json.dumps(message_data).encode("utf-8")
-            future = self.publisher.publish(self.recommendation_topic, data)
-            message_id = future.result()
+            message_id = await self.publish(self.recommendation_topic, message_data)
             
             logger.info(f"Published recommendation update: {message_id}")
             return message_id
@@ -76,16 +168,10 @@ class PubSubService:
     async def publish_notification(self, user_id: str, notification_type: str, data: Dict[str, Any]):
         """Publish notification to user"""
         try:
-            message_data = {
-                "user_id": user_id,
-                "type": notification_type,
-                "data": data,
-                "timestamp": asyncio.get_event_loop().time()
-            }
-            
-            message_bytes = json.dumps(message_data).encode("utf-8")
-            future = self.publisher.publish(self.notification_topic, message_bytes)
-            message_id = future.result()
+            message_id = await self.publish(
+                self.notification_topic,
+                self._notification_message(user_id, notification_type, data)
+            )
             
             logger.info(f"Published notification: {message_id}")
             return message_id
@@ -94,91 +180,133 @@ class PubSubService:
             logger.error(f"Failed to publish notification: {str(e)}")
             raise
     
+    async def publish_notifications(self, user_ids: List[str], notification_type: str, data: Dict[str, Any]) -> List[Optional[str]]:
+        """Publish the same notification to many users (e.g. market trend alerts)"""
+        message_ids = await self.publish_many(
+            self.notification_topic,
+            [self._notification_message(user_id, notification_type, data) for user_id in user_ids]
+        )
+        logger.info(f"Published {notification_type} notification to {sum(1 for m in message_ids if m)}/{len(user_ids)} users")
+        return message_ids
+    
+    @staticmethod
+    def _notification_message(user_id: str, notification_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "type": notification_type,
+            "data": data,
+            "timestamp": asyncio.get_event_loop().time()
+        }
+    
     def create_topics_and_subscriptions(self):
         """Create Pub/Sub topics and subscriptions"""
         topics = [
             self.cv_processing_topic,
             self.recommendation_topic,
-            self.notification_topic
+            self.notification_topic,
+            self.cv_processing_dead_letter_topic,
+            self.recommendation_dead_letter_topic
         ]
         
         subscriptions = [
             (self.cv_processing_subscription, self.cv_processing_topic),
             (self.recommendation_subscription, self.recommendation_topic),
-            (self.notification_subscription, self.notification_topic)
+            (self.notification_subscription, self.notification_topic),
+            # Failed tasks are kept here for inspection and replay
+            (self.cv_processing_dead_letter_subscription, self.cv_processing_dead_letter_topic),
+            (self.recommendation_dead_letter_subscription, self.recommendation_dead_letter_topic)
         ]
         
         # Create topics
         for topic_path in topics:
             try:
-                self.publisher.create_topic(request={"name": topic_path})
+                self.queue.create_topic(topic_path)
                 logger.info(f"Created topic: {topic_path}")
             except Exception as e:
-                if "already exists" not in str(e).lower():
-                    logger.error(f"Failed to create topic {topic_path}: {str(e)}")
+                logger.error(f"Failed to create topic {topic_path}: {str(e)}")
         
         # Create subscriptions
         for subscription_path, topic_path in subscriptions:
             try:
-                self.subscriber.create_subscription(
-                    request={
-                        "name": subscription_path,
-                        "topic": topic_path,
-                        "ack_deadline_seconds": 600  # 10 minutes
-                    }
-                )
+                self.queue.create_subscription(subscription_path, topic_path, ack_deadline_seconds=600)  # 10 minutes
                 logger.info(f"Created subscription: {subscription_path}")
             except Exception as e:
-                if "already exists" not in str(e).lower():
-                    logger.error(f"Failed to create subscription {subscription_path}: {str(e)}")
+                logger.error(f"Failed to create subscription {subscription_path}: {str(e)}")
 
 
 # Background task processor
 class BackgroundTaskProcessor:
     def __init__(self):
-        self.pubsub_service = PubSubService()
-        self.subscriber = pubsub_v1.SubscriberClient()
-    
-    async def start_cv_processing_worker(self):
-        """Start CV processing worker"""
-        from app.services.cv_service import CVService
-        from app.database import SessionLocal
-        
-        def callback(message: PubsubMessage):
-            try:
-                # Parse message
-                data = json.loads(message.data.decode("utf-8"))
-                cv_id = data["cv_id"]
-                user_id = data["user_id"]
-                analysis_type = data.get("analysis_type", "full")
-                
-                # Process CV
-                db = SessionLocal()
-                cv_service = CVService(db)
-                
-                # Run async processing
-                asyncio.create_task(
-                    cv_service.process_cv_background(cv_id, analysis_type)
-                )
-                
-                # Acknowledge message
-                message.ack()
-                logger.info(f"Processed CV processing task: {cv_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to process CV task: {str(e)}")
-                message.nack()
+        from app.services.pubsub_worker import PubSubWorker
         
-        # Start subscriber
-        streaming_pull_future = self.subscriber.subscribe(
+        self.pubsub_service = PubSubService()
+        self.cv_processing_worker = PubSubWorker(
+            "cv_processing",
             self.pubsub_service.cv_processing_subscription,
-            callback=callback
+            self._process_cv_message,
+            max_messages=settings.PUBSUB_WORKER_MAX_MESSAGES,
+            max_attempts=settings.PUBSUB_MAX_DELIVERY_ATTEMPTS,
+            dead_letter_topic=self.pubsub_service.cv_processing_dead_letter_topic,
+            on_dead_letter=self._notify_cv_failed
+        )
+        self.recommendation_worker = PubSubWorker(
+            "recommendations",
+            self.pubsub_service.recommendation_subscription,
+            self._process_recommendation_message,
+            max_messages=settings.PUBSUB_WORKER_MAX_MESSAGES,
+            max_attempts=settings.PUBSUB_MAX_DELIVERY_ATTEMPTS,
+            dead_letter_topic=self.pubsub_service.recommendation_dead_letter_topic
         )
+    
+    def start(self):
+        """Start the subscription workers"""
+        self.cv_processing_worker.start()
+        self.recommendation_worker.start()
+    
+    async def stop(self):
+        """Stop the workers, letting in-flight messages finish"""
+        await asyncio.gather(
+            self.cv_processing_worker.stop_async(),
+            self.recommendation_worker.stop_async()
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cv_processing": self.cv_processing_worker.stats(),
+            "recommendations": self.recommendation_worker.stats()
+        }
+    
+    @staticmethod
+    async def _process_cv_message(data: Dict[str, Any]):
+        """Process one CV processing task; raising makes Pub/Sub redeliver it"""
+        from app.services.cv_service import process_cv_job
         
-        logger.info("Started CV processing worker")
+        cv_id = data["cv_id"]
+        # Failure is reported once, when the task is dead-lettered, not per attempt
+        result = await process_cv_job(cv_id, data.get("analysis_type", "full"), notify_failure=False)
+        if result["analysis_status"] != "completed":
+            raise RuntimeError(f"CV {cv_id} processing failed: {result['error']}")
+        logger.info(f"Processed CV processing task: {cv_id}")
+    
+    @staticmethod
+    async def _notify_cv_failed(data: Dict[str, Any], error: str):
+        """Tell the user their CV failed once the task has used up its retries"""
+        from app.services.websocket_service import notification_service
         
-        try:
-            streaming_pull_future.result()
-        except KeyboardInterrupt:
-            streaming_pull_future.cancel()
-            logger.info("Stopped CV processing worker")
\ No newline at end of file
+        if not data.get("user_id"):
+            logger.warning(f"Can't notify failure of CV {data.get('cv_id')}: task has no user_id")
+            return
+        await notification_service.notify_cv_processing_complete(str(data["user_id"]), str(data["cv_id"]), False)
+    
+    @staticmethod
+    async def _process_recommendation_message(data: Dict[str, Any]):
+        """Recompute a user's recommendations, unless another worker already is"""
+        from app.services.recommendation_updates import recommendation_update_runner, recompute_recommendations
+        
+        triggers = data.get("triggers") or [data.get("trigger", "cv_updated")]
+        await recommendation_update_runner.run(data["user_id"], triggers, recompute_recommendations)
+
+
+# Global instances
+publish_metrics = PublishMetrics()
+background_task_processor = BackgroundTaskProcessor()
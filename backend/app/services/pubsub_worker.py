@@ -0,0 +1,238 @@
+"""
+Async worker runtime for Pub/Sub subscriptions
+"""
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .task_queue import TaskQueueBackend, get_task_queue
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+DeadLetterHandler = Callable[[Dict[str, Any], str], Awaitable[Any]]
+
+
+class PubSubWorker:
+    """
+    Processes a subscription's messages with an async handler on a dedicated event loop
+
+    The queue backend delivers messages on its own threads; each one is
+    handed to a private event loop running in a background thread, so the
+    handler can be a coroutine without touching the API server's loop. Flow
+    control caps how many messages are outstanding at once. A message is
+    acked only after the handler succeeds and nacked otherwise, so Pub/Sub
+    redelivers it; after max_attempts deliveries (or if it isn't valid JSON)
+    it is published to the dead-letter topic and acked, and on_dead_letter is
+    called with the message data and the last error.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        subscription: str,
+        handler: MessageHandler,
+        max_messages: int = 5,
+        max_attempts: int = 5,
+        dead_letter_topic: Optional[str] = None,
+        queue: Optional[TaskQueueBackend] = None,
+        on_dead_letter: Optional[DeadLetterHandler] = None
+    ):
+        self.name = name
+        self.subscription = subscription
+        self.handler = handler
+        self.max_messages = max(1, max_messages)
+        self.max_attempts = max(1, max_attempts)
+        self.dead_letter_topic = dead_letter_topic
+        self._queue = queue
+        self.on_dead_letter = on_dead_letter
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._streaming_pull = None
+        self._tasks: Set[asyncio.Future] = set()
+        # Delivery counts for subscriptions without a dead-letter policy (no delivery_attempt)
+        self._attempts = TTLCache(maxsize=10000, ttl=3600)
+
+        # Metrics
+        self.received = 0
+        self.acked = 0
+        self.nacked = 0
+        self.dead_lettered = 0
+        self.total_processing = 0.0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._ack_times: deque = deque()
+
+    @property
+    def queue(self) -> TaskQueueBackend:
+        return self._queue or get_task_queue()
+
+    @property
+    def running(self) -> bool:
+        return self._streaming_pull is not None and not self._streaming_pull.done()
+
+    def start(self):
+        """Start the worker loop thread and open the streaming pull"""
+        if self.running:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=f"{self.name}_loop", daemon=True)
+        self._thread.start()
+
+        try:
+            self._streaming_pull = self.queue.subscribe(self.subscription, self._on_message, self.max_messages)
+        except Exception:
+            self.stop()
+            raise
+        logger.info(f"Started {self.name} worker on {self.subscription} (max {self.max_messages} in flight)")
+
+    def stop(self, timeout: float = 30.0):
+        """Stop pulling, let in-flight messages finish, then stop the loop thread"""
+        if self._streaming_pull is not None:
+            self._streaming_pull.cancel()
+            try:
+                self._streaming_pull.result(timeout=timeout)
+            except Exception:
+                pass
+            self._streaming_pull = None
+
+        if self._loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._drain(), self._loop).result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"{self.name} worker stopped with messages in flight: {str(e)}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=timeout)
+            self._loop.close()
+            self._loop = None
+        logger.info(f"Stopped {self.name} worker")
+
+    async def stop_async(self, timeout: float = 30.0):
+        """stop() for callers on an event loop"""
+        await asyncio.to_thread(self.stop, timeout)
+
+    def _on_message(self, message):
+        # Runs on a subscriber thread; hand off to the worker loop without blocking it
+        future = asyncio.run_coroutine_threadsafe(self._handle(message), self._loop)
+        self._tasks.add(future)
+        future.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, message):
+        self.received += 1
+        started = time.monotonic()
+        lag = self._lag(message)
+        if lag is not None:
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+        attempt = message.delivery_attempt or self._count_attempt(message.message_id)
+
+        try:
+            data = json.loads(message.data.decode("utf-8"))
+        except ValueError as e:
+            # Redelivering a malformed message can't help
+            await self._dead_letter(message, f"Invalid message: {str(e)}", attempt)
+            return
+
+        try:
+            await self.handler(data)
+        except Exception as e:
+            if attempt >= self.max_attempts:
+                logger.error(f"{self.name} message {message.message_id} failed {attempt} times: {str(e)}")
+                if await self._dead_letter(message, str(e), attempt) and self.on_dead_letter is not None:
+                    try:
+                        await self.on_dead_letter(data, str(e))
+                    except Exception as hook_error:
+                        logger.error(f"{self.name} dead-letter handler failed for {message.message_id}: {str(hook_error)}")
+            else:
+                logger.warning(f"{self.name} message {message.message_id} failed (attempt {attempt}), retrying: {str(e)}")
+                self.nacked += 1
+                message.nack()
+            return
+
+        message.ack()
+        self._attempts.delete(message.message_id)
+        self.acked += 1
+        self.total_processing += time.monotonic() - started
+        self._ack_times.append(time.monotonic())
+        self._prune_ack_times()
+
+    async def _dead_letter(self, message, error: str, attempt: int) -> bool:
+        """Move a message to the dead-letter topic; False if it was nacked instead"""
+        if self.dead_letter_topic:
+            try:
+                await self.queue.publish(
+                    self.dead_letter_topic,
+                    message.data,
+                    source_subscription=self.subscription,
+                    original_message_id=message.message_id,
+                    delivery_attempt=str(attempt),
+                    error=error[:1000]
+                )
+            except Exception as e:
+                # Keep the message on the subscription rather than lose it
+                logger.error(f"Failed to dead-letter {self.name} message {message.message_id}: {str(e)}")
+                self.nacked += 1
+                message.nack()
+                return False
+        else:
+            logger.error(f"Dropping {self.name} message {message.message_id} (no dead-letter topic): {error}")
+
+        message.ack()
+        self._attempts.delete(message.message_id)
+        self.dead_lettered += 1
+        return True
+
+    def _count_attempt(self, message_id: str) -> int:
+        attempt = self._attempts.get(message_id, 0) + 1
+        self._attempts.set(message_id, attempt)
+        return attempt
+
+    @staticmethod
+    def _lag(message) -> Optional[float]:
+        """Seconds between publish and receipt"""
+        publish_time = getattr(message, "publish_time", None)
+        if publish_time is None:
+            return None
+        if publish_time.tzinfo is None:
+            publish_time = publish_time.replace(tzinfo=timezone.utc)
+        return max(0.0, (datetime.now(timezone.utc) - publish_time).total_seconds())
+
+    async def _drain(self):
+        pending = [asyncio.wrap_future(future) for future in list(self._tasks)]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        # Acks/nacks the queue backend settles in the background
+        settling = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if settling:
+            await asyncio.gather(*settling, return_exceptions=True)
+
+    def _prune_ack_times(self):
+        """Keep only the last minute of ack times (for throughput_per_minute)"""
+        now = time.monotonic()
+        while self._ack_times and now - self._ack_times[0] > 60:
+            self._ack_times.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune_ack_times()
+        return {
+            "running": self.running,
+            "in_flight": len(self._tasks),
+            "max_in_flight": self.max_messages,
+            "received": self.received,
+            "acked": self.acked,
+            "nacked": self.nacked,
+            "dead_lettered": self.dead_lettered,
+            "throughput_per_minute": len(self._ack_times),
+            "average_processing_ms": round(self.total_processing / self.acked * 1000, 1) if self.acked else 0.0,
+            "average_lag_seconds": round(self.total_lag / self.received, 3) if self.received else 0.0,
+            "max_lag_seconds": round(self.max_lag, 3)
+        }
@@ -1,27 +1,24 @@
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
 import os
 from fastapi import FastAPI
 from PyPDF2 import PdfReader
 from sqlalchemy.orm import Session
-from vertexai.preview.language_models import TextEmbeddingModel
 import numpy as np
 from numpy.linalg import norm
 import sys
 sys.path.append('app')
 from models.jobpostingclass import JobPosting
 from app.services.cv_service import CVService
+from app.services.cloud_clients import cloud_clients
 import uuid
 
 app = FastAPI()
 
 os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
 
-client = bigquery.Client()
-
 TABLE_ID = "job-recommendations-app.jobs_ds.jobs_jsearch_raw"
 
 def if_table_exists(client, table_id):
+    from google.cloud.exceptions import NotFound
     try:
         client.get_table(table_id)
         return True
@@ -30,7 +27,7 @@ def if_table_exists(client, table_id):
 
             
 def get_job_table():
-    table = client.get_table(TABLE_ID)
+    table = cloud_clients.get("bigquery").get_table(TABLE_ID)
     return table
 
 
@@ -46,7 +43,7 @@ def measure_similarity(embedded_cv):
           STRUCT('SEMANTIC_SIMILARITY' as task_type)
           );
     """
-    query_job = client.query(sql_query)
+    query_job = cloud_clients.get("bigquery").query(sql_query)
     data = query_job.result()
     for row in data:
         v1 = row[0]
@@ -63,6 +60,7 @@ def order_by_similarity(postings_list):
 
 
 def cv_text_embedding(user_cv):
+    from vertexai.preview.language_models import TextEmbeddingModel
     model = TextEmbeddingModel.from_pretrained("gemini-embedding-001")
     embeddings = model.get_embeddings([user_cv])
     for embedding in embeddings:
@@ -0,0 +1,267 @@
+"""
+Coalesced recommendation recomputes: debounced triggers and one recompute per user at a time
+"""
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Recompute = Callable[[str, List[str]], Awaitable[None]]
+
+# KEYS[1] = lock key, ARGV[1] = owner token
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# KEYS[1] = lock key, ARGV[1] = owner token, ARGV[2] = ttl in ms
+REFRESH_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RecommendationUpdateCoalescer:
+    """
+    Collapses bursts of recommendation-update triggers into one job per user
+
+    The first trigger for a user opens a window; every trigger for that user
+    until the window closes is merged, and a single recompute job carrying
+    the union of trigger reasons is published when it does.
+    """
+
+    def __init__(self, window: Optional[float] = None):
+        self.window = settings.RECOMMENDATION_UPDATE_WINDOW if window is None else window
+        self._pending: Dict[str, Set[str]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._publishing: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.triggers_received = 0
+        self.jobs_published = 0
+        self.publish_failures = 0
+
+    def start(self):
+        """Own the window timers on the running (API server) loop"""
+        self._loop = asyncio.get_running_loop()
+
+    def request(self, user_id: str, trigger: str):
+        """Record a trigger (e.g. "cv_updated", "skills_updated") for a user"""
+        if not settings.ENABLE_BACKGROUND_TASKS:
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is None or self._loop.is_closed() or not self._loop.is_running():
+            self._loop = loop
+        if loop is not self._loop:
+            # Triggers from a worker loop are merged on the loop that owns the timers
+            self._loop.call_soon_threadsafe(self._add, str(user_id), trigger)
+        else:
+            self._add(str(user_id), trigger)
+
+    def _add(self, user_id: str, trigger: str):
+        self.triggers_received += 1
+        self._pending.setdefault(user_id, set()).add(trigger)
+        if user_id not in self._timers:
+            self._timers[user_id] = self._loop.call_later(self.window, self._flush, user_id)
+
+    def _flush(self, user_id: str):
+        self._timers.pop(user_id, None)
+        triggers = self._pending.pop(user_id, None)
+        if not triggers:
+            return
+        task = asyncio.get_running_loop().create_task(self._publish(user_id, sorted(triggers)))
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def _publish(self, user_id: str, triggers: List[str]):
+        from app.services.pubsub_service import PubSubService
+
+        try:
+            await PubSubService().publish_recommendation_update(user_id, triggers=triggers)
+            self.jobs_published += 1
+        except Exception:
+            # publish_recommendation_update has logged it
+            self.publish_failures += 1
+
+    async def flush_all(self):
+        """Publish everything still waiting for its window, e.g. on shutdown"""
+        for user_id in list(self._timers):
+            self._timers[user_id].cancel()
+            self._flush(user_id)
+        if self._publishing:
+            await asyncio.gather(*self._publishing, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "window_seconds": self.window,
+            "triggers_received": self.triggers_received,
+            "jobs_published": self.jobs_published,
+            "publish_failures": self.publish_failures,
+            "pending_users": len(self._pending)
+        }
+
+
+class _RedisUserLock:
+    """Per-user in-flight flag and deferred triggers shared by all workers through Redis"""
+
+    def __init__(self, client, ttl_ms: int):
+        self.client = client
+        self.ttl_ms = ttl_ms
+
+    async def acquire(self, user_id: str, token: str) -> bool:
+        return bool(await asyncio.to_thread(self.client.set, f"recommendations:inflight:{user_id}", token, nx=True, px=self.ttl_ms))
+
+    async def refresh(self, user_id: str, token: str):
+        await asyncio.to_thread(self.client.eval, REFRESH_SCRIPT, 1, f"recommendations:inflight:{user_id}", token, self.ttl_ms)
+
+    async def release(self, user_id: str, token: str):
+        await asyncio.to_thread(self.client.eval, RELEASE_SCRIPT, 1, f"recommendations:inflight:{user_id}", token)
+
+    async def defer(self, user_id: str, triggers: Set[str]):
+        key = f"recommendations:deferred:{user_id}"
+
+        def add():
+            pipe = self.client.pipeline()
+            pipe.sadd(key, *triggers)
+            pipe.pexpire(key, self.ttl_ms * 2)
+            pipe.execute()
+
+        await asyncio.to_thread(add)
+
+    async def take_deferred(self, user_id: str) -> Set[str]:
+        key = f"recommendations:deferred:{user_id}"
+
+        def take():
+            pipe = self.client.pipeline()  # MULTI: read and clear atomically
+            pipe.smembers(key)
+            pipe.delete(key)
+            return pipe.execute()[0]
+
+        return {member.decode() if isinstance(member, bytes) else member for member in await asyncio.to_thread(take)}
+
+
+class _LocalUserLock:
+    """Process-local fallback when Redis is unavailable (only guards this instance)"""
+
+    def __init__(self):
+        self._owners: Dict[str, str] = {}
+        self._deferred: Dict[str, Set[str]] = {}
+
+    async def acquire(self, user_id: str, token: str) -> bool:
+        if user_id in self._owners:
+            return False
+        self._owners[user_id] = token
+        return True
+
+    async def refresh(self, user_id: str, token: str):
+        pass
+
+    async def release(self, user_id: str, token: str):
+        if self._owners.get(user_id) == token:
+            del self._owners[user_id]
+
+    async def defer(self, user_id: str, triggers: Set[str]):
+        self._deferred.setdefault(user_id, set()).update(triggers)
+
+    async def take_deferred(self, user_id: str) -> Set[str]:
+        return self._deferred.pop(user_id, set())
+
+
+class RecommendationUpdateRunner:
+    """
+    Runs recompute jobs with at most one in flight per user across workers
+
+    A job that finds the user's recompute already running adds its triggers
+    to a deferred set and returns; the running worker picks those up and
+    recomputes again before releasing the flag. After releasing it checks the
+    set once more, so triggers deferred just as it finished aren't stranded.
+    """
+
+    def __init__(self, lock_ttl: Optional[int] = None):
+        self.lock_ttl = lock_ttl or settings.RECOMMENDATION_RECOMPUTE_LOCK_TTL
+        self._redis_lock: Optional[_RedisUserLock] = None
+        self._local_lock = _LocalUserLock()
+
+        self.recomputes = 0
+        self.deferred = 0
+
+    async def _lock(self):
+        if self._redis_lock is None:
+            from app.services.cache_service import CacheService
+
+            self._redis_lock = _RedisUserLock(CacheService().redis_client, self.lock_ttl * 1000)
+        try:
+            await asyncio.to_thread(self._redis_lock.client.ping)
+            return self._redis_lock
+        except Exception as e:
+            logger.warning(f"Redis unavailable, recommendation recompute lock is per-instance only: {str(e)}")
+            return self._local_lock
+
+    async def run(self, user_id: str, triggers: List[str], recompute: Recompute) -> bool:
+        """Recompute for a user unless another worker already is; returns whether this call recomputed"""
+        lock = await self._lock()
+        pending = set(triggers)
+        ran = False
+
+        while pending:
+            token = uuid.uuid4().hex
+            if not await lock.acquire(user_id, token):
+                await lock.defer(user_id, pending)
+                # The holder may have released between our acquire and defer
+                if not await lock.acquire(user_id, token):
+                    self.deferred += 1
+                    logger.info(f"Recommendation recompute for {user_id} already running, deferred {sorted(pending)}")
+                    return ran
+                pending = set()
+
+            try:
+                pending |= await lock.take_deferred(user_id)
+                while pending:
+                    try:
+                        await recompute(user_id, sorted(pending))
+                    except Exception:
+                        # Keep the triggers for whoever runs next (including this job's redelivery)
+                        await lock.defer(user_id, pending)
+                        raise
+                    ran = True
+                    self.recomputes += 1
+                    await lock.refresh(user_id, token)
+                    pending = await lock.take_deferred(user_id)
+            finally:
+                await lock.release(user_id, token)
+
+            pending = await lock.take_deferred(user_id)
+
+        return ran
+
+    def stats(self):
+        return {
+            "recomputes": self.recomputes,
+            "deferred_to_running_worker": self.deferred,
+            "lock_ttl_seconds": self.lock_ttl
+        }
+
+
+async def recompute_recommendations(user_id: str, triggers: List[str]):
+    """Drop the user's cached recommendations and skill gaps, then tell their clients to refetch"""
+    from app.services.cache_service import CacheService
+    from app.services.websocket_service import notification_service
+
+    cache_service = CacheService()
+    await cache_service.delete_pattern(f"{cache_service.RECOMMENDATIONS_PREFIX}{user_id}:*")
+    await cache_service.delete(f"{cache_service.SKILL_GAPS_PREFIX}{user_id}")
+    await notification_service.notify_recommendations_updated(user_id, triggers)
+    logger.info(f"Recomputed recommendations for {user_id} ({', '.join(triggers)})")
+
+
+# Global instances
+recommendation_update_coalescer = RecommendationUpdateCoalescer()
+recommendation_update_runner = RecommendationUpdateRunner()
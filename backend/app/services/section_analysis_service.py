@@ -0,0 +1,289 @@
+"""
+Section-parallel CV analysis: one small LLM call per CV section
+"""
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+from .deepseek_service import deepseek_service, extract_json
+from .prompt_builder import prompt_builder, normalize_whitespace, is_contact_line
+
+logger = logging.getLogger(__name__)
+
+SECTION_PROMPT_VERSION = "section-analysis-v1"
+
+SECTION_SYSTEM_PROMPT = (
+    "You are an expert CV analyzer preparing CVs for paraphrasing and job application optimization. "
+    "You are given one section of a CV. Analyze only that section, never invent content, "
+    "and reply with JSON only."
+)
+
+OPTIMIZATION_AREA_SCHEMA = {
+    "current_focus": "str",
+    "optimization_potential": "str",
+    "paraphrasing_score": "0-1"
+}
+
+# Which extracted CV sections feed each call, and the JSON each call returns
+SECTION_CALLS = {
+    "summary": {
+        "sources": ["header", "summary"],
+        "task": "Extract the professional summary and suggest job types this profile suits.",
+        "schema": {
+            "professional_summary": "str",
+            "recommended_job_types": ["str"],
+            "optimization_area": OPTIMIZATION_AREA_SCHEMA
+        }
+    },
+    "experience": {
+        "sources": ["experience", "projects"],
+        "task": "Extract each role and the transferable experience it demonstrates.",
+        "schema": {
+            "work_experience": [{
+                "company": "str",
+                "position": "str",
+                "duration": "str",
+                "description": "str",
+                "transferable_skills": ["str"],
+                "paraphrasing_potential": "0-1"
+            }],
+            "transferable_experiences": [{"experience": "str", "applicable_roles": ["str"], "paraphrasing_variations": ["str"]}],
+            "optimization_area": OPTIMIZATION_AREA_SCHEMA
+        }
+    },
+    "skills": {
+        "sources": ["skills"],
+        "task": "Categorise the skills and list keyword opportunities for job applications.",
+        "schema": {
+            "skills": {"technical": ["str"], "soft": ["str"], "industry_specific": ["str"]},
+            "keyword_opportunities": ["str"],
+            "optimization_area": OPTIMIZATION_AREA_SCHEMA
+        }
+    },
+    "education": {
+        "sources": ["education", "certifications", "achievements"],
+        "task": "Summarise education and list notable achievements.",
+        "schema": {
+            "education": "str",
+            "achievements": ["str"],
+            "optimization_area": OPTIMIZATION_AREA_SCHEMA
+        }
+    }
+}
+
+# Section names used in optimization_areas, matching the monolithic analysis
+OPTIMIZATION_SECTION_NAMES = {
+    "summary": "professional_summary",
+    "experience": "work_experience",
+    "skills": "skills",
+    "education": "education"
+}
+
+
+class SectionAnalysisService:
+    """
+    Analyzes CV sections with concurrent, smaller LLM calls
+
+    Wall-clock time is bounded by the slowest section rather than one long
+    generation, and a failed section only blanks its own part of the result.
+    The merged output has the same shape as the single-call analysis.
+    """
+
+    def __init__(self):
+        self.max_tokens_per_section = int(os.getenv("SECTION_ANALYSIS_MAX_TOKENS", "1200"))
+        self.min_sections = 2  # fewer detected sections than this isn't worth splitting
+        self.section_token_budget = prompt_builder.token_budget // 2
+
+    def split(self, cv_text: str) -> Dict[str, str]:
+        """Group the extracted CV sections into the text for each section call"""
+        sections = prompt_builder.extractor.extract_sections(cv_text)
+        grouped = {}
+        for name, call in SECTION_CALLS.items():
+            text = "\n".join(sections[source] for source in call["sources"] if sections.get(source))
+            if text.strip():
+                grouped[name] = text
+        return grouped
+
+    async def analyze(
+        self,
+        cv_text: str,
+        force_refresh: bool = False,
+        user_id: str = "anonymous"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run the section calls concurrently and merge them into an ai_analysis dict
+
+        Returns None if the CV doesn't split into enough recognisable sections,
+        so the caller can fall back to a single-call analysis.
+        """
+        grouped = self.split(cv_text)
+        if len(grouped) < self.min_sections:
+            return None
+
+        names = list(grouped)
+        results = await asyncio.gather(
+            *(self._analyze_section(name, grouped[name], force_refresh, user_id) for name in names),
+            return_exceptions=True
+        )
+
+        section_results: Dict[str, Dict[str, Any]] = {}
+        section_status: Dict[str, str] = {name: "missing" for name in SECTION_CALLS}
+        section_errors: Dict[str, str] = {}
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Section analysis failed for {name}: {str(result)}")
+                section_status[name] = "failed"
+                section_errors[name] = str(result)
+            else:
+                section_status[name] = "completed"
+                section_results[name] = result
+
+        if not section_results:
+            return {
+                "error": "; ".join(f"{name}: {error}" for name, error in section_errors.items()),
+                "analysis_timestamp": datetime.utcnow().isoformat(),
+                "analysis_type": "paraphrasing_focused",
+                "analysis_mode": "section_parallel",
+                "section_status": section_status
+            }
+
+        analysis = self._merge(section_results, section_status)
+        if "skills" not in section_results:
+            # Fall back to keyword-matched skills so the skills section isn't empty
+            basic_skills = prompt_builder.extractor.extract(cv_text).get("skills", [])
+            analysis["cv_sections"]["skills"]["technical"] = [skill["name"] for skill in basic_skills]
+        if section_errors:
+            analysis["section_errors"] = section_errors
+        return analysis
+
+    async def _analyze_section(self, name: str, text: str, force_refresh: bool, user_id: str) -> Dict[str, Any]:
+        call = SECTION_CALLS[name]
+        return await analyze_cv_section(
+            name,
+            text,
+            call["task"],
+            call["schema"],
+            system_prompt=SECTION_SYSTEM_PROMPT,
+            prompt_version=f"{SECTION_PROMPT_VERSION}:{name}",
+            max_tokens=self.max_tokens_per_section,
+            token_budget=self.section_token_budget,
+            force_refresh=force_refresh,
+            user_id=user_id
+        )
+
+    def _merge(self, results: Dict[str, Dict[str, Any]], section_status: Dict[str, str]) -> Dict[str, Any]:
+        """Merge section results into the single-call analysis structure"""
+        summary = results.get("summary", {})
+        experience = results.get("experience", {})
+        skills = results.get("skills", {})
+        education = results.get("education", {})
+
+        optimization_areas = []
+        for name, result in results.items():
+            area = result.get("optimization_area")
+            if isinstance(area, dict):
+                optimization_areas.append({"section": OPTIMIZATION_SECTION_NAMES[name], **area})
+
+        scores = [_score(area.get("paraphrasing_score")) for area in optimization_areas]
+        paraphrasing_score = round(sum(scores) / len(scores), 2) if scores else 0.0
+
+        work_experience = experience.get("work_experience") or []
+        potentials = [_score(role.get("paraphrasing_potential")) for role in work_experience if isinstance(role, dict)]
+        content_depth = round(sum(potentials) / len(potentials), 2) if potentials else paraphrasing_score
+        structure_quality = round(sum(status == "completed" for status in section_status.values()) / len(SECTION_CALLS), 2)
+        keyword_potential = _score((skills.get("optimization_area") or {}).get("paraphrasing_score"))
+
+        ranked_areas = sorted(optimization_areas, key=lambda area: _score(area.get("paraphrasing_score")), reverse=True)
+
+        return {
+            "cv_sections": {
+                "professional_summary": summary.get("professional_summary", ""),
+                "work_experience": work_experience,
+                "skills": skills.get("skills") or {"technical": [], "soft": [], "industry_specific": []},
+                "education": education.get("education", ""),
+                "achievements": education.get("achievements") or []
+            },
+            "optimization_areas": optimization_areas,
+            "transferable_experiences": experience.get("transferable_experiences") or [],
+            "paraphrasing_score": paraphrasing_score,
+            "readiness_assessment": {
+                "structure_quality": structure_quality,
+                "content_depth": content_depth,
+                "keyword_optimization_potential": keyword_potential,
+                "overall_paraphrasing_readiness": round((structure_quality + content_depth + keyword_potential) / 3, 2)
+            },
+            "recommended_job_types": summary.get("recommended_job_types") or [],
+            "paraphrasing_strategy": {
+                "high_impact_sections": [area["section"] for area in ranked_areas[:2]],
+                "keyword_opportunities": skills.get("keyword_opportunities") or [],
+                "customization_areas": [area.get("optimization_potential") for area in ranked_areas if area.get("optimization_potential")]
+            },
+            "analysis_timestamp": datetime.utcnow().isoformat(),
+            "analysis_type": "paraphrasing_focused",
+            "analysis_mode": "section_parallel",
+            "section_status": section_status
+        }
+
+
+def clean_section_text(text: str) -> str:
+    """Normalise whitespace and drop blank and contact-detail lines from CV section text"""
+    lines = (normalize_whitespace(line) for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not is_contact_line(line))
+
+
+async def analyze_cv_section(
+    name: str,
+    text: str,
+    task: str,
+    schema: Dict[str, Any],
+    system_prompt: str,
+    prompt_version: str,
+    max_tokens: int,
+    token_budget: int,
+    force_refresh: bool = False,
+    user_id: str = "anonymous"
+) -> Dict[str, Any]:
+    """
+    Ask the model about a single CV section and return its JSON object
+
+    The section text is cleaned and truncated to token_budget; raises if the
+    call fails or the reply isn't a JSON object.
+    """
+    user_prompt = (
+        f"{task} Reply with JSON matching:\n"
+        f"{json.dumps(schema, separators=(',', ':'))}\n\n"
+        f"CV SECTION ({name.upper()}):\n"
+        f"{prompt_builder.truncate(clean_section_text(text), token_budget)}"
+    )
+
+    content = await deepseek_service.chat_completion(
+        system_prompt,
+        user_prompt,
+        temperature=0.2,
+        top_p=0.8,
+        max_tokens=max_tokens,
+        prompt_version=prompt_version,
+        expect_json=True,
+        force_refresh=force_refresh,
+        user_id=user_id
+    )
+
+    result = extract_json(content)
+    if not isinstance(result, dict):
+        raise ValueError(f"{name} analysis did not return a JSON object")
+    return result
+
+
+def _score(value: Any) -> float:
+    """Coerce a model-provided 0-1 score, treating junk as 0"""
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Global instance
+section_analysis_service = SectionAnalysisService()
@@ -0,0 +1,208 @@
+"""
+Semantic cache for paraphrasing results across near-identical job descriptions
+"""
+import os
+import re
+import copy
+import math
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+Embedding = Dict[int, float]
+
+
+def embed(text: str, dimensions: int = 1024) -> Embedding:
+    """
+    Hashed bag-of-words embedding (unigrams and bigrams), L2-normalised
+
+    Returned as a sparse {bucket: weight} dict; a stable digest is used for
+    bucketing so embeddings are comparable across processes.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    counts: Dict[int, float] = {}
+    for feature in features:
+        bucket = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big") % dimensions
+        counts[bucket] = counts.get(bucket, 0.0) + 1.0
+
+    # Sublinear term frequency so repeated boilerplate doesn't dominate
+    weights = {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+    return {bucket: weight / norm for bucket, weight in weights.items()} if norm else {}
+
+
+def cosine_similarity(a: Embedding, b: Embedding) -> float:
+    """Cosine similarity of two normalised sparse embeddings"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+TITLE_ABBREVIATIONS = {"sr": "senior", "snr": "senior", "jr": "junior"}
+
+
+def normalize_title(job_title: str) -> str:
+    """Lower-case job title with punctuation and common abbreviations normalised"""
+    tokens = [token.rstrip(".") for token in TOKEN_PATTERN.findall(job_title.lower())]
+    return " ".join(TITLE_ABBREVIATIONS.get(token, token) for token in tokens if token)
+
+
+class _Entry:
+    __slots__ = ("embedding", "job_title", "result", "created_at", "last_used", "hits")
+
+    def __init__(self, embedding: Embedding, job_title: str, result: Dict[str, Any]):
+        self.embedding = embedding
+        self.job_title = job_title
+        self.result = result
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.hits = 0
+
+
+class SemanticCacheService:
+    """
+    Reuses paraphrasing results for the same CV and a similar job posting
+
+    Entries are grouped by (prompt version, CV hash, normalised job title), so
+    a result is only ever reused for the same role; within a group they are
+    matched on the cosine similarity of the job description embedding.
+    Expired entries are dropped by age; when full, the least used entries are
+    evicted first.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.ttl = int(os.getenv("SEMANTIC_CACHE_TTL", "604800"))  # 7 days
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+
+        self._buckets: Dict[Tuple[str, str, str], List[_Entry]] = {}
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(namespace: str, cv_text: str, job_title: str) -> Tuple[str, str, str]:
+        return namespace, hashlib.sha256(cv_text.encode("utf-8")).hexdigest(), normalize_title(job_title)
+
+    @staticmethod
+    def _similarity(a: Embedding, b: Embedding) -> float:
+        if not a and not b:
+            return 1.0  # neither request had a description
+        return cosine_similarity(a, b)
+
+    def lookup(
+        self,
+        namespace: str,
+        cv_text: str,
+        job_title: str,
+        job_description: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Find a stored result for this CV, the same job title and a similar description"""
+        if not self.enabled:
+            return None
+
+        bucket = self._buckets.get(self._key(namespace, cv_text, job_title))
+        if not bucket:
+            self.misses += 1
+            return None
+
+        query = embed(job_description or "")
+        now = time.monotonic()
+        best, best_score = None, 0.0
+        for entry in bucket:
+            if now - entry.created_at > self.ttl:
+                continue
+            score = self._similarity(query, entry.embedding)
+            if score > best_score:
+                best, best_score = entry, score
+
+        if best is None or best_score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        best.hits += 1
+        best.last_used = now
+
+        result = copy.deepcopy(best.result)
+        result["target_job"] = job_title
+        result["semantic_cache"] = {
+            "similarity": round(best_score, 4),
+            "matched_job_title": best.job_title
+        }
+        return result
+
+    def store(
+        self,
+        namespace: str,
+        cv_text: str,
+        job_title: str,
+        job_description: Optional[str],
+        result: Dict[str, Any]
+    ):
+        """Remember a successful paraphrasing result"""
+        if not self.enabled or result.get("error"):
+            return
+
+        embedding = embed(job_description or "")
+        bucket = self._buckets.setdefault(self._key(namespace, cv_text, job_title), [])
+
+        for existing in bucket:
+            if self._similarity(embedding, existing.embedding) >= 0.999:
+                # Same job again: refresh the entry rather than storing a duplicate
+                existing.result = copy.deepcopy(result)
+                existing.job_title = job_title
+                existing.created_at = time.monotonic()
+                return
+
+        bucket.append(_Entry(embedding, job_title, copy.deepcopy(result)))
+        self._size += 1
+
+        if self._size > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the least used ones until back under the limit"""
+        now = time.monotonic()
+        for key in list(self._buckets):
+            self._buckets[key] = [entry for entry in self._buckets[key] if now - entry.created_at <= self.ttl]
+            if not self._buckets[key]:
+                del self._buckets[key]
+        self._size = sum(len(bucket) for bucket in self._buckets.values())
+
+        excess = self._size - self.max_entries
+        if excess <= 0:
+            return
+
+        ranked = sorted(
+            ((entry.hits, entry.last_used, key, entry) for key, bucket in self._buckets.items() for entry in bucket),
+            key=lambda item: (item[0], item[1])
+        )
+        for _, _, key, entry in ranked[:excess]:
+            self._buckets[key].remove(entry)
+            if not self._buckets[key]:
+                del self._buckets[key]
+        self._size -= excess
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": self._size,
+            "threshold": self.threshold
+        }
+
+
+# Global instance
+semantic_cache_service = SemanticCacheService()
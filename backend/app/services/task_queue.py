@@ -0,0 +1,436 @@
+"""
+Task queue backends behind PubSubService: Google Pub/Sub, Redis streams or in-memory
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from .cloud_clients import cloud_clients
+
+logger = logging.getLogger(__name__)
+
+
+class TaskMessage:
+    """A delivered message, shaped like a google.cloud.pubsub_v1 subscriber message"""
+
+    __slots__ = ("message_id", "data", "attributes", "publish_time", "delivery_attempt", "_ack", "_nack", "_settled")
+
+    def __init__(
+        self,
+        message_id: str,
+        data: bytes,
+        attributes: Dict[str, str],
+        publish_time: datetime,
+        delivery_attempt: int,
+        ack: Callable[[], None],
+        nack: Callable[[], None]
+    ):
+        self.message_id = message_id
+        self.data = data
+        self.attributes = attributes
+        self.publish_time = publish_time
+        self.delivery_attempt = delivery_attempt
+        self._ack = ack
+        self._nack = nack
+        self._settled = False
+
+    def ack(self):
+        if not self._settled:
+            self._settled = True
+            self._ack()
+
+    def nack(self):
+        if not self._settled:
+            self._settled = True
+            self._nack()
+
+
+class SubscriptionHandle:
+    """A running subscription; mirrors the parts of StreamingPullFuture that callers use"""
+
+    def __init__(self, name: str, target: Callable[[threading.Event], None]):
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=target, args=(self._stopped,), name=name, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._stopped.set()
+
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def result(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+
+class _FlowControl:
+    """Caps messages handed to a callback but not yet acked or nacked"""
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max(1, max_messages)
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def wait(self, stopped: threading.Event, timeout: float = 0.5) -> int:
+        """Wait for free capacity, returning how many more messages may be taken"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.in_flight < self.max_messages or stopped.is_set(), timeout)
+            return max(0, self.max_messages - self.in_flight)
+
+    def take(self):
+        with self._condition:
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class TaskQueueBackend:
+    """
+    Publish/subscribe interface shared by all backends
+
+    Semantics follow Pub/Sub: each subscription attached to a topic gets its
+    own copy of every message published after it was created; a delivered
+    message must be acked, and a nacked message is redelivered with its
+    delivery_attempt incremented. subscribe() runs the callback on a
+    background thread and never has more than max_messages unsettled.
+    """
+
+    name = "base"
+
+    def create_topic(self, topic: str):
+        raise NotImplementedError
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline_seconds: int = 600):
+        raise NotImplementedError
+
+    async def publish(self, topic: str, data: bytes, **attributes: str) -> str:
+        raise NotImplementedError
+
+    def subscribe(self, subscription: str, callback: Callable[[Any], None], max_messages: int = 5):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PubSubTaskQueue(TaskQueueBackend):
+    """Google Cloud Pub/Sub, using the shared publisher and subscriber clients"""
+
+    name = "pubsub"
+
+    def create_topic(self, topic: str):
+        try:
+            cloud_clients.get("pubsub_publisher").create_topic(request={"name": topic})
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                raise
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline_seconds: int = 600):
+        try:
+            cloud_clients.get("pubsub_subscriber").create_subscription(
+                request={
+                    "name": subscription,
+                    "topic": topic,
+                    "ack_deadline_seconds": ack_deadline_seconds
+                }
+            )
+        except Exception as e:
+            if "already exists" not in str(e).lower():
+                raise
+
+    async def publish(self, topic: str, data: bytes, **attributes: str) -> str:
+        # The client batches in the background; await its future rather than block on it
+        return await asyncio.wrap_future(cloud_clients.get("pubsub_publisher").publish(topic, data, **attributes))
+
+    def subscribe(self, subscription: str, callback: Callable[[Any], None], max_messages: int = 5):
+        from google.cloud import pubsub_v1
+
+        return cloud_clients.get("pubsub_subscriber").subscribe(
+            subscription,
+            callback=callback,
+            flow_control=pubsub_v1.types.FlowControl(max_messages=max_messages)
+        )
+
+
+class InMemoryTaskQueue(TaskQueueBackend):
+    """
+    Process-local queue for development, CI and benchmarks
+
+    Messages live in a deque per subscription; nothing survives a restart.
+    Unacked messages are not redelivered after a deadline, only on nack.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._topics: Dict[str, List[str]] = {}
+        # subscription -> (message_id, data, attributes, publish_time, delivery_attempt)
+        self._pending: Dict[str, Deque[Tuple[str, bytes, Dict[str, str], datetime, int]]] = {}
+
+    def create_topic(self, topic: str):
+        with self._condition:
+            self._topics.setdefault(topic, [])
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline_seconds: int = 600):
+        with self._condition:
+            if topic not in self._topics:
+                raise ValueError(f"Topic not found: {topic}")
+            if subscription not in self._pending:
+                self._pending[subscription] = deque()
+                self._topics[topic].append(subscription)
+
+    async def publish(self, topic: str, data: bytes, **attributes: str) -> str:
+        message_id = uuid.uuid4().hex
+        publish_time = datetime.now(timezone.utc)
+        with self._condition:
+            if topic not in self._topics:
+                raise ValueError(f"Topic not found: {topic}")
+            for subscription in self._topics[topic]:
+                self._pending[subscription].append((message_id, data, dict(attributes), publish_time, 1))
+            self._condition.notify_all()
+        return message_id
+
+    def subscribe(self, subscription: str, callback: Callable[[Any], None], max_messages: int = 5) -> SubscriptionHandle:
+        if subscription not in self._pending:
+            raise ValueError(f"Subscription not found: {subscription}")
+        flow = _FlowControl(max_messages)
+
+        def pull(stopped: threading.Event):
+            while not stopped.is_set():
+                if not flow.wait(stopped):
+                    continue
+                with self._condition:
+                    pending = self._pending[subscription]
+                    if not self._condition.wait_for(lambda: pending or stopped.is_set(), timeout=0.5) or stopped.is_set():
+                        continue
+                    entry = pending.popleft()
+                flow.take()
+                callback(self._message(subscription, entry, flow))
+
+        return SubscriptionHandle(f"memory_sub_{subscription}", pull)
+
+    def _message(self, subscription: str, entry, flow: _FlowControl) -> TaskMessage:
+        message_id, data, attributes, publish_time, attempt = entry
+
+        def nack():
+            with self._condition:
+                self._pending[subscription].append((message_id, data, attributes, publish_time, attempt + 1))
+                self._condition.notify_all()
+            flow.release()
+
+        return TaskMessage(message_id, data, attributes, publish_time, attempt, flow.release, nack)
+
+
+class RedisStreamsTaskQueue(TaskQueueBackend):
+    """
+    Redis streams: a topic is a stream and a subscription is a consumer group on it
+
+    Acks are XACK. A nack marks the pending entry as idle past the ack
+    deadline so the next XAUTOCLAIM sweep redelivers it; the same sweep
+    picks up entries whose consumer died without acking. The delivery
+    attempt comes from the entry's delivery count in the pending list.
+    Streams are capped at roughly maxlen entries, oldest trimmed first.
+    """
+
+    name = "redis"
+    SUBSCRIPTIONS_KEY = "task_queue:subscriptions"
+
+    def __init__(
+        self,
+        url: str,
+        ack_deadline_seconds: int = 600,
+        block_ms: int = 1000,
+        claim_interval: float = 5.0,
+        maxlen: Optional[int] = 100000
+    ):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.maxlen = maxlen
+        self._settling: Set[asyncio.Future] = set()
+        self.ack_deadline_ms = ack_deadline_seconds * 1000
+        self.block_ms = block_ms
+        self.claim_interval = claim_interval
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+    def create_topic(self, topic: str):
+        # Streams are created with the first consumer group or message
+        pass
+
+    def create_subscription(self, subscription: str, topic: str, ack_deadline_seconds: int = 600):
+        import redis
+
+        self._redis.hset(self.SUBSCRIPTIONS_KEY, subscription, topic)
+        try:
+            self._redis.xgroup_create(topic, subscription, id="$", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def publish(self, topic: str, data: bytes, **attributes: str) -> str:
+        fields = {
+            "data": data,
+            "attributes": json.dumps(attributes),
+            "publish_time": repr(time.time())
+        }
+        # Sync client from a thread: the client is shared by the app loop and worker loops
+        entry_id = await asyncio.to_thread(
+            self._redis.xadd, topic, fields, maxlen=self.maxlen, approximate=True
+        )
+        return entry_id.decode()
+
+    def subscribe(self, subscription: str, callback: Callable[[Any], None], max_messages: int = 5) -> SubscriptionHandle:
+        import redis
+
+        topic = self._redis.hget(self.SUBSCRIPTIONS_KEY, subscription)
+        if topic is None:
+            raise ValueError(f"Subscription not found: {subscription}")
+        topic = topic.decode()
+        flow = _FlowControl(max_messages)
+        redeliver = threading.Event()
+
+        def pull(stopped: threading.Event):
+            last_claim = 0.0
+            while not stopped.is_set():
+                free = flow.wait(stopped)
+                if not free:
+                    continue
+                try:
+                    entries: List[Tuple[bytes, Dict[bytes, bytes], int]] = []
+                    if redeliver.is_set() or time.monotonic() - last_claim > self.claim_interval:
+                        redeliver.clear()
+                        last_claim = time.monotonic()
+                        entries = self._claim(topic, subscription, free)
+                    if not entries:
+                        response = self._redis.xreadgroup(
+                            subscription, self.consumer, {topic: ">"}, count=free, block=self.block_ms
+                        )
+                        entries = [(entry_id, fields, 1) for entry_id, fields in (response[0][1] if response else [])]
+                except redis.RedisError as e:
+                    logger.error(f"Redis stream read failed for {subscription}: {str(e)}")
+                    stopped.wait(1.0)
+                    continue
+
+                for entry_id, fields, attempt in entries:
+                    flow.take()
+                    callback(self._message(topic, subscription, entry_id, fields, attempt, flow, redeliver))
+
+        return SubscriptionHandle(f"redis_sub_{subscription}", pull)
+
+    def _claim(self, topic: str, subscription: str, count: int) -> List[Tuple[bytes, Dict[bytes, bytes], int]]:
+        """Take over entries idle past the ack deadline (nacked, or their consumer died)"""
+        claimed = self._redis.xautoclaim(
+            topic, subscription, self.consumer, min_idle_time=self.ack_deadline_ms, start_id="0-0", count=count
+        )[1]
+        claimed = [(entry_id, fields) for entry_id, fields in claimed if fields]
+        if not claimed:
+            return []
+        attempts = {
+            entry["message_id"]: entry["times_delivered"]
+            for entry in self._redis.xpending_range(
+                topic, subscription, min=claimed[0][0], max=claimed[-1][0], count=len(claimed) * 2
+            )
+        }
+        return [(entry_id, fields, attempts.get(entry_id, 2)) for entry_id, fields in claimed]
+
+    def _message(
+        self,
+        topic: str,
+        subscription: str,
+        entry_id: bytes,
+        fields: Dict[bytes, bytes],
+        attempt: int,
+        flow: _FlowControl,
+        redeliver: threading.Event
+    ) -> TaskMessage:
+        def ack():
+            try:
+                self._redis.xack(topic, subscription, entry_id)
+            except Exception as e:
+                # Left pending: it will be redelivered after the ack deadline
+                logger.error(f"Failed to ack {entry_id.decode()} on {subscription}: {str(e)}")
+            finally:
+                flow.release()
+
+        def nack():
+            try:
+                # Make the entry claimable now; JUSTID leaves the delivery count alone
+                self._redis.xclaim(
+                    topic, subscription, self.consumer, min_idle_time=0,
+                    message_ids=[entry_id], idle=self.ack_deadline_ms, justid=True
+                )
+                redeliver.set()
+            except Exception as e:
+                logger.error(f"Failed to nack {entry_id.decode()} on {subscription}: {str(e)}")
+            finally:
+                flow.release()
+
+        def settle(action: Callable[[], None]) -> Callable[[], None]:
+            # Called on a worker event loop: run the Redis round trip off it
+            def run():
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    action()
+                    return
+                future = loop.create_task(asyncio.to_thread(action))
+                self._settling.add(future)
+                future.add_done_callback(self._settling.discard)
+            return run
+
+        publish_time = datetime.fromtimestamp(float(fields.get(b"publish_time", b"0")), timezone.utc)
+        return TaskMessage(
+            entry_id.decode(),
+            fields.get(b"data", b""),
+            json.loads(fields.get(b"attributes", b"{}")),
+            publish_time,
+            attempt,
+            settle(ack),
+            settle(nack)
+        )
+
+    def close(self):
+        self._redis.close()
+
+
+def create_task_queue(backend: Optional[str] = None) -> TaskQueueBackend:
+    """Build the configured backend (TASK_QUEUE_BACKEND: pubsub, redis or memory)"""
+    from app.config import settings
+
+    backend = (backend or settings.TASK_QUEUE_BACKEND).lower()
+    if backend == "pubsub":
+        return PubSubTaskQueue()
+    if backend == "memory":
+        return InMemoryTaskQueue()
+    if backend == "redis":
+        password = f":{settings.REDIS_PASSWORD}@" if settings.REDIS_PASSWORD else ""
+        url = settings.TASK_QUEUE_REDIS_URL or f"redis://{password}{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+        return RedisStreamsTaskQueue(url, maxlen=settings.TASK_QUEUE_REDIS_MAXLEN or None)
+    raise ValueError(f"Unknown task queue backend: {backend}")
+
+
+_task_queue: Optional[TaskQueueBackend] = None
+_task_queue_lock = threading.Lock()
+
+
+def get_task_queue() -> TaskQueueBackend:
+    """The process-wide task queue backend, created on first use"""
+    global _task_queue
+    if _task_queue is None:
+        with _task_queue_lock:
+            if _task_queue is None:
+                _task_queue = create_task_queue()
+                logger.info(f"Using {_task_queue.name} task queue backend")
+    return _task_queue
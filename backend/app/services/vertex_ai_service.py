@@ -1,32 +1,36 @@
 """
 Google Vertex AI service for advanced ML capabilities
 """
-import json
 import asyncio
 from typing import Dict, List, Any, Optional
-from google.cloud import aiplatform
-from google.cloud.aiplatform import gapic as aip
 import logging
 
 from app.config import settings
+from .cloud_clients import cloud_clients
+from .prediction_batcher import PredictionBatcher, StubPredictionClient, VertexPredictionClient
 
 logger = logging.getLogger(__name__)
 
 
 class VertexAIService:
-    def __init__(self):
+    def __init__(self, prediction_client: Optional[Any] = None):
         self.project_id = settings.GCP_PROJECT_ID
         self.location = settings.GCP_REGION
         
-        # Initialize Vertex AI
-        aiplatform.init(
-            project=self.project_id,
-            location=self.location
-        )
+        if prediction_client is None and settings.VERTEX_AI_USE_STUB:
+            prediction_client = StubPredictionClient()
+        
+        if prediction_client is None:
+            # Vertex AI is initialised and the gapic client created on the first prediction
+            prediction_client = VertexPredictionClient()
         
-        # Prediction client
-        self.prediction_client = aip.PredictionServiceClient(
-            client_options={"api_endpoint": f"{self.location}-aiplatform.googleapis.com"}
+        self.prediction_client = prediction_client
+        
+        # Concurrent CV analysis and skill gap requests share multi-instance predictions
+        self.batcher = PredictionBatcher(
+            self.prediction_client,
+            max_batch_size=settings.VERTEX_AI_BATCH_MAX_SIZE,
+            max_wait_ms=settings.VERTEX_AI_BATCH_WINDOW_MS
         )
         
         # Model endpoints
@@ -34,24 +38,25 @@ class VertexAIService:
         self.skill_matching_endpoint = f"projects/{self.project_id}/locations/{self.location}/endpoints/skill-matching-endpoint"
         self.job_recommendation_endpoint = f"projects/{self.project_id}/locations/{self.location}/endpoints/job-recommendation-endpoint"
     
+    @property
+    def aiplatform(self):
+        # Imported and initialised on first use; the SDK is slow to import
+        return cloud_clients.get("aiplatform")
+    
     async def analyze_cv_with_ai(self, cv_text: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
         """Use Vertex AI to analyze CV with advanced NLP"""
         try:
             # Prepare input for the model
-            instances = [{
+            instance = {
                 "text": cv_text,
                 "context": user_context,
                 "task": "comprehensive_analysis"
-            }]
+            }
             
-            # Make prediction request
-            response = await self._make_prediction(
-                endpoint=self.cv_analysis_endpoint,
-                instances=instances
-            )
+            # Batched with any other analyses arriving in the same window
+            prediction = await self.batcher.predict(self.cv_analysis_endpoint, instance)
             
-            if response and response.predictions:
-                prediction = response.predictions[0]
+            if prediction:
                 
                 return {
                     "skills": prediction.get("extracted_skills", []),
@@ -73,20 +78,16 @@ class VertexAIService:
     async def generate_skill_recommendations(self, user_skills: List[str], target_role: str, industry: str) -> Dict[str, Any]:
         """Generate personalized skill recommendations using AI"""
         try:
-            instances = [{
+            instance = {
                 "current_skills": user_skills,
                 "target_role": target_role,
                 "industry": industry,
                 "task": "skill_gap_analysis"
-            }]
+            }
             
-            response = await self._make_prediction(
-                endpoint=self.skill_matching_endpoint,
-                instances=instances
-            )
+            prediction = await self.batcher.predict(self.skill_matching_endpoint, instance)
             
-            if response and response.predictions:
-                prediction = response.predictions[0]
+            if prediction:
                 
                 return {
                     "missing_skills": prediction.get("missing_skills", []),
@@ -113,13 +114,13 @@ class VertexAIService:
                 "task": "job_matching"
             }]
             
-            response = await self._make_prediction(
+            predictions = await self._make_prediction(
                 endpoint=self.job_recommendation_endpoint,
                 instances=instances
             )
             
-            if response and response.predictions:
-                predictions = response.predictions[0]
+            if predictions:
+                predictions = predictions[0]
                 
                 return predictions.get("recommended_jobs", [])
             
@@ -141,13 +142,13 @@ class VertexAIService:
             }]
             
             # This would call a custom model trained on job market data
-            response = await self._make_prediction(
+            predictions = await self._make_prediction(
                 endpoint="market-analysis-endpoint",
                 instances=instances
             )
             
-            if response and response.predictions:
-                prediction = response.predictions[0]
+            if predictions:
+                prediction = predictions[0]
                 
                 return {
                     "trending_skills": prediction.get("trending_skills", []),
@@ -172,13 +173,13 @@ class VertexAIService:
                 "task": "career_counseling"
             }]
             
-            response = await self._make_prediction(
+            predictions = await self._make_prediction(
                 endpoint="career-advice-endpoint",
                 instances=instances
             )
             
-            if response and response.predictions:
-                prediction = response.predictions[0]
+            if predictions:
+                prediction = predictions[0]
                 
                 return {
                     "career_path": prediction.get("recommended_path", []),
@@ -195,19 +196,10 @@ class VertexAIService:
             logger.error(f"Career advice generation failed: {str(e)}")
             return {}
     
-    async def _make_prediction(self, endpoint: str, instances: List[Dict[str, Any]]) -> Optional[Any]:
-        """Make prediction request to Vertex AI endpoint"""
+    async def _make_prediction(self, endpoint: str, instances: List[Dict[str, Any]]) -> Optional[List[Any]]:
+        """Make prediction request to Vertex AI endpoint, returning one prediction per instance"""
         try:
-            # Convert instances to the required format
-            instances_json = [json.dumps(instance) for instance in instances]
-            
-            # Make prediction request
-            response = self.prediction_client.predict(
-                endpoint=endpoint,
-                instances=instances_json
-            )
-            
-            return response
+            return await self.prediction_client.predict(endpoint, instances)
             
         except Exception as e:
             logger.error(f"Prediction request failed for endpoint {endpoint}: {str(e)}")
@@ -217,7 +209,7 @@ class VertexAIService:
         """Run batch prediction job"""
         try:
             # Create batch prediction job
-            job = aiplatform.BatchPredictionJob.create(
+            job = self.aiplatform.BatchPredictionJob.create(
                 job_display_name=job_name,
                 model_name=model_name,
                 gcs_source=input_uri,
@@ -237,7 +229,7 @@ class VertexAIService:
         """Train a custom model on Vertex AI"""
         try:
             # Define training job
-            job = aiplatform.CustomTrainingJob(
+            job = self.aiplatform.CustomTrainingJob(
                 display_name=f"training-{model_display_name}",
                 script_path="training_script.py",
                 container_uri="gcr.io/cloud-aiplatform/training/tf-cpu.2-8:latest",
@@ -264,10 +256,10 @@ class VertexAIService:
         """Deploy model to an endpoint"""
         try:
             # Get model
-            model = aiplatform.Model(model_name)
+            model = self.aiplatform.Model(model_name)
             
             # Create endpoint
-            endpoint = aiplatform.Endpoint.create(
+            endpoint = self.aiplatform.Endpoint.create(
                 display_name=endpoint_display_name
             )
             
@@ -294,23 +286,23 @@ class AutoMLService:
     def __init__(self):
         self.project_id = settings.GCP_PROJECT_ID
         self.location = settings.GCP_REGION
-        
-        aiplatform.init(
-            project=self.project_id,
-            location=self.location
-        )
+    
+    @property
+    def aiplatform(self):
+        # Imported and initialised on first use; the SDK is slow to import
+        return cloud_clients.get("aiplatform")
     
     async def create_text_classification_model(self, dataset_name: str, model_display_name: str) -> str:
         """Create AutoML text classification model for skill categorization"""
         try:
             # Create AutoML text classification training job
-            job = aiplatform.AutoMLTextTrainingJob(
+            job = self.aiplatform.AutoMLTextTrainingJob(
                 display_name=f"automl-{model_display_name}",
                 prediction_type="classification"
             )
             
             # Get dataset
-            dataset = aiplatform.TextDataset(dataset_name)
+            dataset = self.aiplatform.TextDataset(dataset_name)
             
             # Run training
             model = job.run(
@@ -331,14 +323,14 @@ class AutoMLService:
         """Create AutoML tabular model for salary prediction"""
         try:
             # Create AutoML tabular training job
-            job = aiplatform.AutoMLTabularTrainingJob(
+            job = self.aiplatform.AutoMLTabularTrainingJob(
                 display_name=f"automl-tabular-{model_display_name}",
                 optimization_prediction_type="regression",
                 optimization_objective="minimize-rmse"
             )
             
             # Get dataset
-            dataset = aiplatform.TabularDataset(dataset_name)
+            dataset = self.aiplatform.TabularDataset(dataset_name)
             
             # Run training
             model = job.run(
@@ -0,0 +1,278 @@
+"""
+Cross-instance WebSocket delivery over Redis pub/sub
+"""
+import json
+import uuid
+import socket
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.websocket_service import connection_manager
+
+logger = logging.getLogger(__name__)
+
+
+def _decode(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class WebSocketRelay:
+    """
+    Routes WebSocket messages to the instance holding the user's sockets
+
+    Every instance subscribes to its own Redis channel and adds its ID to a
+    presence set per connected user. A message for a user with no socket on
+    this instance is published only to the channels of the instances in that
+    user's presence set, which deliver it locally. Instances refresh a
+    liveness key on each heartbeat; entries for instances whose key has
+    expired (e.g. after a crash) are pruned when a message is routed. Users
+    with no live instance anywhere are reported back so the caller can keep
+    the message as a pending notification.
+    """
+
+    PRESENCE_PREFIX = "ws:presence:"
+    INSTANCE_PREFIX = "ws:instance:"
+    BROADCAST_CHANNEL = "ws:broadcast"
+
+    def __init__(self, connection_manager, url: Optional[str] = None, heartbeat_interval: Optional[float] = None):
+        self.connection_manager = connection_manager
+        self.url = url
+        self.heartbeat_interval = heartbeat_interval or settings.WEBSOCKET_HEARTBEAT_INTERVAL
+        self.instance_id = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.channel = f"{self.INSTANCE_PREFIX}{self.instance_id}"
+
+        self._redis = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Metrics
+        self.routed_users = 0
+        self.published = 0
+        self.received = 0
+        self.unreachable_users = 0
+        self.pruned_instances = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None and not self._listener.done()
+
+    def _alive_key(self, instance_id: str) -> str:
+        return f"{self.INSTANCE_PREFIX}{instance_id}:alive"
+
+    async def start(self):
+        """Connect, subscribe and start routing for the connection manager"""
+        if self.running:
+            return
+        import redis.asyncio as aioredis
+
+        password = f":{settings.REDIS_PASSWORD}@" if settings.REDIS_PASSWORD else ""
+        url = self.url or settings.WEBSOCKET_RELAY_REDIS_URL or f"redis://{password}{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+        self._redis = aioredis.Redis.from_url(url, socket_connect_timeout=5)
+        try:
+            await self._refresh_presence()
+            self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.channel, self.BROADCAST_CHANNEL)
+        except Exception:
+            await self._redis.aclose()
+            self._redis = None
+            raise
+
+        self._listener = asyncio.create_task(self._listen())
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        # The Redis client belongs to this loop: sends from worker loops must hop here
+        # even before the first socket connects
+        self.connection_manager._loop = asyncio.get_running_loop()
+        self.connection_manager.relay = self
+        logger.info(f"WebSocket relay started for instance {self.instance_id}")
+
+    async def stop(self):
+        """Stop routing and withdraw this instance's presence"""
+        if self._redis is None:
+            return
+        self.connection_manager.relay = None
+
+        for task in (self._listener, self._heartbeat, *self._tasks):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in (self._listener, self._heartbeat, *self._tasks) if t is not None), return_exceptions=True)
+        self._listener = self._heartbeat = None
+
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for user_id in self.connection_manager.get_connected_users():
+                pipe.srem(f"{self.PRESENCE_PREFIX}{user_id}", self.instance_id)
+            pipe.delete(self._alive_key(self.instance_id))
+            await pipe.execute()
+            await self._pubsub.aclose()
+        except Exception as e:
+            logger.warning(f"WebSocket relay shutdown incomplete: {str(e)}")
+        await self._redis.aclose()
+        self._redis = self._pubsub = None
+        logger.info(f"WebSocket relay stopped for instance {self.instance_id}")
+
+    async def register(self, user_id: str):
+        """Record that this instance now holds a socket for the user"""
+        try:
+            await self._redis.sadd(f"{self.PRESENCE_PREFIX}{user_id}", self.instance_id)
+        except Exception as e:
+            # The next heartbeat re-registers every local user
+            self.errors += 1
+            logger.warning(f"Failed to register WebSocket presence for user {user_id}: {str(e)}")
+
+    def unregister_soon(self, user_id: str):
+        """Withdraw presence once the user's last local socket is gone (callable from sync code)"""
+        task = asyncio.get_running_loop().create_task(self._unregister(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _unregister(self, user_id: str):
+        if self.connection_manager.is_user_connected(user_id):
+            return  # reconnected in the meantime
+        try:
+            await self._redis.srem(f"{self.PRESENCE_PREFIX}{user_id}", self.instance_id)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to remove WebSocket presence for user {user_id}: {str(e)}")
+
+    async def route(self, user_ids: List[str], text: str) -> List[str]:
+        """
+        Send an already-serialised message to users connected to other instances
+
+        Returns the users not connected to any live instance.
+        """
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.smembers(f"{self.PRESENCE_PREFIX}{user_id}")
+            memberships = [{_decode(member) for member in members} - {self.instance_id} for members in await pipe.execute()]
+
+            instances = sorted(set().union(*memberships))
+            live = await self._live_instances(instances)
+            await self._prune(user_ids, memberships, set(instances) - live)
+
+            by_instance: Dict[str, List[str]] = defaultdict(list)
+            for user_id, members in zip(user_ids, memberships):
+                for instance_id in members & live:
+                    by_instance[instance_id].append(user_id)
+
+            receivers = await asyncio.gather(*(
+                self._publish(f"{self.INSTANCE_PREFIX}{instance_id}", text, targets)
+                for instance_id, targets in by_instance.items()
+            ))
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to route WebSocket message to other instances: {str(e)}")
+            return list(user_ids)
+
+        reached = set()
+        for (instance_id, targets), count in zip(by_instance.items(), receivers):
+            if count:
+                reached.update(targets)
+        unreachable = [user_id for user_id in user_ids if user_id not in reached]
+        self.routed_users += len(reached)
+        self.unreachable_users += len(unreachable)
+        return unreachable
+
+    async def broadcast(self, text: str):
+        """Send an already-serialised message to the sockets on every other instance"""
+        try:
+            await self._publish(self.BROADCAST_CHANNEL, text)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to broadcast WebSocket message to other instances: {str(e)}")
+
+    async def _publish(self, channel: str, text: str, user_ids: Optional[List[str]] = None) -> int:
+        payload: Dict[str, Any] = {"origin": self.instance_id, "text": text}
+        if user_ids is not None:
+            payload["user_ids"] = user_ids
+        receivers = await self._redis.publish(channel, json.dumps(payload))
+        self.published += 1
+        return receivers
+
+    async def _live_instances(self, instances: List[str]) -> Set[str]:
+        if not instances:
+            return set()
+        flags = await self._redis.mget([self._alive_key(instance_id) for instance_id in instances])
+        return {instance_id for instance_id, flag in zip(instances, flags) if flag is not None}
+
+    async def _prune(self, user_ids: List[str], memberships: List[Set[str]], dead: Set[str]):
+        if not dead:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        for user_id, members in zip(user_ids, memberships):
+            stale = members & dead
+            if stale:
+                pipe.srem(f"{self.PRESENCE_PREFIX}{user_id}", *stale)
+        await pipe.execute()
+        self.pruned_instances += len(dead)
+        logger.info(f"Pruned WebSocket presence of expired instances: {', '.join(sorted(dead))}")
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    self._on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"WebSocket relay listener error, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+
+    def _on_message(self, message: Dict[str, Any]):
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ignoring malformed WebSocket relay message: {str(e)}")
+            return
+        if payload.get("origin") == self.instance_id:
+            return  # our own broadcast, already delivered locally
+
+        self.received += 1
+        if "user_ids" in payload:
+            delivery = self.connection_manager.deliver_routed(payload["user_ids"], payload["text"])
+        else:
+            delivery = self.connection_manager.deliver_broadcast(payload["text"])
+        # Deliver concurrently so one slow fan-out doesn't hold up the channel
+        task = asyncio.get_running_loop().create_task(delivery)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._refresh_presence()
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"WebSocket relay heartbeat failed: {str(e)}")
+
+    async def _refresh_presence(self):
+        """Renew this instance's liveness key and re-register its users (e.g. after a Redis restart)"""
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.set(self._alive_key(self.instance_id), "1", ex=max(1, int(self.heartbeat_interval * 3)))
+        for user_id in self.connection_manager.get_connected_users():
+            pipe.sadd(f"{self.PRESENCE_PREFIX}{user_id}", self.instance_id)
+        await pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "instance_id": self.instance_id,
+            "routed_users": self.routed_users,
+            "published": self.published,
+            "received": self.received,
+            "unreachable_users": self.unreachable_users,
+            "pruned_instances": self.pruned_instances,
+            "errors": self.errors
+        }
+
+
+# Global instance (started from the app lifespan when WEBSOCKET_RELAY_ENABLED)
+websocket_relay = WebSocketRelay(connection_manager)
@@ -2,12 +2,14 @@
 WebSocket service for real-time notifications
 """
 import json
+import time
 import asyncio
-from typing import Dict, Set, Any, Optional
+from typing import Dict, Set, Any, List, Optional, Tuple
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
 import logging
 
+from app.config import settings
 from app.services.cache_service import CacheService
 from app.services.pubsub_service import PubSubService
 
@@ -15,22 +17,41 @@ logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, send_concurrency: Optional[int] = None, send_timeout: Optional[float] = None):
         # Store active connections by user_id
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}
         self.cache_service = CacheService()
         self.pubsub_service = PubSubService()
+        # Loop that owns the sockets; set on first connect
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Cross-instance routing (WebSocketRelay); None delivers to local sockets only
+        self.relay = None
+        
+        self.send_concurrency = max(1, send_concurrency or settings.WEBSOCKET_SEND_CONCURRENCY)
+        self.send_timeout = send_timeout or settings.WEBSOCKET_SEND_TIMEOUT
+        
+        # Fan-out metrics
+        self.messages_sent = 0
+        self.sends = 0
+        self.failed_sends = 0
+        self.timed_out_sends = 0
+        self.largest_fanout = 0
+        self.last_fanout_seconds = 0.0
     
     async def connect(self, websocket: WebSocket, user_id: str, client_info: Dict[str, Any] = None):
         """Accept WebSocket connection and register user"""
+        self._loop = asyncio.get_running_loop()
         await websocket.accept()
         
         # Add to active connections
-        if user_id not in self.active_connections:
+        first_connection = user_id not in self.active_connections
+        if first_connection:
             self.active_connections[user_id] = set()
         
         self.active_connections[user_id].add(websocket)
+        if first_connection and self.relay is not None:
+            await self.relay.register(user_id)
         
         # Store connection metadata
         self.connection_metadata[websocket] = {
@@ -63,6 +84,8 @@ class ConnectionManager:
                 # Remove user entry if no more connections
                 if not self.active_connections[user_id]:
                     del self.active_connections[user_id]
+                    if self.relay is not None:
+                        self.relay.unregister_soon(user_id)
             
             # Remove metadata
             del self.connection_metadata[websocket]
@@ -80,33 +103,129 @@ class ConnectionManager:
     
     async def send_to_user(self, user_id: str, message: Dict[str, Any]):
         """Send message to all connections for a user"""
-        if user_id in self.active_connections:
-            # Send to all user's connections
-            connections_to_remove = []
-            
-            for websocket in self.active_connections[user_id].copy():
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Failed to send message to user {user_id}: {str(e)}")
-                    connections_to_remove.append(websocket)
-            
-            # Remove failed connections
-            for websocket in connections_to_remove:
-                self.disconnect(websocket)
-        else:
-            # User not connected, cache the message
-            await self._cache_notification(user_id, message)
+        await self.send_to_multiple_users([user_id], message)
     
     async def broadcast_to_all(self, message: Dict[str, Any]):
         """Broadcast message to all connected users"""
-        for user_id in list(self.active_connections.keys()):
-            await self.send_to_user(user_id, message)
+        if self._on_foreign_loop():
+            await self._run_on_owner_loop(self.broadcast_to_all(message))
+            return
+        
+        text = json.dumps(message)
+        if self.relay is not None:
+            await self.relay.broadcast(text)
+        await self.deliver_broadcast(text)
     
     async def send_to_multiple_users(self, user_ids: list, message: Dict[str, Any]):
-        """Send message to multiple users"""
-        for user_id in user_ids:
-            await self.send_to_user(user_id, message)
+        """Send message to multiple users; offline users get it when they next connect"""
+        if self._on_foreign_loop():
+            await self._run_on_owner_loop(self.send_to_multiple_users(user_ids, message))
+            return
+        
+        text = json.dumps(message)
+        offline = await self._deliver(user_ids, text)
+        if offline and self.relay is not None:
+            # Users connected to another instance are reached through it
+            offline = await self.relay.route(offline, text)
+        if offline:
+            await asyncio.gather(*(self._cache_notification(user_id, dict(message)) for user_id in offline))
+    
+    async def deliver_routed(self, user_ids: List[str], text: str):
+        """Deliver a message another instance routed here; users who have since left get it cached"""
+        offline = await self._deliver(user_ids, text)
+        if offline:
+            message = json.loads(text)
+            await asyncio.gather(*(self._cache_notification(user_id, dict(message)) for user_id in offline))
+    
+    async def deliver_broadcast(self, text: str):
+        """Deliver a serialised broadcast to every socket on this instance"""
+        await self._fan_out(self._sockets_for(list(self.active_connections.keys())), text)
+    
+    async def _deliver(self, user_ids: List[str], text: str) -> List[str]:
+        """Send to the users' sockets on this instance; returns the users with none here"""
+        online = [user_id for user_id in user_ids if self.active_connections.get(user_id)]
+        offline = [user_id for user_id in user_ids if not self.active_connections.get(user_id)]
+        if online:
+            await self._fan_out(self._sockets_for(online), text)
+        return offline
+    
+    def _on_foreign_loop(self) -> bool:
+        # Called from another event loop (e.g. the Pub/Sub worker loop): sockets
+        # and the cache client belong to the app loop, so send from there
+        return self._loop is not None and self._loop.is_running() and self._loop is not asyncio.get_running_loop()
+    
+    async def _run_on_owner_loop(self, coro):
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+    
+    def _sockets_for(self, user_ids: List[str]) -> List[Tuple[str, WebSocket]]:
+        return [
+            (user_id, websocket)
+            for user_id in user_ids
+            for websocket in list(self.active_connections.get(user_id, ()))
+        ]
+    
+    async def _fan_out(self, targets: List[Tuple[str, WebSocket]], text: str) -> int:
+        """
+        Send one already-serialised message to many sockets
+        
+        A fixed number of senders work through the targets, so at most
+        send_concurrency writes are outstanding and a slow client only holds up
+        its own sender until send_timeout. Sockets that fail or time out are
+        disconnected together afterwards. Returns the number of successful sends.
+        """
+        if not targets:
+            return 0
+        
+        started = time.monotonic()
+        pending = iter(targets)
+        dead: List[Tuple[str, WebSocket, Exception]] = []
+        
+        async def sender():
+            for user_id, websocket in pending:
+                try:
+                    await asyncio.wait_for(websocket.send_text(text), self.send_timeout)
+                except Exception as e:
+                    dead.append((user_id, websocket, e))
+        
+        await asyncio.gather(*(sender() for _ in range(min(self.send_concurrency, len(targets)))))
+        
+        stalled = []
+        for user_id, websocket, error in dead:
+            if isinstance(error, asyncio.TimeoutError):
+                self.timed_out_sends += 1
+                stalled.append(websocket)
+                logger.warning(f"Timed out sending to user {user_id} after {self.send_timeout}s, disconnecting")
+            else:
+                logger.error(f"Failed to send message to user {user_id}: {str(error)}")
+            self.disconnect(websocket)
+        if stalled:
+            # Close stalled clients so they reconnect and collect pending notifications
+            await asyncio.gather(
+                *(asyncio.wait_for(websocket.close(code=1011), self.send_timeout) for websocket in stalled),
+                return_exceptions=True
+            )
+        
+        sent = len(targets) - len(dead)
+        self.messages_sent += 1
+        self.sends += sent
+        self.failed_sends += len(dead)
+        self.largest_fanout = max(self.largest_fanout, len(targets))
+        self.last_fanout_seconds = time.monotonic() - started
+        return sent
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected_users": len(self.active_connections),
+            "connections": len(self.connection_metadata),
+            "messages_sent": self.messages_sent,
+            "sends": self.sends,
+            "failed_sends": self.failed_sends,
+            "timed_out_sends": self.timed_out_sends,
+            "largest_fanout": self.largest_fanout,
+            "last_fanout_ms": round(self.last_fanout_seconds * 1000, 1),
+            "send_concurrency": self.send_concurrency,
+            "send_timeout_seconds": self.send_timeout
+        }
     
     def get_connected_users(self) -> list:
         """Get list of currently connected user IDs"""
@@ -191,6 +310,23 @@ class NotificationService:
         
         await self.connection_manager.send_to_user(user_id, message)
     
+    async def notify_cv_processing_partial(self, user_id: str, cv_id: str, extracted_data: Dict[str, Any]):
+        """Notify user that basic CV extraction is ready while AI analysis continues"""
+        message = {
+            "type": "cv_processing_partial",
+            "cv_id": cv_id,
+            "data": {
+                "skills_found": len(extracted_data.get("skills", [])),
+                "skills": extracted_data.get("skills", [])[:10],
+                "experience_years": extracted_data.get("experience_years", 0),
+                "sections_detected": extracted_data.get("sections_detected", [])
+            },
+            "message": "Basic CV extraction ready. AI analysis in progress...",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        await self.connection_manager.send_to_user(user_id, message)
+    
     async def notify_new_job_matches(self, user_id: str, job_count: int, top_matches: list):
         """Notify user about new job matches"""
         message = {
@@ -215,6 +351,17 @@ class NotificationService:
         
         await self.connection_manager.send_to_user(user_id, message)
     
+    async def notify_recommendations_updated(self, user_id: str, triggers: list):
+        """Tell the user's clients their recommendations were recomputed and should be refetched"""
+        message = {
+            "type": "recommendations_updated",
+            "triggers": triggers,
+            "message": "Your recommendations have been updated.",
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        
+        await self.connection_manager.send_to_user(user_id, message)
+    
     async def notify_market_trend_alert(self, user_ids: list, trend_data: Dict[str, Any]):
         """Notify users about relevant market trends"""
         message = {
@@ -2,20 +2,89 @@
 Cloud storage utilities for Google Cloud Storage
 """
 import os
+import time
+import asyncio
+import hashlib
 import tempfile
-from typing import Optional
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
 from fastapi import UploadFile
-from google.cloud import storage
 import httpx
 
 from app.config import settings
+from app.services.cloud_clients import cloud_clients
+
+# Resumable upload chunks must be a multiple of 256 KiB
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Signed URLs are reused for this fraction of their lifetime; RSA signing is CPU-bound
+SIGNED_URL_CACHE_FRACTION = 0.5
+SIGNED_URL_CACHE_MAX_ENTRIES = 1024
+
+# (file_url, method, expiration_minutes) -> (url, reuse_until); shared across StorageService instances
+_signed_url_cache: "OrderedDict[Tuple[str, str, int], Tuple[str, float]]" = OrderedDict()
+
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the allowed size"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File size exceeds {max_size // (1024 * 1024)}MB limit")
+        self.max_size = max_size
+
+
+class UploadResult(NamedTuple):
+    file_url: str
+    size: int
+    content_hash: str
+
+
+async def hash_upload(
+    file: UploadFile,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    max_size: Optional[int] = None
+) -> Tuple[str, int]:
+    """SHA-256 and size of an upload, read in chunks; the file is rewound afterwards"""
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise FileTooLargeError(max_size)
+        digest.update(chunk)
+    await file.seek(0)
+    return digest.hexdigest(), size
+
+
+def hash_file(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """SHA-256 of a local file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
 class StorageService:
     def __init__(self):
-        self.client = storage.Client()
         self.bucket_name = settings.GCS_BUCKET_NAME
-        self.bucket = self.client.bucket(self.bucket_name)
+        self._bucket = None
+    
+    @property
+    def client(self):
+        # Shared storage client, created on first use rather than per service instance
+        return cloud_clients.get("storage")
+    
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = self.client.bucket(self.bucket_name)
+        return self._bucket
     
     async def upload_file(
         self,
@@ -24,26 +93,50 @@ class StorageService:
         folder: str = ""
     ) -> str:
         """Upload file to Google Cloud Storage"""
+        result = await self.upload_stream(file, filename, folder)
+        return result.file_url
+    
+    async def upload_stream(
+        self,
+        file: UploadFile,
+        filename: str,
+        folder: str = "",
+        max_size: Optional[int] = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE
+    ) -> UploadResult:
+        """
+        Stream an upload to Google Cloud Storage in chunks
+
+        Uses a resumable upload written from a worker thread, so only one chunk
+        is held in memory. Size and SHA-256 are computed as chunks go by, and
+        the upload is abandoned (never finalized) once it exceeds max_size.
+        """
+        max_size = max_size or settings.MAX_FILE_SIZE
+        blob_name = f"{folder}/{filename}" if folder else filename
+        blob = self.bucket.blob(blob_name)
+        
+        digest = hashlib.sha256()
+        size = 0
         try:
-            # Create full path
-            if folder:
-                blob_name = f"{folder}/{filename}"
-            else:
-                blob_name = filename
-            
-            # Create blob
-            blob = self.bucket.blob(blob_name)
-            
-            # Upload file
-            file_content = await file.read()
-            blob.upload_from_string(
-                file_content,
-                content_type=file.content_type
+            writer = await asyncio.to_thread(
+                blob.open, "wb", chunk_size=chunk_size, content_type=file.content_type
             )
+            await file.seek(0)
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(max_size)
+                digest.update(chunk)
+                await asyncio.to_thread(writer.write, chunk)
             
-            # Return public URL
-            return f"gs://{self.bucket_name}/{blob_name}"
+            await asyncio.to_thread(writer.close)
+            return UploadResult(f"gs://{self.bucket_name}/{blob_name}", size, digest.hexdigest())
             
+        except FileTooLargeError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to upload file: {str(e)}")
     
@@ -93,13 +186,22 @@ class StorageService:
             blob = bucket.blob(blob_name)
             blob.delete()
             
+            for key in [key for key in _signed_url_cache if key[0] == file_url]:
+                del _signed_url_cache[key]
+            
             return True
             
         except Exception:
             return False
     
-    def get_signed_url(self, file_url: str, expiration_minutes: int = 60) -> str:
-        """Generate signed URL for temporary access"""
+    async def get_signed_url(self, file_url: str, expiration_minutes: int = 60) -> str:
+        """Generate signed URL for temporary access, reusing a recent one for the same object"""
+        key = (file_url, "GET", expiration_minutes)
+        cached = _signed_url_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            _signed_url_cache.move_to_end(key)
+            return cached[0]
+        
         try:
             # Parse GCS URL
             path_parts = file_url.replace("gs://", "").split("/", 1)
@@ -110,14 +212,70 @@ class StorageService:
             bucket = self.client.bucket(bucket_name)
             blob = bucket.blob(blob_name)
             
-            # Generate signed URL
-            from datetime import timedelta
-            url = blob.generate_signed_url(
+            # Generate signed URL (RSA signing is CPU-bound, keep it off the event loop)
+            url = await asyncio.to_thread(
+                blob.generate_signed_url,
                 expiration=timedelta(minutes=expiration_minutes),
                 method="GET"
             )
             
-            return url
-            
         except Exception as e:
-            raise Exception(f"Failed to generate signed URL: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to generate signed URL: {str(e)}")
+        
+        _signed_url_cache[key] = (url, time.monotonic() + expiration_minutes * 60 * SIGNED_URL_CACHE_FRACTION)
+        _signed_url_cache.move_to_end(key)
+        while len(_signed_url_cache) > SIGNED_URL_CACHE_MAX_ENTRIES:
+            _signed_url_cache.popitem(last=False)
+        
+        return url
+    
+    async def generate_upload_url(
+        self,
+        filename: str,
+        folder: str = "",
+        content_type: str = "application/octet-stream",
+        max_size: Optional[int] = None,
+        expiration_minutes: int = 15
+    ) -> Dict[str, Any]:
+        """
+        Generate a short-lived signed URL for uploading straight to the bucket
+
+        The client must PUT with the returned headers; GCS rejects bodies
+        larger than max_size via x-goog-content-length-range.
+        """
+        max_size = max_size or settings.MAX_FILE_SIZE
+        blob_name = f"{folder}/{filename}" if folder else filename
+        blob = self.bucket.blob(blob_name)
+        headers = {"x-goog-content-length-range": f"0,{max_size}"}
+        
+        try:
+            url = await asyncio.to_thread(
+                blob.generate_signed_url,
+                version="v4",
+                expiration=timedelta(minutes=expiration_minutes),
+                method="PUT",
+                content_type=content_type,
+                headers=headers
+            )
+        except Exception as e:
+            raise Exception(f"Failed to generate upload URL: {str(e)}")
+        
+        return {
+            "upload_url": url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type, **headers},
+            "file_url": f"gs://{self.bucket_name}/{blob_name}",
+            "expires_at": (datetime.utcnow() + timedelta(minutes=expiration_minutes)).isoformat()
+        }
+    
+    async def get_file_info(self, file_url: str) -> Optional[Dict[str, Any]]:
+        """Size and content type of a stored object, or None if it doesn't exist"""
+        if not file_url.startswith("gs://"):
+            return None
+        
+        bucket_name, blob_name = file_url.replace("gs://", "").split("/", 1)
+        blob = await asyncio.to_thread(self.client.bucket(bucket_name).get_blob, blob_name)
+        if blob is None:
+            return None
+        
+        return {"size": blob.size, "content_type": blob.content_type}
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+Prompt size benchmark: raw-text prompts vs compact section-based prompts
+
+The samples are ordinary CVs without repeated content. "no dedupe" is the
+compact prompt with repeated-line removal turned off, so the effect of the
+dedupe step can be read separately from sectioning, whitespace and schema
+compaction. Compaction must not drop employment dates; the benchmark exits
+non-zero if a date in a sample is missing from its compact prompt.
+
+Usage (from the backend directory):
+    python benchmarks/prompt_size_benchmark.py [extra_cv.txt ...] [--live]
+
+--live additionally measures time-to-first-token against DeepSeek for both
+prompt styles (requires DEEPSEEK_TOKEN; bypasses the response cache).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.llm_gateway import estimate_tokens  # noqa: E402
+from services.prompt_builder import DATE_RANGE_PATTERN, PromptBuilder, prompt_builder  # noqa: E402
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SAMPLE_CVS = {
+    "mid_level_engineer": """
+Jane   Smith
+jane.smith@example.com  |  +44 7700 900123  |  linkedin.com/in/janesmith
+London,   UK
+
+Professional Summary
+Backend engineer with 6 years of experience building   distributed systems in Python and Go.
+Passionate about reliability, observability and developer experience.
+
+Work Experience
+Senior Software Engineer - Acme Payments - 2021 - Present
+• Led migration of the ledger service from a monolith to event-driven microservices on GCP.
+• Reduced p99 latency of the payments API from 850ms to 210ms by introducing Redis caching.
+• Mentored 4 engineers and ran the backend guild.
+
+Software Engineer - Widgets Ltd - 2018 - 2021
+• Built REST APIs with Django and PostgreSQL serving 2M requests/day.
+• Introduced CI pipelines with GitLab CI and Docker, cutting release time by 60%.
+
+
+
+Skills
+Python, Go, Django, FastAPI, PostgreSQL, Redis, Kafka, Docker, Kubernetes, Terraform, GCP, AWS
+
+
+Education
+BSc Computer Science, University of Manchester, 2018
+
+Certifications
+Google Cloud Professional Cloud Architect
+AWS Certified Developer - Associate
+""",
+    "graduate": """
+Sam Taylor
+sam.taylor@example.com
+07700 900456
+
+Objective
+Recent computer science graduate looking for a junior data analyst or software developer role.
+
+Education
+BSc (Hons) Computer Science, University of Leeds, 2024
+Dissertation: Predicting bike-share demand with gradient boosted trees.
+
+Projects
+- Bike-share demand forecasting using Python, Pandas, scikit-learn and XGBoost.
+- Personal finance tracker built with React, Node.js and MongoDB.
+- Discord bot for study group scheduling (JavaScript).
+
+Experience
+Data Intern - City Council - Summer 2023
+- Cleaned and analysed 5 years of parking data in SQL and Excel.
+- Built Tableau dashboards used by the transport team.
+
+Skills
+Python, SQL, Pandas, scikit-learn, React, JavaScript, Git, Tableau, Excel
+""",
+    "contractor": """
+Alex Kowalski
++48 512 345 678
+alex.kowalski@example.com
+
+Profile
+Freelance data engineer working with retail and logistics clients across Europe.
+
+Experience
+Data Engineer (contract), Nordic Retail Group
+01.2022-present
+Designed Airflow pipelines loading 40 GB/day of sales data into BigQuery.
+
+Data Engineer, Acme Logistics
+06/2018 - 09/2021
+Built Spark jobs for route optimisation and maintained the Kafka ingestion layer.
+
+Skills
+Python, SQL, Spark, Airflow, Kafka, BigQuery, dbt
+Experience: 7 years with cloud data platforms
+
+Education
+MSc Computer Science, Warsaw University of Technology
+10.2016-06.2018
+"""
+}
+
+
+def legacy_paraphrase_prompt(cv_text: str, job_title: str, job_description: str) -> str:
+    """The raw-text paraphrasing prompt used before the prompt builder"""
+    return f"""
+    Please paraphrase this CV to better align with the target job position:
+
+    TARGET JOB TITLE: {job_title}
+
+    JOB DESCRIPTION: {job_description if job_description else "No specific job description provided"}
+
+    ORIGINAL CV:
+    {cv_text}
+
+    Provide the paraphrased CV in this JSON format:
+    {{
+        "paraphrased_cv": {{
+            "professional_summary": "Rewritten professional summary emphasizing relevant skills",
+            "work_experience": [
+                {{
+                    "company": "Company Name",
+                    "position": "Job Title",
+                    "duration": "Date Range",
+                    "description": "Rewritten job description highlighting relevant achievements"
+                }}
+            ],
+            "skills": ["List of skills emphasized for this role"],
+            "education": "Education section if relevant changes needed",
+            "key_achievements": ["Rewritten achievements that align with target role"]
+        }},
+        "optimization_notes": {{
+            "keywords_added": ["Industry keywords incorporated"],
+            "skills_emphasized": ["Skills highlighted for this role"],
+            "experience_reframed": ["How experience was repositioned"],
+            "suggestions": ["Additional recommendations for the application"]
+        }},
+        "match_analysis": {{
+            "alignment_score": 0.85,
+            "strengths": ["Strong points for this role"],
+            "areas_to_highlight": ["Key areas to emphasize in cover letter"],
+            "missing_elements": ["Skills/experience gaps to address"]
+        }}
+    }}
+    """
+
+
+def missing_dates(cv_text: str, prompt: str):
+    """Employment dates in the CV that compaction dropped from the prompt"""
+    return [match.group() for match in DATE_RANGE_PATTERN.finditer(cv_text) if match.group() not in prompt]
+
+
+def load_samples(extra_paths):
+    samples = dict(SAMPLE_CVS)
+    for path in [os.path.join(BACKEND_DIR, "test_cv.txt")] + list(extra_paths):
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                samples[os.path.basename(path)] = f.read()
+    return samples
+
+
+async def time_to_first_token(user_prompt: str) -> float:
+    from services.deepseek_service import deepseek_service
+
+    started = time.perf_counter()
+    async for _ in deepseek_service.chat_completion_stream(
+        "You are an expert CV writer.",
+        user_prompt,
+        temperature=0.3,
+        top_p=0.9,
+        max_tokens=4000,
+        prompt_version="benchmark",
+        force_refresh=True
+    ):
+        return time.perf_counter() - started
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cv_files", nargs="*", help="Additional plain-text CVs to include")
+    parser.add_argument("--live", action="store_true", help="Measure time-to-first-token against DeepSeek")
+    args = parser.parse_args()
+
+    job_title = "Senior Backend Engineer"
+    job_description = "We are hiring a backend engineer to build scalable Python services on Google Cloud."
+
+    no_dedupe_builder = PromptBuilder(dedupe_lines=False)
+
+    print(f"{'cv':<22}{'legacy tok':>12}{'no dedupe':>11}{'saved':>8}{'compact tok':>13}{'saved':>8}{'build ms':>10}")
+    total_legacy = total_no_dedupe = total_compact = 0
+    dropped = {}
+    for name, cv_text in load_samples(args.cv_files).items():
+        legacy = legacy_paraphrase_prompt(cv_text, job_title, job_description)
+        no_dedupe = no_dedupe_builder.build_paraphrase_prompt(cv_text, job_title, job_description)
+
+        started = time.perf_counter()
+        compact = prompt_builder.build_paraphrase_prompt(cv_text, job_title, job_description)
+        build_ms = (time.perf_counter() - started) * 1000
+        if missing_dates(cv_text, compact):
+            dropped[name] = missing_dates(cv_text, compact)
+
+        legacy_tokens, no_dedupe_tokens, compact_tokens = estimate_tokens(legacy), estimate_tokens(no_dedupe), estimate_tokens(compact)
+        total_legacy += legacy_tokens
+        total_no_dedupe += no_dedupe_tokens
+        total_compact += compact_tokens
+        print(
+            f"{name:<22}{legacy_tokens:>12}{no_dedupe_tokens:>11}{1 - no_dedupe_tokens / legacy_tokens:>8.0%}"
+            f"{compact_tokens:>13}{1 - compact_tokens / legacy_tokens:>8.0%}{build_ms:>10.2f}"
+        )
+
+        if args.live:
+            legacy_ttft = asyncio.run(time_to_first_token(legacy))
+            compact_ttft = asyncio.run(time_to_first_token(compact))
+            print(f"{'':<22}time-to-first-token: legacy {legacy_ttft:.2f}s, compact {compact_ttft:.2f}s")
+
+    print(
+        f"{'total':<22}{total_legacy:>12}{total_no_dedupe:>11}{1 - total_no_dedupe / total_legacy:>8.0%}"
+        f"{total_compact:>13}{1 - total_compact / total_legacy:>8.0%}"
+    )
+
+    for name, dates in dropped.items():
+        print(f"{name}: compact prompt dropped dates {', '.join(dates)}")
+    if dropped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
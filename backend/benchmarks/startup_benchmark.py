@@ -0,0 +1,159 @@
+"""
+Import-time and startup-time benchmark for the backend modules
+
+Usage (from the backend directory):
+    python benchmarks/startup_benchmark.py [module ...] [--runs N] [--top N]
+        [--save baseline.json] [--baseline baseline.json] [--tolerance 0.2]
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+For every module this reports the cumulative import time, the wall-clock
+time until the import finishes (median of --runs), and the packages that
+contributed most. With --baseline the run exits non-zero if any module got
+slower than the saved numbers by more than --tolerance.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_MODULES = [
+    "app.main",
+    "app.utils.storage",
+    "app.services.pubsub_service",
+    "app.services.monitoring_service",
+    "app.services.vertex_ai_service",
+    "app.services.recommendation_service",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_import(module: str) -> Dict[str, Any]:
+    """Import a module in a fresh interpreter, returning wall time and -X importtime output"""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    entries = []
+    errors = []
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "name": name,
+                "depth": len(indent) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us)
+            })
+        elif not line.startswith("import time:"):
+            errors.append(line)
+
+    return {
+        "ok": process.returncode == 0,
+        "wall_ms": wall_ms,
+        "entries": entries,
+        "error": errors[-1] if errors and process.returncode else None
+    }
+
+
+def summarise(module: str, runs: int, top: int) -> Dict[str, Any]:
+    results = [run_import(module) for _ in range(runs)]
+    last = results[-1]
+    if not last["ok"]:
+        return {"module": module, "ok": False, "error": last["error"]}
+
+    entries = last["entries"]
+    target = next((entry for entry in reversed(entries) if entry["name"] == module), None)
+    import_ms = (target["cumulative_us"] if target else sum(e["self_us"] for e in entries)) / 1000
+
+    # Attribute self time to top-level packages (google, sqlalchemy, numpy, ...)
+    by_package: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["name"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_us"]
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+
+    return {
+        "module": module,
+        "ok": True,
+        "import_ms": round(import_ms, 1),
+        "startup_ms": round(statistics.median(result["wall_ms"] for result in results), 1),
+        "modules_imported": len(entries),
+        "heaviest_packages": [{"package": name, "ms": round(us / 1000, 1)} for name, us in heaviest]
+    }
+
+
+def compare(summaries: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for summary in summaries:
+        previous = baseline.get(summary["module"])
+        if not summary["ok"] or not previous or not previous.get("ok"):
+            continue
+        for key in ("import_ms", "startup_ms"):
+            limit = previous[key] * (1 + tolerance)
+            if summary[key] > limit:
+                regressions.append(
+                    f"{summary['module']} {key}: {summary[key]:.1f}ms > {previous[key]:.1f}ms (+{tolerance:.0%} allowed)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", help="Modules to import (default: the cloud-facing services and app.main)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per module; startup is the median")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list per module")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    interpreter = statistics.median(run_import("sys")["wall_ms"] for _ in range(args.runs))
+    print(f"Interpreter startup: {interpreter:.1f}ms\n")
+
+    summaries = []
+    for module in args.modules or DEFAULT_MODULES:
+        summary = summarise(module, args.runs, args.top)
+        summaries.append(summary)
+        if not summary["ok"]:
+            print(f"{module}: import failed ({summary['error']})\n")
+            continue
+        print(
+            f"{module}: import {summary['import_ms']:.1f}ms, startup {summary['startup_ms']:.1f}ms, "
+            f"{summary['modules_imported']} modules"
+        )
+        for package in summary["heaviest_packages"]:
+            print(f"    {package['package']:<24} {package['ms']:>8.1f}ms")
+        print()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({summary["module"]: summary for summary in summaries}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(summaries, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for regression in regressions:
+                print(f"    {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Task queue throughput benchmark: publish -> worker -> ack with a no-op handler
+
+Usage (from the backend directory):
+    python benchmarks/task_queue_benchmark.py [--backend memory|redis] [--messages N]
+        [--concurrency N] [--redis-url redis://localhost:6379/0]
+
+The in-memory backend runs entirely offline. Messages go through the same
+PubSubWorker runtime the API uses (subscriber thread -> worker event loop
+-> handler -> ack), so the numbers include that bridging overhead.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.pubsub_worker import PubSubWorker  # noqa: E402
+from app.services.task_queue import InMemoryTaskQueue, RedisStreamsTaskQueue  # noqa: E402
+
+
+async def run(queue, messages: int, concurrency: int, publish_batch: int):
+    run_id = uuid.uuid4().hex[:8]
+    topic = f"benchmark-{run_id}"
+    subscription = f"benchmark-{run_id}-sub"
+    queue.create_topic(topic)
+    queue.create_subscription(subscription, topic)
+
+    done = threading.Event()
+    handled = 0
+    latencies = []
+
+    async def handler(data):
+        nonlocal handled
+        latencies.append(time.time() - data["sent_at"])
+        handled += 1
+        if handled >= messages:
+            done.set()
+
+    worker = PubSubWorker("benchmark", subscription, handler, max_messages=concurrency, queue=queue)
+    worker.start()
+
+    started = time.perf_counter()
+    for offset in range(0, messages, publish_batch):
+        await asyncio.gather(*(
+            queue.publish(topic, json.dumps({"n": n, "sent_at": time.time()}).encode("utf-8"))
+            for n in range(offset, min(offset + publish_batch, messages))
+        ))
+    published = time.perf_counter() - started
+
+    finished = await asyncio.to_thread(done.wait, 300)
+    elapsed = time.perf_counter() - started
+    stats = worker.stats()
+    await worker.stop_async()
+
+    if not finished:
+        print(f"Timed out after {elapsed:.1f}s with {handled}/{messages} messages handled")
+    latencies.sort()
+    return {
+        "messages": messages,
+        "handled": handled,
+        "publish_per_second": messages / published,
+        "end_to_end_per_second": handled / elapsed,
+        "latency_p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "acked": stats["acked"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50, help="Worker flow control (max unacked messages)")
+    parser.add_argument("--publish-batch", type=int, default=500, help="Publishes awaited together")
+    parser.add_argument("--redis-url", default=os.getenv("TASK_QUEUE_REDIS_URL", "redis://localhost:6379/0"))
+    args = parser.parse_args()
+
+    queue = InMemoryTaskQueue() if args.backend == "memory" else RedisStreamsTaskQueue(args.redis_url)
+    try:
+        result = asyncio.run(run(queue, args.messages, args.concurrency, args.publish_batch))
+    finally:
+        queue.close()
+
+    print(f"Backend: {args.backend}, concurrency {args.concurrency}")
+    print(f"  Messages handled:   {result['handled']}/{result['messages']} (acked {result['acked']})")
+    print(f"  Publish rate:       {result['publish_per_second']:,.0f} msg/s")
+    print(f"  End-to-end rate:    {result['end_to_end_per_second']:,.0f} msg/s")
+    print(f"  Latency p50 / p99:  {result['latency_p50_ms']:.1f}ms / {result['latency_p99_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
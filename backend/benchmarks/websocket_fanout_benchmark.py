@@ -0,0 +1,109 @@
+"""
+WebSocket fan-out benchmark: one broadcast to many sockets, some of them slow or dead
+
+Usage (from the backend directory):
+    python benchmarks/websocket_fanout_benchmark.py [--sockets N] [--send-ms N]
+        [--slow N] [--slow-ms N] [--dead N] [--concurrency N] [--timeout S]
+
+Sockets are in-process fakes whose send_text sleeps for the given time, so
+no server or Redis is needed. The serial baseline is the previous fan-out
+(json.dumps and await per socket, one socket at a time).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.websocket_service import ConnectionManager  # noqa: E402
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float, dead: bool = False):
+        self.delay = delay
+        self.dead = dead
+        self.received = 0
+
+    async def send_text(self, text: str):
+        if self.dead:
+            raise RuntimeError("Connection closed")
+        await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self, code: int = 1000):
+        self.dead = True
+
+
+def build_manager(args, concurrency: int) -> ConnectionManager:
+    manager = ConnectionManager(send_concurrency=concurrency, send_timeout=args.timeout)
+    kinds = ["slow"] * args.slow + ["dead"] * args.dead
+    kinds += ["normal"] * (args.sockets - len(kinds))
+    random.Random(0).shuffle(kinds)
+
+    for n, kind in enumerate(kinds):
+        delay = (args.slow_ms if kind == "slow" else args.send_ms) / 1000
+        websocket = FakeWebSocket(delay, dead=kind == "dead")
+        user_id = f"user-{n}"
+        manager.active_connections[user_id] = {websocket}
+        manager.connection_metadata[websocket] = {"user_id": user_id}
+    return manager
+
+
+async def serial_broadcast(manager: ConnectionManager, message):
+    # The fan-out this benchmark replaces
+    for user_id in list(manager.active_connections.keys()):
+        for websocket in manager.active_connections.get(user_id, set()).copy():
+            try:
+                await websocket.send_text(json.dumps(message))
+            except Exception:
+                manager.disconnect(websocket)
+
+
+async def run(args):
+    message = {
+        "type": "system_maintenance",
+        "message": "Scheduled maintenance tonight",
+        "scheduled_time": "2026-01-01T02:00:00Z",
+        "details": ["x" * 64] * 8
+    }
+    results = {}
+
+    if not args.skip_serial:
+        manager = build_manager(args, 1)
+        started = time.perf_counter()
+        await serial_broadcast(manager, message)
+        results["serial"] = (time.perf_counter() - started, len(manager.connection_metadata))
+
+    manager = build_manager(args, args.concurrency)
+    started = time.perf_counter()
+    await manager.broadcast_to_all(message)
+    results[f"concurrent ({args.concurrency})"] = (time.perf_counter() - started, len(manager.connection_metadata))
+    return results, manager.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--send-ms", type=float, default=1.0, help="Send time of a normal client")
+    parser.add_argument("--slow", type=int, default=20, help="Number of slow clients")
+    parser.add_argument("--slow-ms", type=float, default=2000.0, help="Send time of a slow client")
+    parser.add_argument("--dead", type=int, default=100, help="Number of already-closed sockets")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-socket send timeout (seconds)")
+    parser.add_argument("--skip-serial", action="store_true", help="Skip the (slow) serial baseline")
+    args = parser.parse_args()
+
+    results, stats = asyncio.run(run(args))
+
+    print(f"{args.sockets} sockets ({args.slow} slow at {args.slow_ms:.0f}ms, {args.dead} dead), normal send {args.send_ms}ms")
+    for name, (elapsed, remaining) in results.items():
+        print(f"  {name:<18} {elapsed:8.2f}s  {remaining} sockets still registered")
+    print(f"  Failed sends: {stats['failed_sends']} (timed out {stats['timed_out_sends']})")
+
+
+if __name__ == "__main__":
+    main()